@@ -0,0 +1,92 @@
+"""
+Script version of "Clustering data prep v01.ipynb", run for each chamber.
+
+Matches every roll call to the bill it is about (from the vote question),
+joins the bill's topics and subjects, and writes one row per
+(vote, topic, subject) with one "vote_<bioguide id>" column per member to
+<chamber>_data_for_clustering.csv.
+
+Senate vote files identify members by lis_id; those columns are renamed to
+bioguide ids here, so everything downstream only deals with bioguide ids.
+"""
+
+import pandas as pd
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+import os
+join = os.path.join
+
+DATA_PATH = os.environ.get("REPG_DATA_ROOT", "../../../data")
+CHAMBERS = ["house", "senate"]
+
+HOUSE_BILL_KEYWORDS = [" H R ", " H RES ", " H.R. ", " H.Res. ", " H.J.Res. ", " H.J. Res", " H J RES "]
+SENATE_BILL_KEYWORDS = [" S ", " S. ", " S.Res. ", " S.J.Res. ", " S.J. Res ", " S J RES "]
+
+
+def extract_bill_id_from_vote(vote_question):
+    bill_keywords = HOUSE_BILL_KEYWORDS + SENATE_BILL_KEYWORDS
+    matched_keyword, matched_keyword_index = None, len(vote_question)
+    for keyword in bill_keywords:
+        if keyword in vote_question:
+            keyword_index = vote_question.index(keyword)
+            if keyword_index < matched_keyword_index:
+                matched_keyword_index = keyword_index
+                matched_keyword = keyword
+    if matched_keyword is None:
+        return None, None
+    i = matched_keyword_index + len(matched_keyword)
+    j = i + 1
+    while j < len(vote_question) and vote_question[i:j].isnumeric():
+        j += 1
+    try:
+        return matched_keyword, int(vote_question[i:j])
+    except ValueError:
+        return None, None
+
+
+def bill_id_from_vote(vote_question):
+    """Bill id (e.g. "hjres22-116") a vote question refers to, or NaN."""
+    kw, n = extract_bill_id_from_vote(vote_question)
+    if kw is None:
+        return np.nan
+    return kw.strip().lower().replace(" ", "").replace(".", "") + str(n) + "-116"
+
+
+def load_topics(chamber):
+    df_topics = pd.read_csv(join(DATA_PATH, f"{chamber}_bills_topics_subjects.tsv"), sep="\t")
+    df_joint_topics = pd.read_csv(join(DATA_PATH, f"{chamber}_joint_subjects_topics.tsv"), sep="\t")
+    # The joint resolution files have the topic and subject columns swapped
+    df_joint_topics = df_joint_topics.rename(columns={"topic": "subject", "subject": "topic"})
+    return pd.concat([df_topics[["bill_id", "topic", "subject"]],
+                      df_joint_topics[["bill_id", "topic", "subject"]]])
+
+
+def load_votes(chamber):
+    df_votes = pd.read_csv(join(DATA_PATH, f"{chamber}_votes.csv"), dtype=str)
+    if chamber == "senate":
+        df_member = pd.read_csv(join(DATA_PATH, "senate_116.csv"))
+        lis2id = dict(zip(df_member["lis_id"], df_member["id"]))
+        member_cols = [col for col in df_votes.columns if col.startswith("vote_S")]
+        unknown = [col for col in member_cols if col.split("_")[-1] not in lis2id]
+        if unknown:
+            print(f"Dropping {len(unknown)} senate vote columns without a bioguide id")
+        df_votes = df_votes.drop(columns=unknown)
+        df_votes = df_votes.rename(columns={
+            col: "vote_" + lis2id[col.split("_")[-1]] for col in member_cols if col not in unknown})
+    return df_votes
+
+
+def prepare_chamber(chamber):
+    df_votes = load_votes(chamber)
+    df_votes["combined_bill_join"] = df_votes["question"].apply(bill_id_from_vote)
+    df_merge = pd.merge(df_votes, load_topics(chamber), how="left",
+                        left_on="combined_bill_join", right_on="bill_id")
+    out_path = join(DATA_PATH, f"{chamber}_data_for_clustering.csv")
+    df_merge.to_csv(out_path, index=False)
+    print(f"{chamber}: {df_merge.shape[0]} rows written to {out_path}")
+
+
+if __name__ == '__main__':
+    # The chambers share nothing, so prepare them side by side
+    with ProcessPoolExecutor(max_workers=len(CHAMBERS)) as executor:
+        list(executor.map(prepare_chamber, CHAMBERS))
@@ -0,0 +1,130 @@
+"""
+Long-format, typed store of cluster assignments.
+
+One row per (member, topic, subject) with the columns
+- member_nid (int32) - node id of the member in nodes.csv
+- topic_id (int32) - node id of the topic in nodes.csv
+- subject_id (int32) - node id of the subject in nodes.csv
+- k (int8) - number of clusters of the subject
+- cluster_id (int8)
+- stability (float16) - consensus stability, NaN if not computed
+
+The rows are partitioned by chamber and topic into one npz file each
+(chamber=<chamber>/topic=<topic_id>.npz). Each chamber's index.csv lists
+every (topic, subject) with its names, k and number of members, so consumers
+can look up what exists and load only the partitions they need. Chambers are
+written independently of each other.
+
+Other directories use this module by adding its directory to sys.path.
+"""
+
+import os
+import numpy as np
+import pandas as pd
+join = os.path.join
+
+COLUMNS = {
+    "member_nid": np.int32,
+    "topic_id": np.int32,
+    "subject_id": np.int32,
+    "k": np.int8,
+    "cluster_id": np.int8,
+    "stability": np.float16,
+}
+INDEX_FILE = "index.csv"
+
+
+def _chamber_path(path, chamber):
+    return join(path, f"chamber={chamber}")
+
+
+def _partition_path(path, chamber, topic_id):
+    return join(_chamber_path(path, chamber), f"topic={topic_id}.npz")
+
+
+def write_cluster_assignments(path, chamber, df, topic_names):
+    """
+    Write df (with the COLUMNS above) as the partition of one chamber,
+    replacing what was there for that chamber.
+
+    Parameters
+    ---
+    path - output directory
+    chamber - "house" or "senate"
+    df - long-format assignments
+    topic_names - dict of topic / subject node id -> name, for the index
+    """
+    chamber_path = _chamber_path(path, chamber)
+    os.makedirs(chamber_path, exist_ok=True)
+    for fname in os.listdir(chamber_path):
+        if fname.startswith("topic=") and fname.endswith(".npz"):
+            os.remove(join(chamber_path, fname))
+
+    df = df.astype(COLUMNS)
+    for topic_id, df_topic in df.groupby("topic_id"):
+        np.savez(_partition_path(path, chamber, topic_id),
+                 **{col: df_topic[col].to_numpy() for col in COLUMNS})
+
+    df_index = df.groupby(["topic_id", "subject_id"]).agg(
+        k=("k", "first"), n_members=("member_nid", "size")).reset_index()
+    df_index.insert(1, "topic", df_index["topic_id"].map(topic_names))
+    df_index.insert(3, "subject", df_index["subject_id"].map(topic_names))
+    df_index.to_csv(join(chamber_path, INDEX_FILE), index=False)
+
+
+def store_mtimes(path):
+    """(file, mtime) of every file of the store, sorted, to tell when it was rewritten"""
+    mtimes = []
+    for dirpath, _, fnames in os.walk(path):
+        for fname in fnames:
+            file_path = join(dirpath, fname)
+            mtimes.append((os.path.relpath(file_path, path), os.stat(file_path).st_mtime_ns))
+    return sorted(mtimes)
+
+
+def load_index(path):
+    """Every (chamber, topic, subject) in the store, with names, k and number of members."""
+    dfs = []
+    for fname in sorted(os.listdir(path)):
+        if fname.startswith("chamber="):
+            df_index = pd.read_csv(join(path, fname, INDEX_FILE))
+            df_index.insert(0, "chamber", fname[len("chamber="):])
+            dfs.append(df_index)
+    return pd.concat(dfs, ignore_index=True)
+
+
+def load_cluster_assignments(path, chambers=None, topics=None, subjects=None):
+    """
+    Load the assignments of the given chambers, topics and/or subjects only.
+
+    Parameters
+    ---
+    path - directory written by write_cluster_assignments
+    chambers - list of chambers to load, None for all
+    topics - list of topic names or ids to load, None for all
+    subjects - list of subject names or ids to keep, None for all
+
+    Returns
+    ---
+    df - long-format assignments with a chamber column and the COLUMNS dtypes
+    """
+    df_index = load_index(path)
+    if chambers is not None:
+        df_index = df_index[df_index["chamber"].isin(chambers)]
+    if topics is not None:
+        df_index = df_index[df_index["topic"].isin(topics) | df_index["topic_id"].isin(topics)]
+    if subjects is not None:
+        df_index = df_index[df_index["subject"].isin(subjects) | df_index["subject_id"].isin(subjects)]
+
+    dfs = []
+    for (chamber, topic_id), df_topic_index in df_index.groupby(["chamber", "topic_id"]):
+        with np.load(_partition_path(path, chamber, topic_id)) as f:
+            df_topic = pd.DataFrame({col: f[col] for col in COLUMNS})
+        df_topic = df_topic[df_topic["subject_id"].isin(df_topic_index["subject_id"])]
+        df_topic.insert(0, "chamber", chamber)
+        dfs.append(df_topic)
+    if not dfs:
+        df = pd.DataFrame({col: np.array([], dtype=dtype) for col, dtype in COLUMNS.items()})
+        df.insert(0, "chamber", pd.Series([], dtype=str))
+        return df
+    return pd.concat(dfs, ignore_index=True)
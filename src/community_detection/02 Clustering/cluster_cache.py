@@ -0,0 +1,61 @@
+"""
+On-disk cache of clustering results, keyed by a fingerprint of the vote
+submatrix that was clustered and the parameters used to cluster it.
+
+Re-running vote_clustering.py after new roll calls are added only changes
+the fingerprint of the subjects those roll calls belong to, so every other
+subject is loaded from here instead of being refit.
+"""
+
+import hashlib
+import json
+import os
+import numpy as np
+
+
+def fingerprint(matrix, params):
+    """
+    Hash a vote submatrix together with the clustering parameters.
+
+    Parameters
+    ---
+    matrix - 2D numpy array that is passed to the clustering model
+    params - JSON-serializable dict of everything else that affects the result
+
+    Returns
+    ---
+    key - hex digest identifying this (matrix, params) combination
+    """
+    matrix = np.ascontiguousarray(matrix)
+    h = hashlib.sha1()
+    h.update(json.dumps(params, sort_keys=True).encode())
+    h.update(str(matrix.dtype).encode())
+    h.update(str(matrix.shape).encode())
+    h.update(matrix.tobytes())
+    return h.hexdigest()
+
+
+def load(cache_dir, key):
+    """
+    Returns the cached result for key as a dict of numpy arrays,
+    or None if it has not been computed yet.
+    """
+    path = os.path.join(cache_dir, key + ".npz")
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as f:
+        return {k: f[k] for k in f.files}
+
+
+def save(cache_dir, key, **arrays):
+    """
+    Store the arrays of a clustering result under key.
+
+    The file is written under a temporary name first so that an interrupted
+    run never leaves a truncated entry behind.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    path = os.path.join(cache_dir, key + ".npz")
+    tmp_path = os.path.join(cache_dir, key + ".tmp.npz")
+    np.savez(tmp_path, **arrays)
+    os.replace(tmp_path, path)
@@ -0,0 +1,88 @@
+"""
+Seed-ensemble consensus clustering.
+
+Runs n_runs single-seed k-modes fits of the same subject in parallel and
+accumulates how often every pair of members lands in the same cluster. The
+final partition is the run that agrees best with that co-assignment matrix,
+and each member's stability is its mean co-assignment rate with the other
+members of its final cluster (1 = always together, across every seed), or,
+for a member alone in its final cluster, the share of runs it was alone in.
+
+The vote matrix is encoded and bit-packed once and shared by all runs, and
+each worker reuses one FastKModes instance (and so its scratch buffers) for
+all of its runs.
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import numpy as np
+from fast_kmodes import FastKModes, encode
+
+
+def _run_seeds(encoded, n_clusters, seeds, batch_size):
+    """Fit one single-init model per seed, reusing one engine; returns (len(seeds), n_members) labels."""
+    kmodes = FastKModes(n_clusters=n_clusters, init="Huang", n_init=1, batch_size=batch_size)
+    labels = np.empty((len(seeds), encoded[1].shape[0]), dtype=np.uint16)
+    for i, seed in enumerate(seeds):
+        kmodes.random_state = int(seed)
+        labels[i] = kmodes.fit_encoded(*encoded).labels_
+    return labels
+
+
+def _co_assignment(labels, out):
+    """Add the same-cluster indicator of every run in labels to out."""
+    for run_labels in labels:
+        out += run_labels[:, None] == run_labels[None, :]
+
+
+def consensus_fit(X, n_clusters, n_runs=50, random_state=0, n_jobs=-1, batch_size=None):
+    """
+    Parameters
+    ---
+    X - (n_members, n_votes) vote matrix
+    n_clusters - number of clusters of every run
+    n_runs - number of seeded runs
+    random_state - seed from which the seeds of the runs are drawn
+    n_jobs - number of worker threads, -1 for one per CPU
+    batch_size - passed on to FastKModes
+
+    Returns
+    ---
+    labels - (n_members,) final cluster labels
+    stability - (n_members,) float in [0, 1]
+    consensus - (n_members, n_members) float32 co-assignment rate
+    """
+    encoded = encode(X)
+    n_members = encoded[1].shape[0]
+    seeds = np.random.RandomState(random_state).randint(np.iinfo(np.int32).max, size=n_runs)
+    if n_jobs == -1:
+        n_jobs = os.cpu_count() or 1
+    n_jobs = max(1, min(n_jobs, n_runs))
+
+    co_counts = np.zeros((n_members, n_members), dtype=np.uint16)
+    all_labels = np.empty((n_runs, n_members), dtype=np.uint16)
+    chunks = np.array_split(np.arange(n_runs), n_jobs)
+    with ThreadPoolExecutor(max_workers=n_jobs) as executor:
+        futures = {executor.submit(_run_seeds, encoded, n_clusters, seeds[chunk], batch_size): chunk
+                   for chunk in chunks if len(chunk)}
+        # Accumulate as each worker finishes instead of waiting for all of them
+        for future in as_completed(futures):
+            labels = future.result()
+            all_labels[futures[future]] = labels
+            _co_assignment(labels, co_counts)
+
+    consensus = co_counts.astype(np.float32) / n_runs
+    # Pick the run whose partition agrees most with the consensus:
+    # reward pairs it keeps together that usually are together, and vice versa
+    weights = 2 * consensus - 1
+    scores = [np.sum(weights[run_labels[:, None] == run_labels[None, :]]) for run_labels in all_labels]
+    labels = all_labels[int(np.argmax(scores))]
+
+    same = labels[:, None] == labels[None, :]
+    np.fill_diagonal(same, False)
+    n_same = same.sum(axis=1)
+    # A member alone in its final cluster has no co-assignment rate; its stability
+    # is instead the share of runs in which it was alone too
+    alone = np.array([np.bincount(run_labels)[run_labels] == 1 for run_labels in all_labels]).mean(axis=0)
+    stability = np.where(n_same > 0, (consensus * same).sum(axis=1) / np.maximum(n_same, 1), alone)
+    return labels, stability, consensus
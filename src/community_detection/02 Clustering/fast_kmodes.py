@@ -0,0 +1,387 @@
+"""
+Vectorized k-modes clustering for the int8 vote encoding used by
+vote_clustering.py (Yea = 1, Nay = -1, Present / Not Voting = 0, missing = 2).
+
+Each category value gets its own bit plane (np.packbits of X == value), so
+the number of attributes a member shares with a centroid is the popcount of
+the AND of the two planes, summed over the categories. Mismatch counts
+(simple matching dissimilarity, as in kmodes.KModes) are then
+n_attrs - matches. The cluster attribute counts are kept in one
+(n_clusters, n_attrs, n_categories) array, filled with np.bincount, instead
+of per-point frequency dictionaries.
+
+The fit is kmodes' algorithm step for step: Huang initialisation (same
+random stream, same "closest unique point" replacement), then iterations
+that move one point at a time to its closest centroid and update the modes
+of the two clusters involved right away, with the same tie-breaking and the
+same reseeding of emptied clusters. A given random_state therefore gives the
+labels_, centroids and cost of KModes with the same parameters. Only the
+mini-batch mode (batch_size) differs: it updates the modes once per batch.
+"""
+
+import numpy as np
+
+# Number of set bits for every possible byte value
+POPCOUNT_TABLE = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def pack_planes(codes, n_categories):
+    """
+    One-hot bit-pack an encoded matrix.
+
+    Parameters
+    ---
+    codes - (n_rows, n_attrs) integer array of category codes in [0, n_categories)
+    n_categories - number of distinct category codes
+
+    Returns
+    ---
+    planes - (n_categories, n_rows, ceil(n_attrs / 8)) uint8 array
+    """
+    return np.stack([np.packbits(codes == c, axis=1) for c in range(n_categories)])
+
+
+def count_matches(planes_a, planes_b, out=None, work=None):
+    """
+    Number of attributes on which each row of a agrees with each row of b.
+
+    Parameters
+    ---
+    planes_a - (n_categories, n_a, n_bytes) packed planes
+    planes_b - (n_categories, n_b, n_bytes) packed planes
+    out - optional (n_a, n_b) int32 array to write the result into
+    work - optional (n_a, n_b, n_bytes) uint8 scratch array, so repeated
+        calls with the same shapes do not allocate
+
+    Returns
+    ---
+    matches - (n_a, n_b) int32 array
+    """
+    n_a, n_b, n_bytes = planes_a.shape[1], planes_b.shape[1], planes_a.shape[2]
+    if out is None:
+        out = np.zeros((n_a, n_b), dtype=np.int32)
+    else:
+        out[:] = 0
+    if work is None:
+        work = np.empty((n_a, n_b, n_bytes), dtype=np.uint8)
+    for plane_a, plane_b in zip(planes_a, planes_b):
+        np.bitwise_and(plane_a[:, None, :], plane_b[None, :, :], out=work)
+        np.take(POPCOUNT_TABLE, work, out=work)
+        out += work.sum(axis=2, dtype=np.int32)
+    return out
+
+
+def hamming_distances(planes_a, planes_b, n_attrs, block_size=256):
+    """
+    Pairwise mismatch counts between the rows of a and b, computed in row
+    blocks of a so that the (block, n_b, n_bytes) intermediate stays small.
+    """
+    n_a, n_b = planes_a.shape[1], planes_b.shape[1]
+    dist = np.empty((n_a, n_b), dtype=np.int32)
+    for start in range(0, n_a, block_size):
+        stop = min(start + block_size, n_a)
+        dist[start:stop] = n_attrs - count_matches(planes_a[:, start:stop], planes_b)
+    return dist
+
+
+def column_modes(codes, labels, n_clusters, n_categories):
+    """
+    Per-cluster, per-attribute category counts and the resulting modes.
+
+    Ties are broken towards the smallest category code, as in kmodes'
+    get_max_value_key.
+
+    Returns
+    ---
+    modes - (n_clusters, n_attrs) array of category codes
+    counts - (n_clusters, n_attrs, n_categories) int64 array
+    """
+    n_attrs = codes.shape[1]
+    # Flatten (cluster, attribute, category) into one index and count once
+    flat = (labels[:, None].astype(np.int64) * n_attrs + np.arange(n_attrs)) * n_categories + codes
+    counts = np.bincount(flat.ravel(), minlength=n_clusters * n_attrs * n_categories)
+    counts = counts.reshape(n_clusters, n_attrs, n_categories)
+    return counts.argmax(axis=2), counts
+
+
+def init_huang(codes, n_clusters, random_state):
+    """
+    Initialize centroids according to method by Huang [1997], drawing from
+    random_state in the same order as kmodes.util.init_methods.init_huang.
+    """
+    n_points, n_attrs = codes.shape
+    centroids = np.empty((n_clusters, n_attrs), dtype=codes.dtype)
+    sorted_codes = np.sort(codes, axis=0)
+    for iattr in range(n_attrs):
+        centroids[:, iattr] = random_state.choice(sorted_codes[:, iattr], n_clusters)
+    # The sampled centroids could result in empty clusters,
+    # so set each centroid to the closest point, unique if possible.
+    for ik in range(n_clusters):
+        ndx = np.argsort(np.sum(codes != centroids[ik], axis=1))
+        while np.all(codes[ndx[0]] == centroids, axis=1).any() and ndx.shape[0] > 1:
+            ndx = np.delete(ndx, 0)
+        centroids[ik] = codes[ndx[0]]
+    return centroids
+
+
+def unique_rows(codes):
+    """
+    The distinct rows of codes, in the order kmodes.util.get_unique_rows lists them.
+    kmodes encodes every column on its own, and the order of its set of rows depends
+    on those codes, so the rows are keyed the same way here.
+    """
+    column_codes = np.column_stack([np.unique(column, return_inverse=True)[1] for column in codes.T])
+    keys = [tuple(row) for row in column_codes.tolist()]
+    rows = {}
+    for key, row in zip(keys, codes):
+        rows.setdefault(key, row)
+    return np.array([rows[key] for key in {key for key in keys}])
+
+
+def _move_point(point, to_clust, from_clust, counts, centroids, attrs):
+    """
+    Move a point between clusters and update both modes in place, as kmodes' _move_point_cat:
+    a value takes over the new cluster's mode once it is strictly more frequent, and the old
+    cluster's mode is recomputed (ties to the smallest code) where it was the point's value
+    """
+    counts[to_clust, attrs, point] += 1
+    takes_over = counts[to_clust, attrs, point] > counts[to_clust, attrs, centroids[to_clust]]
+    centroids[to_clust, takes_over] = point[takes_over]
+    counts[from_clust, attrs, point] -= 1
+    stale = centroids[from_clust] == point
+    centroids[from_clust, stale] = counts[from_clust, attrs[stale]].argmax(axis=1)
+
+
+def encode(X):
+    """
+    Encode a categorical matrix for FastKModes.fit_encoded.
+
+    Returns
+    ---
+    categories - sorted distinct values of X
+    codes - int8 array of the same shape as X, indexes into categories
+    planes - bit planes of codes, see pack_planes
+    """
+    X = np.asarray(X)
+    categories, codes = np.unique(X, return_inverse=True)
+    codes = codes.reshape(X.shape).astype(np.int8)
+    return categories, codes, pack_planes(codes, len(categories))
+
+
+def partition_modes(X, labels, n_clusters):
+    """
+    Centroids and cost of a given partition of X, e.g. a consensus one no single fit produced.
+
+    Returns
+    ---
+    centroids - (n_clusters, n_attrs) array of the modes of every cluster, in the values of X
+    cost - sum of the dissimilarities of every point to the mode of its cluster
+    """
+    categories, codes, _ = encode(X)
+    modes, counts = column_modes(codes, np.asarray(labels), n_clusters, len(categories))
+    # Every point matches its mode wherever it has the modal value
+    matches = np.take_along_axis(counts, modes[:, :, None], axis=2).sum()
+    return categories[modes], float(codes.size - matches)
+
+
+class FastKModes:
+    """
+    k-modes clustering for categorical data with vectorized dissimilarities.
+
+    Mirrors the parts of the kmodes.KModes interface used in this repo:
+    fit / fit_predict / predict and the labels_, cluster_centroids_, cost_
+    and n_iter_ attributes.
+
+    Parameters
+    ---
+    n_clusters - number of clusters
+    max_iter - maximum number of iterations of a single run
+    init - 'Huang', 'random' or an (n_clusters, n_attrs) array of centroids
+        given in the original (unencoded) values
+    n_init - number of runs with different seeds; the lowest cost run is kept
+    random_state - int, np.random.RandomState or None
+    batch_size - if set, centroids are fitted on random mini-batches of this
+        many points per iteration, and all points are assigned at the end;
+        the result then no longer matches KModes
+
+    Scratch buffers are kept on the instance between fits, so reusing one
+    instance for many fits of same-sized data does not reallocate them.
+    """
+
+    def __init__(self, n_clusters=8, max_iter=100, init="Huang", n_init=10,
+                 random_state=None, batch_size=None):
+        self.n_clusters = n_clusters
+        self.max_iter = max_iter
+        self.init = init
+        self.n_init = n_init
+        self.random_state = random_state
+        self.batch_size = batch_size
+        self._work = {}
+        if hasattr(init, "__array__"):
+            # Deterministic initialisation, no point in several runs
+            self.n_init = 1
+
+    def fit(self, X, y=None):
+        return self.fit_encoded(*encode(X))
+
+    def fit_encoded(self, categories, codes, planes):
+        """
+        Fit on a matrix that was already encoded with encode(), so that several
+        fits of the same data (e.g. seeded restarts) only encode it once.
+        """
+        n_points = codes.shape[0]
+        assert self.n_clusters <= n_points, \
+            f"Cannot have more clusters ({self.n_clusters}) than data points ({n_points})."
+        self._categories = categories
+
+        random_state = np.random.RandomState(self.random_state) \
+            if not isinstance(self.random_state, np.random.RandomState) else self.random_state
+        unique = unique_rows(codes)
+        if len(unique) <= self.n_clusters:
+            # As in kmodes, every distinct row is a cluster of its own (its one seed is still drawn)
+            random_state.randint(np.iinfo(np.int32).max, size=1)
+            self._enc_centroids = unique
+            self.labels_, self.cost_ = self._labels_cost(planes, codes.shape[1])
+            self.n_iter_ = 0
+            return self
+        seeds = random_state.randint(np.iinfo(np.int32).max, size=self.n_init)
+        best = None
+        for seed in seeds:
+            result = self._fit_single(codes, planes, np.random.RandomState(seed))
+            if best is None or result[2] < best[2]:
+                best = result
+        self._enc_centroids, self.labels_, self.cost_, self.n_iter_ = best
+        return self
+
+    def fit_predict(self, X, y=None):
+        return self.fit(X).labels_
+
+    def predict(self, X):
+        assert hasattr(self, "_enc_centroids"), "Model not yet fitted."
+        X = np.asarray(X)
+        # Values never seen during fit cannot match any centroid
+        codes = np.searchsorted(self._categories, X).clip(0, len(self._categories) - 1)
+        codes[self._categories[codes] != X] = len(self._categories)
+        labels, _ = self._labels_cost(pack_planes(codes, len(self._categories)), X.shape[1])
+        return labels
+
+    @property
+    def cluster_centroids_(self):
+        if hasattr(self, "_enc_centroids"):
+            return self._categories[self._enc_centroids]
+        raise AttributeError("'FastKModes' object has no attribute 'cluster_centroids_' "
+                             "because the model is not yet fitted.")
+
+    def _count_matches(self, planes_a, planes_b):
+        shape = (planes_a.shape[1], planes_b.shape[1], planes_a.shape[2])
+        if shape not in self._work:
+            self._work[shape] = (np.empty(shape[:2], dtype=np.int32), np.empty(shape, dtype=np.uint8))
+        out, work = self._work[shape]
+        return count_matches(planes_a, planes_b, out=out, work=work)
+
+    def _initial_centroids(self, codes, random_state):
+        n_points = codes.shape[0]
+        if hasattr(self.init, "__array__"):
+            init = np.asarray(self.init)
+            assert init.shape == (self.n_clusters, codes.shape[1]), \
+                f"Wrong shape of initial centroids in init {init.shape}."
+            return np.searchsorted(self._categories, init).astype(codes.dtype)
+        if self.init.lower() == "huang":
+            return init_huang(codes, self.n_clusters, random_state)
+        if self.init.lower() == "random":
+            return codes[random_state.choice(range(n_points), self.n_clusters)]
+        raise ValueError(f"Unknown init method {self.init!r}")
+
+    def _labels_cost(self, planes, n_attrs, centroid_planes=None):
+        if centroid_planes is None:
+            centroid_planes = pack_planes(self._enc_centroids, len(self._categories))
+        dist = n_attrs - self._count_matches(planes, centroid_planes)
+        labels = dist.argmin(axis=1)
+        cost = float(dist[np.arange(len(labels)), labels].sum())
+        return labels.astype(np.uint16), cost
+
+    def _fit_single(self, codes, planes, random_state):
+        """One run of k-modes, as kmodes.kmodes._k_modes_single"""
+        n_points, n_attrs = codes.shape
+        if self.batch_size is not None and self.batch_size < n_points:
+            return self._fit_single_batches(codes, planes, random_state)
+        n_categories = len(self._categories)
+        centroids = self._initial_centroids(codes, random_state)
+
+        # Assign every point to its closest initial centroid, then move the centroids to the modes
+        membership, _ = self._labels_cost(planes, n_attrs, pack_planes(centroids, n_categories))
+        membership = membership.astype(np.int64)
+        modes, counts = column_modes(codes, membership, self.n_clusters, n_categories)
+        sizes = np.bincount(membership, minlength=self.n_clusters)
+        centroids = modes.astype(codes.dtype)
+        for ik in np.flatnonzero(sizes == 0):
+            # An empty cluster gets random values, drawn in kmodes' order
+            for iattr in range(n_attrs):
+                centroids[ik, iattr] = random_state.choice(codes[:, iattr])
+
+        _, cost = self._labels_cost(planes, n_attrs, pack_planes(centroids, n_categories))
+        attrs = np.arange(n_attrs)
+        itr = 0
+        while itr < self.max_iter:
+            itr += 1
+            moves = 0
+            for ipoint in range(n_points):
+                point = codes[ipoint]
+                clust = int(np.count_nonzero(centroids != point, axis=1).argmin())
+                old_clust = membership[ipoint]
+                if clust == old_clust:
+                    continue
+                moves += 1
+                _move_point(point, clust, old_clust, counts, centroids, attrs)
+                membership[ipoint] = clust
+                sizes[clust] += 1
+                sizes[old_clust] -= 1
+                if sizes[old_clust] == 0:
+                    # Reseed the emptied cluster with a random point of the largest one
+                    from_clust = int(sizes.argmax())
+                    rindx = random_state.choice(np.flatnonzero(membership == from_clust))
+                    _move_point(codes[rindx], old_clust, from_clust, counts, centroids, attrs)
+                    membership[rindx] = old_clust
+                    sizes[old_clust] += 1
+                    sizes[from_clust] -= 1
+            _, new_cost = self._labels_cost(planes, n_attrs, pack_planes(centroids, n_categories))
+            converged = moves == 0 or new_cost >= cost
+            cost = new_cost
+            if converged:
+                break
+
+        self._enc_centroids = centroids
+        labels, cost = self._labels_cost(planes, n_attrs)
+        return centroids, labels, cost, itr
+
+    def _fit_single_batches(self, codes, planes, random_state):
+        """One run on mini-batches: the modes are updated once per batch from the accumulated counts"""
+        n_points, n_attrs = codes.shape
+        n_categories = len(self._categories)
+        centroids = self._initial_centroids(codes, random_state)
+
+        itr = 0
+        counts = None
+        while itr < self.max_iter:
+            itr += 1
+            batch = random_state.choice(n_points, self.batch_size, replace=False)
+            dist = n_attrs - self._count_matches(planes[:, batch], pack_planes(centroids, n_categories))
+            batch_labels = dist.argmin(axis=1)
+
+            # Accumulate counts over all batches seen so far
+            _, batch_counts = column_modes(codes[batch], batch_labels, self.n_clusters, n_categories)
+            counts = batch_counts if counts is None else counts + batch_counts
+            new_centroids = counts.argmax(axis=2).astype(codes.dtype)
+
+            # In case of an empty cluster, reinitialize with a random point
+            empty = counts[:, 0, :].sum(axis=1) == 0
+            for ik in np.flatnonzero(empty):
+                new_centroids[ik] = codes[random_state.randint(n_points)]
+
+            if np.array_equal(new_centroids, centroids):
+                break
+            centroids = new_centroids
+
+        self._enc_centroids = centroids
+        labels, cost = self._labels_cost(planes, n_attrs)
+        return centroids, labels, cost, itr
@@ -0,0 +1,115 @@
+"""
+Choose the number of clusters per subject by sweeping k.
+
+The pairwise member Hamming matrix is computed once per subject and reused
+to score every k, and each k is warm-started from the centroids of the
+previous k plus the members that were worst served by them, one per added
+cluster, so the sweep costs little more than a single fit per k.
+"""
+
+import numpy as np
+from fast_kmodes import FastKModes, pack_planes, hamming_distances
+
+
+def pairwise_hamming(X):
+    """
+    Returns the (n_members, n_members) matrix of vote mismatch counts.
+    """
+    categories, codes = np.unique(X, return_inverse=True)
+    codes = codes.reshape(X.shape)
+    planes = pack_planes(codes, len(categories))
+    return hamming_distances(planes, planes, X.shape[1])
+
+
+def silhouette(dist, labels):
+    """
+    Mean silhouette coefficient of a labelling, given precomputed distances.
+
+    Members of singleton clusters get a silhouette of 0, as in scikit-learn.
+    """
+    cluster_ids, labels = np.unique(labels, return_inverse=True)
+    n_clusters = len(cluster_ids)
+    if n_clusters < 2:
+        return 0.0
+    onehot = np.zeros((len(labels), n_clusters))
+    onehot[np.arange(len(labels)), labels] = 1
+    sizes = onehot.sum(axis=0)
+    # Summed distance from every member to every cluster
+    dist_sums = dist @ onehot
+    own_size = sizes[labels]
+    a = dist_sums[np.arange(len(labels)), labels] / np.maximum(own_size - 1, 1)
+    mean_to_other = dist_sums / sizes
+    mean_to_other[np.arange(len(labels)), labels] = np.inf
+    b = mean_to_other.min(axis=1)
+    s = (b - a) / np.maximum(np.maximum(a, b), 1e-12)
+    s[own_size == 1] = 0
+    return float(s.mean())
+
+
+def elbow(k_values, costs):
+    """
+    Returns the k at the elbow of the cost curve: the point furthest from the
+    straight line between the first and last (k, cost) points.
+    """
+    k_values = np.asarray(k_values, dtype=float)
+    costs = np.asarray(costs, dtype=float)
+    if len(k_values) < 3:
+        return int(k_values[0])
+    # Normalize both axes so that the distance is scale-free
+    x = (k_values - k_values[0]) / (k_values[-1] - k_values[0])
+    span = costs[0] - costs[-1]
+    y = (costs - costs[-1]) / span if span > 0 else np.zeros_like(costs)
+    # Distance to the line from (0, 1) to (1, 0)
+    d = np.abs(x + y - 1) / np.sqrt(2)
+    return int(k_values[np.argmax(d)])
+
+
+def sweep_k(X, k_values, method="silhouette", random_state=0, batch_size=None):
+    """
+    Fit k-modes for every k in k_values and choose one.
+
+    Parameters
+    ---
+    X - (n_members, n_votes) vote matrix
+    k_values - increasing sequence of cluster counts to try
+    method - 'silhouette' (highest mean silhouette) or 'elbow' (cost curve elbow)
+    random_state - seed of the Huang initialisation of the smallest k
+    batch_size - passed on to FastKModes
+
+    Returns
+    ---
+    best - the fitted FastKModes model for the chosen k
+    scores - dict with lists 'k', 'cost' and 'silhouette', one entry per k
+    """
+    k_values = [k for k in sorted(k_values) if k <= X.shape[0]]
+    dist = pairwise_hamming(X)
+    models, scores = {}, {"k": [], "cost": [], "silhouette": []}
+    prev = None
+    for k in k_values:
+        if prev is None:
+            model = FastKModes(n_clusters=k, init="Huang", random_state=random_state,
+                               batch_size=batch_size)
+        else:
+            # Warm start: keep the previous centroids and seed each new one with
+            # the next distinct member furthest from its current centroid
+            centroids = prev.cluster_centroids_
+            member_cost = np.sum(X != centroids[prev.labels_], axis=1)
+            worst = np.argsort(-member_cost, kind="stable")
+            _, first = np.unique(X[worst], axis=0, return_index=True)
+            init = np.vstack([centroids, X[worst[np.sort(first)][:k - len(centroids)]]])
+            model = FastKModes(n_clusters=k, init=init, random_state=random_state,
+                               batch_size=batch_size)
+        model.fit(X)
+        models[k] = model
+        scores["k"].append(k)
+        scores["cost"].append(model.cost_)
+        scores["silhouette"].append(silhouette(dist, model.labels_))
+        prev = model
+
+    if method == "silhouette":
+        best_k = scores["k"][int(np.argmax(scores["silhouette"]))]
+    elif method == "elbow":
+        best_k = elbow(scores["k"], scores["cost"])
+    else:
+        raise ValueError(f"Unknown k selection method: {method}")
+    return models[best_k], scores
@@ -1,44 +1,152 @@
 import pandas as pd
 import numpy as np
-from kmodes.kmodes import KModes
-
-df = pd.read_csv('House_Data_For_Clustering v01.csv')
-df.replace("Yea",1,inplace=True)
-df.replace("Nay",-1,inplace=True)
-df.replace("Present",0,inplace=True)
-df.replace("Not Voting",0,inplace=True)
-df.fillna(2,inplace=True)
-
-cat_cols = ['bill_id','topic', 'subject'] + [i for i in df.columns if 'vote' in i]
-df_cat = df[cat_cols]
-
-topics_list = ['Government operations and politics','Finance and financial sector',\
-'Economics and public finance','Armed forces and national security','Health']
-topic_subject_dict = {}
-
-for topic in topics_list:
-    top_10_subs = list(df_cat[df_cat['topic'] == topic].groupby(['subject'])['bill_id'].nunique().reset_index().sort_values('bill_id',ascending=False).reset_index().loc[:9,'subject'].values)
-    topic_subject_dict[topic] = top_10_subs
-
-fin_cluster_df = pd.DataFrame({'voters':list(df_cat.columns)[4:]})
-for topic in topic_subject_dict.keys():
-    for subject in topic_subject_dict[topic]:
-#         print(topic,':',subject)
-        df_filter = df_cat[(df_cat['topic']==topic)&(df_cat['subject']==subject)]
-        dfMatrix = df_filter.iloc[:,4:].to_numpy().T
-        kmodes = KModes(n_jobs = -1, n_clusters = 3, init = 'Huang', random_state = 0)
-        kmodes.fit_predict(dfMatrix)
-        
-        df_cat_transposed = df_filter.iloc[:,3:].T
-        df_cat_transposed.columns=df_cat_transposed.iloc[0]
-        df_cat_transposed = df_cat_transposed.iloc[1:]
-
-        # Add the cluster to the dataframe
-        colname= "_".join([topic,subject,'cluster'])
-        df_cat_transposed[colname] = kmodes.labels_
-        cluster_df = df_cat_transposed[[colname]].reset_index
-        fin_cluster_df = pd.concat([fin_cluster_df,cluster_df],axis=1)
-
-fin_cluster_df = fin_cluster_df.loc['vote_A000374':,:]
-fin_cluster_df['voters'] = fin_cluster_df.index
-fin_cluster_df.to_csv('voter_clusters.csv',index=False)
\ No newline at end of file
+from concurrent.futures import ProcessPoolExecutor
+import os
+from fast_kmodes import FastKModes, partition_modes
+from select_k import sweep_k
+from consensus_clustering import consensus_fit
+import cluster_cache
+from cluster_assignments import COLUMNS, write_cluster_assignments
+
+# Set to an int to fit centroids on random mini-batches of members
+BATCH_SIZE = None
+# Subjects with fewer distinct roll calls than this are not clustered
+MIN_VOTES = 5
+DATA_PATH = os.environ.get("REPG_DATA_ROOT", "../../../data")
+# Fits by fingerprint of their votes and parameters, kept with the data; REPG_CLUSTER_CACHE
+# points elsewhere, e.g. an empty directory to time the clustering without the cache
+CACHE_DIR = os.environ.get("REPG_CLUSTER_CACHE", os.path.join(DATA_PATH, "cache", "clusters"))
+# Part of the cache key; bump it when the arrays stored per fit change, so older entries
+# are refit instead of read (2: with the scores of every k tried; 3: k-modes moving one
+# member at a time, and the centroids and cost of the consensus partition)
+CACHE_FORMAT = 3
+NODE_PATH = os.path.join(DATA_PATH, "nodes.csv")
+ASSIGNMENTS_PATH = os.path.join(DATA_PATH, "cluster_assignments")
+# Each chamber is an independent partition, clustered in its own process
+CHAMBERS = ["house", "senate"]
+N_CLUSTERS = 3
+# None clusters every subject into N_CLUSTERS; 'silhouette' or 'elbow'
+# instead picks the number of clusters per subject from K_RANGE
+K_SELECTION = None
+K_RANGE = range(2, 9)
+# With more than one run, every subject is refit with N_RUNS seeds and the
+# consensus partition and per-member stability are reported
+N_RUNS = 1
+N_JOBS = -1
+
+def cluster_chamber(chamber):
+    """
+    Cluster every subject with enough votes in one chamber and write the
+    chamber's partition of the cluster assignment store.
+    """
+    df = pd.read_csv(os.path.join(DATA_PATH, f'{chamber}_data_for_clustering.csv'))
+    df.replace("Yea",1,inplace=True)
+    df.replace("Nay",-1,inplace=True)
+    df.replace("Present",0,inplace=True)
+    df.replace("Not Voting",0,inplace=True)
+    df.fillna(2,inplace=True)
+
+    cat_cols = ['bill_id','topic', 'subject'] + [i for i in df.columns if 'vote' in i]
+    df_cat = df[cat_cols]
+    df_cat = df_cat[(df_cat['topic'] != 2) & (df_cat['subject'] != 2)]  # votes not matched to a bill
+    voters = list(df_cat.columns)[4:]
+
+    # Assignments are stored by graph node id
+    df_node = pd.read_csv(NODE_PATH)
+    df_node_topic = df_node[df_node["ntype"] == "topic"]
+    topic_nids = dict(zip(df_node_topic["nname"], df_node_topic["nid"]))
+    df_node_member = df_node[df_node["ntype"] == "member"]
+    member_nids = dict(zip(df_node_member["nname"], df_node_member["nid"]))
+    voter_nids = np.array([member_nids.get(v.split("_")[-1], -1) for v in voters])
+    known_voters = voter_nids >= 0  # members missing from the graph are dropped
+
+    # Cluster every (topic, subject) with enough votes
+    vote_counts = df_cat.groupby(['topic','subject'])['vote_id'].nunique()
+    topic_subjects = set(vote_counts[vote_counts >= MIN_VOTES].index)
+
+    params = {'init': 'Huang', 'random_state': 0, 'batch_size': BATCH_SIZE, 'cache_format': CACHE_FORMAT}
+    if K_SELECTION is None:
+        params['n_clusters'] = N_CLUSTERS
+    else:
+        params['k_selection'] = K_SELECTION
+        params['k_range'] = list(K_RANGE)
+    if N_RUNS > 1:
+        params['n_runs'] = N_RUNS
+    n_cached = 0
+    assignments = []
+    k_scores = {'topic': [], 'subject': [], 'k': [], 'cost': [], 'silhouette': [], 'chosen': []}
+    for (topic, subject), df_filter in df_cat.groupby(['topic','subject']):
+        if (topic, subject) not in topic_subjects:
+            continue
+        # Sort by vote so that the fingerprint only changes when the votes do
+        df_filter = df_filter.drop_duplicates(subset='vote_id').sort_values('vote_id')
+        dfMatrix = df_filter.iloc[:,4:].to_numpy().T.astype(np.int8)
+
+        key = cluster_cache.fingerprint(dfMatrix, params)
+        cached = cluster_cache.load(CACHE_DIR, key)
+        if cached is None:
+            if K_SELECTION is not None:
+                kmodes, scores = sweep_k(dfMatrix, K_RANGE, method = K_SELECTION,
+                                         random_state = params['random_state'], batch_size = params['batch_size'])
+            elif N_RUNS == 1:
+                kmodes = FastKModes(n_clusters = params['n_clusters'], init = params['init'],
+                                    random_state = params['random_state'], batch_size = params['batch_size'])
+                kmodes.fit_predict(dfMatrix)
+                scores = {'k': [kmodes.n_clusters], 'cost': [kmodes.cost_], 'silhouette': [np.nan]}
+            if N_RUNS == 1:
+                cached = {'labels': kmodes.labels_, 'centroids': kmodes.cluster_centroids_,
+                          'cost': kmodes.cost_, 'k': kmodes.n_clusters}
+            else:
+                # The consensus runs are the fit: no single fit besides the k sweep,
+                # and the centroids and cost are those of the consensus partition
+                k = kmodes.n_clusters if K_SELECTION is not None else params['n_clusters']
+                labels, stability, _ = consensus_fit(
+                    dfMatrix, k, n_runs = N_RUNS, random_state = params['random_state'],
+                    n_jobs = N_JOBS, batch_size = params['batch_size'])
+                centroids, cost = partition_modes(dfMatrix, labels, k)
+                cached = {'labels': labels, 'stability': stability, 'centroids': centroids, 'cost': cost, 'k': k}
+                if K_SELECTION is None:
+                    scores = {'k': [k], 'cost': [cost], 'silhouette': [np.nan]}
+            cached.update(k_values = scores['k'], k_costs = scores['cost'], k_silhouettes = scores['silhouette'])
+            cluster_cache.save(CACHE_DIR, key, **cached)
+        else:
+            n_cached += 1
+        labels = cached['labels']
+
+        # Record the score of every k that was tried
+        for k, cost, sil in zip(cached['k_values'], cached['k_costs'], cached['k_silhouettes']):
+            k_scores['topic'].append(topic)
+            k_scores['subject'].append(subject)
+            k_scores['k'].append(int(k))
+            k_scores['cost'].append(float(cost))
+            k_scores['silhouette'].append(float(sil))
+            k_scores['chosen'].append(int(k) == int(cached['k']))
+
+        topic_id, subject_id = topic_nids.get(topic.strip()), topic_nids.get(subject.strip())
+        if topic_id is None or subject_id is None:
+            print(f"Skipping {topic}: {subject}, not a topic in the graph")
+            continue
+        stability = cached['stability'] if 'stability' in cached else np.full(len(labels), np.nan)
+        assignments.append(pd.DataFrame({
+            'member_nid': voter_nids[known_voters],
+            'topic_id': topic_id,
+            'subject_id': subject_id,
+            'k': int(cached['k']),
+            'cluster_id': labels[known_voters],
+            'stability': stability[known_voters]}))
+
+    print(f"{chamber}: clustered {len(topic_subjects)} subjects ({n_cached} from cache)")
+    if assignments:
+        df_assignments = pd.concat(assignments, ignore_index=True)
+    else:
+        # Still replace the chamber's partition, so no clusters of an earlier run are left behind
+        print(f"{chamber}: no subject has {MIN_VOTES} votes or more, writing an empty partition")
+        df_assignments = pd.DataFrame({col: np.array([], dtype=dtype) for col, dtype in COLUMNS.items()})
+    write_cluster_assignments(ASSIGNMENTS_PATH, chamber, df_assignments,
+                              {nid: name for name, nid in topic_nids.items()})
+    pd.DataFrame(k_scores).to_csv(os.path.join(DATA_PATH, f'{chamber}_cluster_k_selection.csv'),index=False)
+
+
+if __name__ == '__main__':
+    with ProcessPoolExecutor(max_workers=len(CHAMBERS)) as executor:
+        list(executor.map(cluster_chamber, CHAMBERS))
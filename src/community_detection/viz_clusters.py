@@ -0,0 +1,48 @@
+"""
+Script version of "cluster_size_calculation2.ipynb".
+
+Colors every cluster of results/q1_party_distribution.csv by its share of
+Republican members, from the bluest (most Democratic) to the reddest (most
+Republican) of PARTY_COLORS, and writes the clusters with their size and
+color to clusters/viz_clusters.csv, the cluster table read by the app.
+
+Run from this directory:
+    python viz_clusters.py
+"""
+
+import os
+import pandas as pd
+join = os.path.join
+
+DATA_PATH = os.environ.get("REPG_DATA_ROOT", "../../data")
+PARTY_DISTRIBUTION_PATH = join(DATA_PATH, "results", "q1_party_distribution.csv")
+VIZ_CLUSTERS_PATH = join(DATA_PATH, "clusters", "viz_clusters.csv")
+PARTIES = ["D", "I", "ID", "R"]
+PARTY_COLORS = ["#092573", "#250973", "#500973", "#730950", "#8f0303"]
+
+
+def cluster_colors(cluster_df):
+    """
+    Parameters
+    ---
+    cluster_df - one row per cluster, with one column of member counts per party
+
+    Returns
+    ---
+    cluster_df - with its total_members and color columns added
+    """
+    cluster_df = cluster_df.copy()
+    # A party without members in any cluster has no column
+    cluster_df["total_members"] = sum(cluster_df[p] for p in PARTIES if p in cluster_df.columns)
+    frac_rep = cluster_df["R"] / cluster_df["total_members"] if "R" in cluster_df.columns else 0.0
+    # We have to subtract 1 because Python uses 0 indexing
+    color_ind = (pd.Series(frac_rep, index=cluster_df.index).fillna(0) * (len(PARTY_COLORS) - 1)).round().astype(int)
+    cluster_df["color"] = [PARTY_COLORS[i] for i in color_ind]
+    return cluster_df
+
+
+if __name__ == '__main__':
+    cluster_df = cluster_colors(pd.read_csv(PARTY_DISTRIBUTION_PATH))
+    os.makedirs(os.path.dirname(VIZ_CLUSTERS_PATH), exist_ok=True)
+    cluster_df.to_csv(VIZ_CLUSTERS_PATH)
+    print(f"{len(cluster_df)} clusters written to {VIZ_CLUSTERS_PATH}")
@@ -0,0 +1,129 @@
+"""
+Fake LDA contributions API, to try lda_contributions.py without the real API.
+
+Serves /api/v1/contributions/?filing_year=&page=&page_size= with reports of
+made-up registrants, lobbyists and contribution items, in the format of the
+real API. A fraction of the requests fail with 500 or are throttled with 429
+and a Retry-After header, so the retries and the rate limiting are exercised
+too. The reports, and which attempt at which page fails, are drawn from a
+seed, so every run serves the same data and the same failures whatever the
+order the requests arrive in. The app keeps count of the requests it answered
+(see make_app), for the tests in tests/test_lda_contributions.py.
+
+    python fake_lda_server.py --port 8081 --reports 2000 --failure-rate 0.1
+"""
+
+import argparse
+import asyncio
+import math
+import random
+import time
+from collections import Counter
+
+from aiohttp import web
+
+HONOREES = ["Don Young", "Kamala Harris", "Stephanie Murphy", "Xochitl Torres Small", "PAC"]
+
+
+def fake_report(year, i):
+    """The i-th contribution report of a filing year"""
+    rng = random.Random(f"{year}-{i}")
+    no_contributions = rng.random() < 0.3
+    items = [] if no_contributions else [{
+        "contribution_type": "feca",
+        "contribution_type_display": "FECA",
+        "contributor_name": f"CONTRIBUTOR {rng.randint(1, 500)}",
+        "payee_name": f"FRIENDS OF {rng.choice(HONOREES).upper()}",
+        "honoree_name": rng.choice(HONOREES),
+        "amount": f"{rng.randint(1, 50) * 100}.00",
+        "date": f"{year}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+    } for _ in range(rng.randint(1, 4))]
+    registrant_id = rng.randint(1, 300)
+    return {
+        "filing_uuid": f"{year}-{i:06d}",
+        "filing_year": year,
+        "no_contributions": no_contributions,
+        "registrant": {"id": registrant_id, "house_registrant_id": 30000 + registrant_id,
+                       "name": f"REGISTRANT {registrant_id}"},
+        "lobbyist": None if rng.random() < 0.5 else {"id": rng.randint(1, 1000), "first_name": "FIRST",
+                                                     "last_name": f"LAST{rng.randint(1, 1000)}"},
+        "pacs": [] if rng.random() < 0.7 else [f"PAC {rng.randint(1, 50)}"],
+        "contribution_items": items,
+    }
+
+
+def make_app(n_reports, failure_rate, seed=0, failures=None, retry_after=1, delay=0.0):
+    """
+    The fake API's aiohttp app.
+
+    Parameters
+    ---
+    n_reports - number of reports per filing year
+    failure_rate - fraction of the requests answered with 429 or 500
+    seed - seed of the failures; the n-th attempt at a page of a year fails or not
+        whatever the order the requests arrive in
+    failures - dict of (year, page) -> list of statuses the first attempts at that
+        page are answered with, before any random failure
+    retry_after - Retry-After header of the 429 answers, in seconds
+    delay - seconds every answer takes, so that requests overlap
+
+    The app's "attempts" and "served" Counters count the requests and the
+    successful answers per (year, page), app["in_flight"]["max"] is the most
+    requests handled at once and app["log"] lists (year, page, status, time)
+    of every request.
+    """
+    failures = failures or {}
+
+    async def contributions(request):
+        year = int(request.query.get("filing_year", 2019))
+        page = int(request.query.get("page", 1))
+        page_size = int(request.query.get("page_size", 25))
+        attempt = app["attempts"][year, page]
+        app["attempts"][year, page] += 1
+        in_flight = app["in_flight"]
+        in_flight["now"] += 1
+        in_flight["max"] = max(in_flight["max"], in_flight["now"])
+        try:
+            if delay:
+                await asyncio.sleep(delay)
+            planned = failures.get((year, page), [])
+            if attempt < len(planned):
+                status = planned[attempt]
+            else:
+                rng = random.Random(f"{seed}-{year}-{page}-{attempt}")
+                status = (429 if rng.random() < 0.5 else 500) if rng.random() < failure_rate else 200
+            n_pages = max(1, math.ceil(n_reports / page_size))
+            if status == 200 and page > n_pages:
+                status = 404
+            app["log"].append((year, page, status, time.monotonic()))
+            if status == 429:
+                return web.json_response({"detail": "Request was throttled."}, status=429,
+                                         headers={"Retry-After": str(retry_after)})
+            if status == 404:
+                return web.json_response({"detail": "Invalid page."}, status=404)
+            if status != 200:
+                return web.json_response({"detail": "Server error"}, status=status)
+            start = (page - 1) * page_size
+            results = [fake_report(year, i) for i in range(start, min(start + page_size, n_reports))]
+            next_url = str(request.rel_url.update_query(page=page + 1)) if page < n_pages else None
+            app["served"][year, page] += 1
+            return web.json_response({"count": n_reports, "next": next_url, "previous": None, "results": results})
+        finally:
+            in_flight["now"] -= 1
+
+    app = web.Application()
+    app["attempts"] = Counter()
+    app["served"] = Counter()
+    app["in_flight"] = Counter()
+    app["log"] = []
+    app.router.add_get("/api/v1/contributions/", contributions)
+    return app
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Serve a fake LDA contributions API")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--reports", type=int, default=2000, help="number of reports per filing year")
+    parser.add_argument("--failure-rate", type=float, default=0.1, help="fraction of requests answered with 429 or 500")
+    args = parser.parse_args()
+    web.run_app(make_app(args.reports, args.failure_rate), port=args.port)
@@ -0,0 +1,174 @@
+"""
+Streaming flattener of the LDA contribution reports.
+
+Script version of the flattening cells of "lobbying_data_exploration.ipynb".
+A year's file of contribution reports (a JSON array, as the notebook wrote
+them, or one report per line) is read a chunk at a time and decoded one
+report at a time. Each report yields one flat record per contribution item,
+with the report's registrant, lobbyist and PACs, and the records are written
+in batches. Memory use does not grow with the size of the file.
+
+The records have the columns of the notebook's contributions_<year>.csv,
+which derive_node_file.py and derive_edge_files.py read.
+
+Run from this directory:
+    python flatten_contributions.py 2019_contributions.json ../../../data/contributions_2019.csv
+Write parquet instead (needs pyarrow) by giving a .parquet output path.
+"""
+
+import argparse
+import csv
+import json
+
+# Fields of a contribution item, then of the report it is listed in
+ITEM_FIELDS = ["contribution_type", "contribution_type_display", "contributor_name", "payee_name",
+               "honoree_name", "amount", "date"]
+REPORT_FIELDS = ["pac", "registrant_house_id", "senate_registrant_id", "registrant", "lobbyist_id", "lobbyist_name"]
+CONTRIBUTION_COLUMNS = ITEM_FIELDS + REPORT_FIELDS
+CHUNK_SIZE = 1 << 16
+BATCH_SIZE = 10000
+
+
+def iter_json_objects(f, chunk_size=CHUNK_SIZE):
+    """
+    The elements of a JSON array, or the values of a file of concatenated JSON
+    values (e.g. JSON lines), decoded one at a time from a text file.
+    """
+    decoder = json.JSONDecoder()
+    buffer, pos, eof = "", 0, False
+    in_array = None
+
+    def skip(chars):
+        nonlocal pos
+        while pos < len(buffer) and buffer[pos] in chars:
+            pos += 1
+
+    while True:
+        skip(" \t\r\n," if in_array is not None else " \t\r\n")
+        if pos == len(buffer):
+            if eof:
+                return
+            # Keep only the undecoded rest, so the buffer stays about one chunk long
+            chunk = f.read(chunk_size)
+            buffer, pos, eof = buffer[pos:] + chunk, 0, not chunk
+            continue
+        if in_array is None:
+            in_array = buffer[pos] == "["
+            pos += in_array
+            continue
+        if in_array and buffer[pos] == "]":
+            return
+        try:
+            value, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            end = None
+        # A value at the end of the buffer may be cut short, e.g. a number
+        if end is None or (end == len(buffer) and not eof):
+            if eof:
+                raise ValueError(f"Invalid JSON near: {buffer[pos:pos + 80]!r}")
+            chunk = f.read(chunk_size)
+            buffer, pos, eof = buffer[pos:] + chunk, 0, not chunk
+            continue
+        pos = end
+        yield value
+
+
+def flatten_contribution(report):
+    """
+    One record (a dict of CONTRIBUTION_COLUMNS) per contribution item of a contribution
+    report; none for a report of no contributions.
+    """
+    if report.get("no_contributions"):
+        return
+    registrant = report.get("registrant") or {}
+    lobbyist = report.get("lobbyist")
+    pacs = report.get("pacs") or []
+    report_record = {
+        "pac": str(pacs) if pacs else "None",
+        "registrant_house_id": registrant.get("house_registrant_id"),
+        "senate_registrant_id": registrant.get("id"),
+        "registrant": registrant.get("name"),
+        "lobbyist_id": lobbyist["id"] if lobbyist else "",
+        "lobbyist_name": lobbyist["first_name"] + " " + lobbyist["last_name"] if lobbyist else "",
+    }
+    for item in report.get("contribution_items") or []:
+        record = {field: item.get(field) for field in ITEM_FIELDS}
+        record.update(report_record)
+        yield record
+
+
+def flatten_contributions(reports):
+    """The records of every report of an iterable of contribution reports"""
+    for report in reports:
+        yield from flatten_contribution(report)
+
+
+def batches(records, batch_size=BATCH_SIZE):
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def write_csv(records, f, batch_size=BATCH_SIZE, header=True):
+    """
+    Write records to an open text file as csv, a batch at a time.
+
+    Returns
+    ---
+    n_records - number of records written
+    """
+    writer = csv.DictWriter(f, fieldnames=CONTRIBUTION_COLUMNS)
+    if header:
+        writer.writeheader()
+    n_records = 0
+    for batch in batches(records, batch_size):
+        writer.writerows(batch)
+        n_records += len(batch)
+    return n_records
+
+
+def write_parquet(records, path, batch_size=BATCH_SIZE):
+    """
+    Write records to a parquet file, one row group per batch. Every column is stored
+    as text, as in the csv.
+
+    Returns
+    ---
+    n_records - number of records written
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([(col, pa.string()) for col in CONTRIBUTION_COLUMNS])
+    n_records = 0
+    with pq.ParquetWriter(path, schema) as writer:
+        for batch in batches(records, batch_size):
+            columns = {col: [None if r[col] is None else str(r[col]) for r in batch] for col in CONTRIBUTION_COLUMNS}
+            writer.write_table(pa.table(columns, schema=schema))
+            n_records += len(batch)
+    return n_records
+
+
+def flatten_file(json_path, out_path, batch_size=BATCH_SIZE):
+    """Flatten a file of contribution reports into a csv, or a parquet file if out_path ends in .parquet"""
+    with open(json_path) as f:
+        records = flatten_contributions(iter_json_objects(f))
+        if out_path.endswith(".parquet"):
+            return write_parquet(records, out_path, batch_size)
+        with open(out_path, "w", newline="") as out:
+            return write_csv(records, out, batch_size)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Flatten a file of LDA contribution reports into one row per contribution")
+    parser.add_argument("json_path", help="JSON array or JSON lines of contribution reports")
+    parser.add_argument("out_path", help="csv, or .parquet, file to write")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    args = parser.parse_args()
+    n_records = flatten_file(args.json_path, args.out_path, args.batch_size)
+    print(f"{n_records} contributions written to {args.out_path}")
@@ -0,0 +1,212 @@
+"""
+Concurrent, resumable download of the LDA contribution reports.
+
+Script version of the download cells of "lobbying_data_exploration.ipynb".
+The pages of https://lda.senate.gov/api/v1/contributions/ for a filing year
+are fetched by several asyncio workers at once, under a rate limiter, and
+retried with exponential backoff when the API fails or throttles. Every
+page is flattened into one row per contribution item as soon as it arrives
+(see flatten_contributions.py) and appended to ../../../data/contributions_<year>.csv.
+
+After every page, the pages done so far and the size of the csv are saved in
+a checkpoint file next to the csv. An interrupted run started again with the
+same arguments truncates the csv to the last checkpoint and only fetches the
+missing pages.
+
+The API key is read from the LDA_API_KEY environment variable. Run from this
+directory:
+    LDA_API_KEY=... python lda_contributions.py --years 2019 2020
+
+fake_lda_server.py serves a fake contributions API, with failures, to try
+the download against:
+    python fake_lda_server.py --port 8081
+    python lda_contributions.py --years 2019 --url http://localhost:8081/api/v1/contributions/
+tests/test_lda_contributions.py runs the download against the same fake,
+served in-process.
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import time
+
+import aiohttp
+join = os.path.join
+
+from flatten_contributions import flatten_contributions, write_csv
+
+DATA_PATH = os.environ.get("REPG_DATA_ROOT", "../../../data")
+CONTRIBUTIONS_URL = "https://lda.senate.gov/api/v1/contributions/"
+FILING_YEARS = [2019, 2020]
+PAGE_SIZE = 25
+# Requests in flight at once, and at most RATE_LIMIT requests per RATE_PERIOD seconds
+# (the LDA API allows 120 requests per minute with a key)
+CONCURRENCY = 4
+RATE_LIMIT = 120
+RATE_PERIOD = 60.0
+MAX_RETRIES = 6
+BACKOFF_BASE = 1.0
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+class RateLimiter:
+    """
+    Token bucket allowing at most rate requests per period seconds, in bursts of
+    up to rate requests.
+    """
+
+    def __init__(self, rate=RATE_LIMIT, period=RATE_PERIOD):
+        self.rate = rate
+        self.period = period
+        self.tokens = float(rate)
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate / self.period)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) * self.period / self.rate)
+
+
+class Checkpoint:
+    """
+    The pages of a year already written to the csv, and the csv's size after them.
+
+    Parameters
+    ---
+    path - the checkpoint json file
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.pages = set()
+        self.n_pages = None
+        self.csv_size = 0
+        if os.path.exists(path):
+            with open(path) as f:
+                state = json.load(f)
+            self.pages = set(state["pages"])
+            self.n_pages = state["n_pages"]
+            self.csv_size = state["csv_size"]
+
+    def save(self):
+        with open(self.path + ".tmp", "w") as f:
+            json.dump({"pages": sorted(self.pages), "n_pages": self.n_pages, "csv_size": self.csv_size}, f)
+        os.replace(self.path + ".tmp", self.path)
+
+
+async def fetch_page(session, limiter, url, params, max_retries=MAX_RETRIES):
+    """
+    GET one page of the API as json, retrying failed and throttled requests with
+    exponential backoff and jitter, or after the Retry-After the API asks for.
+    """
+    for attempt in range(max_retries + 1):
+        await limiter.acquire()
+        delay = BACKOFF_BASE * 2 ** attempt * (0.5 + random.random())
+        try:
+            async with session.get(url, params=params) as response:
+                if response.status not in RETRY_STATUSES:
+                    response.raise_for_status()
+                    return await response.json()
+                retry_after = response.headers.get("Retry-After")
+                if retry_after is not None and retry_after.isdigit():
+                    delay = max(delay, float(retry_after))
+                error = f"HTTP {response.status}"
+        except (aiohttp.ClientConnectionError, aiohttp.ClientPayloadError, asyncio.TimeoutError) as e:
+            error = repr(e)
+        if attempt == max_retries:
+            raise RuntimeError(f"Giving up on {url} {params} after {max_retries + 1} attempts: {error}")
+        print(f"Retrying {params} in {delay:.1f}s: {error}")
+        await asyncio.sleep(delay)
+
+
+async def fetch_year(session, limiter, url, year, out_dir=DATA_PATH, concurrency=CONCURRENCY, page_size=PAGE_SIZE):
+    """
+    Fetch every contribution report of a filing year into contributions_<year>.csv,
+    resuming from the year's checkpoint.
+
+    Returns
+    ---
+    n_rows - number of rows written by this run
+    """
+    csv_path = join(out_dir, f"contributions_{year}.csv")
+    checkpoint = Checkpoint(join(out_dir, f"contributions_{year}.checkpoint.json"))
+    params = {"filing_year": year, "page_size": page_size}
+
+    resume = os.path.exists(csv_path) and checkpoint.csv_size > 0
+    if resume:
+        # Drop whatever was written after the last checkpoint
+        with open(csv_path, "r+") as f:
+            f.truncate(checkpoint.csv_size)
+    mode = "a" if resume else "w"
+    n_rows = 0
+    with open(csv_path, mode, newline="") as f:
+        if mode == "w":
+            write_csv([], f)
+            checkpoint.pages, checkpoint.n_pages = set(), None
+
+        def write_page(page, data):
+            nonlocal n_rows
+            n_rows += write_csv(flatten_contributions(data.get("results", [])), f, header=False)
+            f.flush()
+            checkpoint.pages.add(page)
+            checkpoint.csv_size = f.tell()
+            checkpoint.save()
+
+        # The first page gives the number of pages
+        if checkpoint.n_pages is None:
+            data = await fetch_page(session, limiter, url, dict(params, page=1))
+            checkpoint.n_pages = max(1, math.ceil(data.get("count", 0) / page_size))
+            write_page(1, data)
+
+        queue = asyncio.Queue()
+        for page in range(1, checkpoint.n_pages + 1):
+            if page not in checkpoint.pages:
+                queue.put_nowait(page)
+        print(f"{year}: {queue.qsize()} of {checkpoint.n_pages} pages to fetch")
+
+        async def worker():
+            while not queue.empty():
+                page = queue.get_nowait()
+                data = await fetch_page(session, limiter, url, dict(params, page=page))
+                # Writes happen between awaits, so pages are never interleaved in the file
+                write_page(page, data)
+                if len(checkpoint.pages) % 100 == 0:
+                    print(f"{year}: {len(checkpoint.pages)} of {checkpoint.n_pages} pages")
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return n_rows
+
+
+async def fetch_contributions(years=FILING_YEARS, url=CONTRIBUTIONS_URL, api_key=None, out_dir=DATA_PATH,
+                              concurrency=CONCURRENCY, rate=RATE_LIMIT, period=RATE_PERIOD):
+    """Fetch the contributions of every filing year, sharing one connection pool and rate limit"""
+    headers = {"Authorization": f"Token {api_key}"} if api_key else {}
+    limiter = RateLimiter(rate, period)
+    timeout = aiohttp.ClientTimeout(total=60)
+    async with aiohttp.ClientSession(headers=headers, timeout=timeout,
+                                     connector=aiohttp.TCPConnector(limit=concurrency)) as session:
+        for year in years:
+            start = time.perf_counter()
+            n_rows = await fetch_year(session, limiter, url, year, out_dir, concurrency)
+            print(f"{year}: {n_rows} contributions written in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Download the LDA contribution reports into contributions_<year>.csv")
+    parser.add_argument("--years", type=int, nargs="+", default=FILING_YEARS)
+    parser.add_argument("--url", default=CONTRIBUTIONS_URL)
+    parser.add_argument("--out-dir", default=DATA_PATH)
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY)
+    parser.add_argument("--rate", type=int, default=RATE_LIMIT, help=f"requests per {RATE_PERIOD:.0f} seconds")
+    args = parser.parse_args()
+    asyncio.run(fetch_contributions(args.years, args.url, os.environ.get("LDA_API_KEY"), args.out_dir,
+                                    args.concurrency, args.rate))
@@ -0,0 +1,70 @@
+"""
+Script version of "Commitee Data - JSON to CSV.ipynb".
+
+Normalizes the ProPublica committee files (house_committees.json,
+senate_committees.json and joint_committees.json) into the csv files read by
+derive_node_file.py and derive_edge_files.py:
+- <chamber>_committees_v2.csv, one row per subcommittee (one row with empty
+  subcommittee columns for a committee without any), with the committee's
+  columns suffixed _x and the subcommittee's _y, and
+- joint_committees.csv, one row per joint committee.
+
+Every subcommittee row keeps its own id (id_y) and its committee's id (id_x,
+and col_join), so the graph build can join committees and subcommittees by
+id instead of matching their names.
+
+Run from this directory:
+    python normalize_committees.py
+"""
+
+import json
+import os
+
+import pandas as pd
+join = os.path.join
+
+DATA_PATH = os.environ.get("REPG_DATA_ROOT", "../../../data")
+CHAMBERS = ["house", "senate"]
+
+
+def load_committees(path):
+    """The committees of a ProPublica committees file, as a list of dicts"""
+    with open(path) as f:
+        return json.load(f)["results"][0]["committees"]
+
+
+def normalize_committees(committees):
+    """
+    One row per (committee, subcommittee), in the format of the notebook's
+    <chamber>_committees_v2.csv.
+
+    Parameters
+    ---
+    committees - list of committee dicts, each with a list of subcommittees
+
+    Returns
+    ---
+    df - the committee columns (id_x, name_x, ...), the subcommittee columns (id_y,
+        name_y, api_uri_y) and col_join, the id of the subcommittee's committee
+    """
+    df_committee = pd.json_normalize(committees, max_level=0).drop(columns="subcommittees", errors="ignore")
+    # Every subcommittee of every committee at once, with the id of its committee
+    df_sub = pd.json_normalize([c for c in committees if c.get("subcommittees")], record_path="subcommittees",
+                               meta=["id"], meta_prefix="committee_")
+    df_sub = df_sub.rename(columns={"committee_id": "col_join"})
+    return df_committee.merge(df_sub, how="outer", left_on="id", right_on="col_join")
+
+
+def normalize_chamber(chamber, data_path=DATA_PATH):
+    df = normalize_committees(load_committees(join(data_path, f"{chamber}_committees.json")))
+    out_path = join(data_path, f"{chamber}_committees_v2.csv")
+    df.to_csv(out_path)
+    print(f"{chamber}: {df['id_x'].nunique()} committees, {df['id_y'].notna().sum()} subcommittees written to {out_path}")
+
+
+if __name__ == '__main__':
+    for chamber in CHAMBERS:
+        normalize_chamber(chamber)
+    df_joint = pd.DataFrame(load_committees(join(DATA_PATH, "joint_committees.json")))
+    df_joint.to_csv(join(DATA_PATH, "joint_committees.csv"))
+    print(f"joint: {len(df_joint)} committees written to {join(DATA_PATH, 'joint_committees.csv')}")
@@ -6,9 +6,11 @@ from tqdm import tqdm
 import os
 join = os.path.join
 
+DATA_PATH = os.environ.get("REPG_DATA_ROOT", "../../../data")
+
 
 # Load, process node data
-NODE_PATH = "../../../data/nodes.csv"
+NODE_PATH = join(DATA_PATH, "nodes.csv")
 df_node = pd.read_csv(NODE_PATH)
 df_node.set_index('nid', inplace=True)
 node_types = list(set(df_node["ntype"].to_list()))
@@ -24,7 +26,7 @@ for ntype in node_types:
 
 
 # Load, process edge data
-EDGE_PATH = "../../../data/edges"
+EDGE_PATH = join(DATA_PATH, "edges")
 edge_files = glob(join(EDGE_PATH, "*.csv"))
 edge_files.sort()
 df_edge = []
@@ -50,4 +52,4 @@ for edge_file in tqdm(edge_files):
 # Create DGL graph
 g = dgl.heterograph(data_dict)
 print(g)
-dgl.save_graphs("../../../data/graph.dgl", g)
\ No newline at end of file
+dgl.save_graphs(join(DATA_PATH, "graph.dgl"), g)
\ No newline at end of file
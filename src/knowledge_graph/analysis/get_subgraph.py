@@ -5,6 +5,10 @@ given a set of edge types able to be traversed.
 """
 
 import dgl
+import os
+join = os.path.join
+
+DATA_PATH = os.environ.get("REPG_DATA_ROOT", "../../../data")
 
 def get_subgraph(g, start_node_ids, valid_edge_types):
     # Filter by edge type
@@ -14,7 +18,7 @@ def get_subgraph(g, start_node_ids, valid_edge_types):
     return sg
 
 if __name__ == '__main__':
-    (g,), _ = dgl.load_graphs('../../../data/graph.dgl')
+    (g,), _ = dgl.load_graphs(join(DATA_PATH, "graph.dgl"))
     
     start_node_ids = {'member': [0, 1, 2, 3, 4]}
     valid_edge_types = [
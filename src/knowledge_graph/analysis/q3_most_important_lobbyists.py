@@ -1,16 +1,24 @@
 """Q3: Who are the most important lobbyists?"""
 
 from get_subgraph import get_subgraph
+import sys
+sys.path.append("../../community_detection/02 Clustering")
+from cluster_assignments import load_cluster_assignments, load_index
 import dgl
 import pandas as pd
 from tqdm import tqdm
 from collections import Counter, defaultdict
+import os
+join = os.path.join
 
-(g,), _ = dgl.load_graphs('../../../data/graph.dgl')
+DATA_PATH = os.environ.get("REPG_DATA_ROOT", "../../../data")
 
-df_node = pd.read_csv('../../../data/nodes.csv')
+(g,), _ = dgl.load_graphs(join(DATA_PATH, "graph.dgl"))
+ASSIGNMENTS_PATH = join(DATA_PATH, "cluster_assignments")
+
+df_node = pd.read_csv(join(DATA_PATH, "nodes.csv"))
 df_node_member = df_node[df_node["ntype"]=='member']
-df_node_member.set_index("nname", inplace=True)
+df_node_member.set_index("nid", inplace=True)
 df_node_lobbyist = df_node[df_node["ntype"]=='lobbyist']
 df_node_lobbyist.set_index("nid_type", inplace=True)
 
@@ -20,24 +28,14 @@ n = 5
 
 df_out = defaultdict(lambda: [])
 
-df_cluster = pd.read_csv("../../../data/voter_clusters.csv")
-df_cluster.set_index("voters", inplace=True)
-for col in tqdm(df_cluster.columns):
-    #print(col)
-    df_cluster[col] = df_cluster[col].astype(int)
-
-    topic, subtopic, _ = col.split("_")
-    topic, subtopic = topic.strip(), subtopic.strip()
+df_index = load_index(ASSIGNMENTS_PATH).set_index(["chamber", "topic_id", "subject_id"])
+df_cluster = load_cluster_assignments(ASSIGNMENTS_PATH)
+for (chamber, topic_id, subject_id), df_subject in tqdm(df_cluster.groupby(["chamber", "topic_id", "subject_id"])):
+    topic, subtopic = df_index.loc[(chamber, topic_id, subject_id), ["topic", "subject"]]
 
-    clusters = df_cluster[col].groupby(df_cluster[col].to_list())
-    for cluster_id, member_ids in clusters.groups.items():
-        member_ids = member_ids.to_list()
-        start_node_ids = {"member": []}
-        for x in member_ids:
-            try:
-                start_node_ids["member"].append(df_node_member.loc[x.split("_")[-1]]["nid_type"])
-            except KeyError:
-                pass
+    for cluster_id, df_members in df_subject.groupby("cluster_id"):
+        member_ids = df_members["member_nid"].to_list()
+        start_node_ids = {"member": df_node_member.loc[member_ids]["nid_type"].to_list()}
 
         sg = get_subgraph(g, start_node_ids, valid_edge_types)
         member_srcids, lobbyist_tgtids = sg.edges(etype=('member', 'paidto_inv', 'lobbyist'))
@@ -45,6 +43,7 @@ for col in tqdm(df_cluster.columns):
         c = Counter([df_node_lobbyist.loc[x.item()]["nname"] for x in lobbyist_tgtids])
         c_top = c.most_common(n)
         #print(c)
+        df_out["chamber"].append(chamber)
         df_out["topic"].append(topic)
         df_out["subtopic"].append(subtopic)
         df_out["cluster_id"].append(cluster_id)
@@ -61,4 +60,4 @@ for col in tqdm(df_cluster.columns):
     #print()
 
 df_out = pd.DataFrame(df_out)
-df_out.to_csv("../../../data/q3_most_important_lobbyists.csv", index=False)
\ No newline at end of file
+df_out.to_csv(join(DATA_PATH, "q3_most_important_lobbyists.csv"), index=False)
\ No newline at end of file
@@ -6,7 +6,10 @@ from get_subgraph import get_subgraph
 import dgl
 import pandas as pd
 from collections import Counter
-(g,), _ = dgl.load_graphs('../../../data/graph.dgl')
+import os
+join = os.path.join
+DATA_PATH = os.environ.get("REPG_DATA_ROOT", "../../../data")
+(g,), _ = dgl.load_graphs(join(DATA_PATH, "graph.dgl"))
 start_node_ids = {'member': [10,11,12,13,14]}  # example only
 valid_edge_types = [
     ('member', 'memberof', 'subcommittee')]
@@ -15,7 +18,7 @@ member_srcids, subcommittee_tgtids = sg.edges(etype=('member', 'memberof', 'subc
 #print(member_srcids)
 #print(party_tgtids)
 
-df_node = pd.read_csv('../../../data/nodes.csv')
+df_node = pd.read_csv(join(DATA_PATH, "nodes.csv"))
 df_node_subcommittee = df_node[df_node["ntype"]=='subcommittee']
 df_node_subcommittee.set_index("nid_type", inplace=True)
 
@@ -6,7 +6,10 @@ from get_subgraph import get_subgraph
 import dgl
 import pandas as pd
 from collections import Counter
-(g,), _ = dgl.load_graphs('../../../data/graph.dgl')
+import os
+join = os.path.join
+DATA_PATH = os.environ.get("REPG_DATA_ROOT", "../../../data")
+(g,), _ = dgl.load_graphs(join(DATA_PATH, "graph.dgl"))
 start_node_ids = {'member': [10,11,12,13,14],\
     'committee' : [1,2,3,4,5]}  # example only
 n = len(start_node_ids['member'])
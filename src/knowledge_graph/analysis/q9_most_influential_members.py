@@ -8,22 +8,32 @@ NOTE: centrality is not used in the current code
 """
 
 from get_subgraph import get_subgraph
+import sys
+sys.path.append("../../community_detection/02 Clustering")
+from cluster_assignments import load_cluster_assignments, load_index
 import dgl
 import pandas as pd
 from tqdm import tqdm
 from collections import Counter, defaultdict
+import os
+join = os.path.join
 
-(g,), _ = dgl.load_graphs('../../../data/graph.dgl')
+DATA_PATH = os.environ.get("REPG_DATA_ROOT", "../../../data")
 
-df_node = pd.read_csv('../../../data/nodes.csv')
+(g,), _ = dgl.load_graphs(join(DATA_PATH, "graph.dgl"))
+ASSIGNMENTS_PATH = join(DATA_PATH, "cluster_assignments")
+
+df_node = pd.read_csv(join(DATA_PATH, "nodes.csv"))
 df_node_member = df_node[df_node["ntype"]=='member']
-df_node_member.set_index("nname", inplace=True)
+df_node_member.set_index("nid", inplace=True)
 df_node_member_2 = df_node[df_node["ntype"]=='member']
 df_node_member_2.set_index("nid_type", inplace=True)
 
-df_votes = pd.read_csv('../../../data/house_116.csv')
+# Both chambers, by bioguide id; members who served in both appear once
+df_votes = pd.concat([pd.read_csv(join(DATA_PATH, "house_116.csv")),
+                      pd.read_csv(join(DATA_PATH, "senate_116.csv"))])
+df_votes = df_votes.drop_duplicates(subset="id")
 df_votes.set_index("id", inplace=True)
-# NOTE: senate currently not considered
 
 valid_edge_types = [
     ('member', 'sponsorof', 'bill'),
@@ -33,24 +43,14 @@ n = 5
 
 df_out = defaultdict(lambda: [])
 
-df_cluster = pd.read_csv("../../../data/voter_clusters.csv")
-df_cluster.set_index("voters", inplace=True)
-for col in tqdm(df_cluster.columns):
-    #print(col)
-    df_cluster[col] = df_cluster[col].astype(int)
-
-    topic, subtopic, _ = col.split("_")
-    topic, subtopic = topic.strip(), subtopic.strip()
+df_index = load_index(ASSIGNMENTS_PATH).set_index(["chamber", "topic_id", "subject_id"])
+df_cluster = load_cluster_assignments(ASSIGNMENTS_PATH)
+for (chamber, topic_id, subject_id), df_subject in tqdm(df_cluster.groupby(["chamber", "topic_id", "subject_id"])):
+    topic, subtopic = df_index.loc[(chamber, topic_id, subject_id), ["topic", "subject"]]
 
-    clusters = df_cluster[col].groupby(df_cluster[col].to_list())
-    for cluster_id, member_ids in clusters.groups.items():
-        member_ids = member_ids.to_list()
-        start_node_ids = {"member": []}
-        for x in member_ids:
-            try:
-                start_node_ids["member"].append(df_node_member.loc[x.split("_")[-1]]["nid_type"])
-            except KeyError:
-                pass
+    for cluster_id, df_members in df_subject.groupby("cluster_id"):
+        member_ids = df_members["member_nid"].to_list()
+        start_node_ids = {"member": df_node_member.loc[member_ids]["nid_type"].to_list()}
 
         sg = get_subgraph(g, start_node_ids, valid_edge_types)
         member_srcids, bill_tgtids = [], []
@@ -74,6 +74,7 @@ for col in tqdm(df_cluster.columns):
         c = Counter(member_names)
         c_top = c.most_common(n)
         #print(c)
+        df_out["chamber"].append(chamber)
         df_out["topic"].append(topic)
         df_out["subtopic"].append(subtopic)
         df_out["cluster_id"].append(cluster_id)
@@ -90,4 +91,4 @@ for col in tqdm(df_cluster.columns):
     #print()
 
 df_out = pd.DataFrame(df_out)
-df_out.to_csv("../../../data/q9_most_influential_members.csv", index=False)
\ No newline at end of file
+df_out.to_csv(join(DATA_PATH, "q9_most_influential_members.csv"), index=False)
\ No newline at end of file
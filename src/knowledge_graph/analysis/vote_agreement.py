@@ -0,0 +1,140 @@
+"""
+Member x member voting agreement over a set of votes.
+
+Each member's yea and nay votes are packed into two bit planes
+(np.packbits over the vote axis). For every pair of members,
+- agreement = popcount(yea_a & yea_b) + popcount(nay_a & nay_b)
+- co-participation = popcount((yea_a | nay_a) & (yea_b | nay_b))
+are computed for a block of rows at a time, and the agreement rate
+(agreement / co-participation) is stored as a float16 matrix.
+Pairs that never voted on the same vote get NaN.
+
+Covers both chambers and all sessions in the graph's edge files, optionally
+restricted to the votes on bills of one topic and/or subject.
+"""
+
+import argparse
+import numpy as np
+import pandas as pd
+import os
+join = os.path.join
+
+DATA_PATH = os.environ.get("REPG_DATA_ROOT", "../../../data")
+EDGE_PATH = join(DATA_PATH, "edges")
+
+# Number of set bits for every possible byte value
+POPCOUNT_TABLE = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def pack_vote_planes(df_yea, df_nay, member_nids, vote_nids):
+    """
+    Pack yea and nay edges into (n_members, ceil(n_votes / 8)) uint8 bit planes.
+
+    Parameters
+    ---
+    df_yea, df_nay - member -> vote edge dataframes with src_nid / tgt_nid columns
+    member_nids - node ids of the members, in output row order
+    vote_nids - node ids of the votes to consider; edges to other votes are dropped
+    """
+    member_index = pd.Series(np.arange(len(member_nids)), index=member_nids)
+    vote_index = pd.Series(np.arange(len(vote_nids)), index=vote_nids)
+    planes = []
+    for df_edge in [df_yea, df_nay]:
+        df_edge = df_edge[df_edge["src_nid"].isin(member_index.index) &
+                          df_edge["tgt_nid"].isin(vote_index.index)]
+        plane = np.zeros((len(member_nids), len(vote_nids)), dtype=bool)
+        plane[member_index[df_edge["src_nid"]].to_numpy(),
+              vote_index[df_edge["tgt_nid"]].to_numpy()] = True
+        planes.append(np.packbits(plane, axis=1))
+    return planes[0], planes[1]
+
+
+def _popcount_and(block, planes):
+    """Popcount of (block[i] & planes[j]) for every row pair, shape (len(block), len(planes))."""
+    both = np.bitwise_and(block[:, None, :], planes[None, :, :])
+    return POPCOUNT_TABLE[both].sum(axis=2, dtype=np.int32)
+
+
+def agreement_counts(yea, nay, block_size=64):
+    """
+    Pairwise agreement and co-participation counts from packed planes.
+
+    Returns
+    ---
+    agree - (n_members, n_members) int32 number of votes where both voted the same way
+    copart - (n_members, n_members) int32 number of votes where both voted yea or nay
+    """
+    voted = np.bitwise_or(yea, nay)
+    n = yea.shape[0]
+    agree = np.empty((n, n), dtype=np.int32)
+    copart = np.empty((n, n), dtype=np.int32)
+    for start in range(0, n, block_size):
+        stop = min(start + block_size, n)
+        agree[start:stop] = _popcount_and(yea[start:stop], yea) + _popcount_and(nay[start:stop], nay)
+        copart[start:stop] = _popcount_and(voted[start:stop], voted)
+    return agree, copart
+
+
+def agreement_rate(agree, copart):
+    """Agreement / co-participation as float16, NaN where a pair shares no votes."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rate = agree / copart
+    rate[copart == 0] = np.nan
+    return rate.astype(np.float16)
+
+
+def vote_nids_for(df_node, topic=None, subject=None):
+    """
+    Node ids of the votes to include: all votes, or only the votes on bills
+    with the given topic and/or subject.
+    """
+    df_vote = df_node[df_node["ntype"] == "vote"]
+    if topic is None and subject is None:
+        return df_vote["nid"].to_numpy()
+
+    df_topics = pd.concat([
+        pd.read_csv(join(DATA_PATH, "house_bills_topics_subjects.tsv"), sep="\t"),
+        pd.read_csv(join(DATA_PATH, "senate_bills_topics_subjects.tsv"), sep="\t")])
+    df_topics["topic"] = df_topics["topic"].str.strip()
+    df_topics["subject"] = df_topics["subject"].str.strip()
+    if topic is not None:
+        df_topics = df_topics[df_topics["topic"] == topic]
+    if subject is not None:
+        df_topics = df_topics[df_topics["subject"] == subject]
+
+    df_bill = df_node[df_node["ntype"] == "bill"]
+    bill_nids = df_bill[df_bill["nname"].isin(df_topics["bill_id"])]["nid"]
+    df_vote_bill = pd.read_csv(join(EDGE_PATH, "vote_on_bill.csv"))
+    return np.sort(df_vote_bill[df_vote_bill["tgt_nid"].isin(bill_nids)]["src_nid"].unique())
+
+
+def compute_agreement(df_node, df_yea, df_nay, topic=None, subject=None, block_size=64):
+    """
+    Returns the member node ids, the float16 agreement rate matrix and the
+    co-participation counts for the selected votes.
+    """
+    member_nids = df_node[df_node["ntype"] == "member"]["nid"].to_numpy()
+    vote_nids = vote_nids_for(df_node, topic, subject)
+    yea, nay = pack_vote_planes(df_yea, df_nay, member_nids, vote_nids)
+    agree, copart = agreement_counts(yea, nay, block_size)
+    return member_nids, agreement_rate(agree, copart), copart
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument("--topic", default=None, help="only use votes on bills of this topic")
+    parser.add_argument("--subject", default=None, help="only use votes on bills of this subject")
+    parser.add_argument("--block_size", type=int, default=64)
+    parser.add_argument("--out", default=join(DATA_PATH, "vote_agreement.npz"))
+    args = parser.parse_args()
+
+    df_node = pd.read_csv(join(DATA_PATH, "nodes.csv"))
+    df_yea = pd.read_csv(join(EDGE_PATH, "member_votedyeaon_vote.csv"))
+    df_nay = pd.read_csv(join(EDGE_PATH, "member_votednayon_vote.csv"))
+
+    member_nids, rate, copart = compute_agreement(
+        df_node, df_yea, df_nay, args.topic, args.subject, args.block_size)
+    # Co-participation never exceeds the number of votes in a congress
+    np.savez_compressed(args.out, member_nids=member_nids, agreement=rate,
+                        copart=copart.astype(np.uint16))
+    print(f"Saved {rate.shape[0]} x {rate.shape[1]} agreement matrix to {args.out}")
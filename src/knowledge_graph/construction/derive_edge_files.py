@@ -24,48 +24,51 @@ import editdistance
 from tqdm import tqdm
 import numpy as np
 import json
+import functools
 from glob import glob
 from pathlib import Path
 import os
 join = os.path.join
 
+DATA_PATH = os.environ.get("REPG_DATA_ROOT", "../../../data")
+
 
 ### LOAD IN DATA ###
-df_bills_house = pd.read_csv("../../../data/house_bills.csv", sep='\x01')
-df_bills_sen = pd.read_csv("../../../data/senate_bills.csv", sep='\x01')
+df_bills_house = pd.read_csv(join(DATA_PATH, "house_bills.csv"), sep='\x01')
+df_bills_sen = pd.read_csv(join(DATA_PATH, "senate_bills.csv"), sep='\x01')
 
-df_topics_house = pd.read_csv("../../../data/house_bills_topics_subjects.tsv", sep = "\t")
-df_topics_sen = pd.read_csv("../../../data/senate_bills_topics_subjects.tsv", sep = "\t")
+df_topics_house = pd.read_csv(join(DATA_PATH, "house_bills_topics_subjects.tsv"), sep = "\t")
+df_topics_sen = pd.read_csv(join(DATA_PATH, "senate_bills_topics_subjects.tsv"), sep = "\t")
 
-df_committee_house = pd.read_csv("../../../data/house_committees_v2.csv")
-df_committee_sen = pd.read_csv("../../../data/senate_committees_v2.csv")
-df_committee_joint = pd.read_csv("../../../data/joint_committees.csv")
+df_committee_house = pd.read_csv(join(DATA_PATH, "house_committees_v2.csv"))
+df_committee_sen = pd.read_csv(join(DATA_PATH, "senate_committees_v2.csv"))
+df_committee_joint = pd.read_csv(join(DATA_PATH, "joint_committees.csv"))
 
-with open("../../../data/house_committee_memberships.json", "r") as f:
+with open(join(DATA_PATH, "house_committee_memberships.json"), "r") as f:
     house_cm = json.load(f)
-with open("../../../data/senate_committee_memberships.json", "r") as f:
+with open(join(DATA_PATH, "senate_committee_memberships.json"), "r") as f:
     senate_cm = json.load(f)
-with open("../../../data/joint_committee_memberships.json", "r") as f:
+with open(join(DATA_PATH, "joint_committee_memberships.json"), "r") as f:
     joint_cm = json.load(f)
 
 df_lobbyist = pd.concat([
-    pd.read_csv(fname) for fname in glob("../../../data/contributions_*.csv")]) # don't use 2021
+    pd.read_csv(fname) for fname in glob(join(DATA_PATH, "contributions_*.csv"))]) # don't use 2021
 
-df_member_house = pd.read_csv("../../../data/house_116.csv")
-df_member_sen = pd.read_csv("../../../data/senate_116.csv")
+df_member_house = pd.read_csv(join(DATA_PATH, "house_116.csv"))
+df_member_sen = pd.read_csv(join(DATA_PATH, "senate_116.csv"))
 
-df_vote_house = pd.read_csv("../../../data/house_votes.csv", dtype=str)
+df_vote_house = pd.read_csv(join(DATA_PATH, "house_votes.csv"), dtype=str)
 df_vote_house['number'] = df_vote_house['number'].astype(int)
 df_vote_house['session'] = df_vote_house['session'].astype(int)
 df_vote_house = df_vote_house[df_vote_house["session"] != 2021] # filter out 2021
 df_vote_house = df_vote_house.sort_values(by=["session", "number"])
-df_vote_sen = pd.read_csv("../../../data/senate_votes.csv", dtype=str)
+df_vote_sen = pd.read_csv(join(DATA_PATH, "senate_votes.csv"), dtype=str)
 df_vote_sen['number'] = df_vote_sen['number'].astype(int)
 df_vote_sen['session'] = df_vote_sen['session'].astype(int)
 df_vote_sen = df_vote_sen[df_vote_sen["session"] != 2021] # filter out 2021
 df_vote_sen = df_vote_sen.sort_values(by=["session", "number"])
 
-df_node = pd.read_csv("../../../data/nodes.csv")
+df_node = pd.read_csv(join(DATA_PATH, "nodes.csv"))
 
 
 ### INITIALIZE HELPER VARIABLES / FUNCTIONS
@@ -95,9 +98,45 @@ def find_matching_str(str_list, query_str, tol=np.inf):
             matching_str = str
     return matching_str if best_ed <= tol else None
 
+# Committee ids by name, from the normalized committee files (see normalize_committees.py)
+committee2id = {}
+for df in [df_committee_house, df_committee_sen]:
+    committee2id.update(zip(df["name_x"], df["id_x"]))
+committee2id.update(zip(df_committee_joint["name"], df_committee_joint["id"]))
+
+# The membership files name committees, subcommittees and members; names that are
+# exactly the ones of the nodes are joined directly, only the others are matched
+# to the closest name
+@functools.lru_cache(maxsize=None)
+def match_committee(name):
+    return name if "committee_"+name in nkey2nid else find_matching_str(com_list, name)
+
+# Subcommittee names by the id of their committee; the nodes are named "<name> (<committee id>)"
+subcoms_by_committee = {}
+for subcom in subcom_list:
+    subcom_name, committee_id = subcom.rsplit(" (", 1)
+    subcoms_by_committee.setdefault(committee_id[:-1], []).append(subcom_name)
+
+@functools.lru_cache(maxsize=None)
+def match_subcommittee(committee, name):
+    # Subcommittee nodes are named after their committee's id, which tells
+    # apart the subcommittees of the same name in different committees; a
+    # name is only matched to the subcommittees of its own committee. None
+    # if that committee has no subcommittee nodes
+    committee_id = committee2id.get(committee)
+    key = f"{name} ({committee_id})"
+    if "subcommittee_"+key in nkey2nid:
+        return key
+    subcom_name = find_matching_str(subcoms_by_committee.get(committee_id, []), name)
+    return None if subcom_name is None else f"{subcom_name} ({committee_id})"
+
+@functools.lru_cache(maxsize=None)
+def match_member(name):
+    return name if name in member2id else find_matching_str(m_list, name)
+
 
 ### DERIVE EDGE FILES ###
-EDGE_PATH = "../../../data/edges"
+EDGE_PATH = join(DATA_PATH, "edges")
 Path(EDGE_PATH).mkdir(parents=True, exist_ok=True)
 
 # Member -> [a member of ] -> Political party
@@ -167,9 +206,9 @@ edge_data = {"src_nid": [], "tgt_nid": []}
 for cm in [house_cm, senate_cm, joint_cm]:
     committees = list(cm.keys())
     for c in committees:
-        committee = find_matching_str(com_list, c)
+        committee = match_committee(c)
         for mname, mstate in cm[c]["members"]:
-            member = find_matching_str(m_list, mname + " " + mstate)
+            member = match_member(mname + " " + mstate)
             edge_data["src_nid"].append(nkey2nid["member_"+member2id[member]])
             edge_data["tgt_nid"].append(nkey2nid["committee_"+committee])
 pd.DataFrame(edge_data).drop_duplicates().sort_values(by=['src_nid', 'tgt_nid']).to_csv(
@@ -181,11 +220,15 @@ edge_data = {"src_nid": [], "tgt_nid": []}
 for cm in [house_cm, senate_cm]:
     committees = list(cm.keys())
     for c in committees:
+        committee = match_committee(c)
         subcommittees = list(set(cm[c].keys()) - {"members"})
         for sc in subcommittees:
-            subcommittee = find_matching_str(subcom_list, sc)
+            subcommittee = match_subcommittee(committee, sc)
+            if subcommittee is None:
+                print(f"Skipping {sc}: no subcommittee of {committee} in the graph")
+                continue
             for mname, mstate in cm[c][sc]["members"]:
-                member = find_matching_str(m_list, mname + " " + mstate)
+                member = match_member(mname + " " + mstate)
                 edge_data["src_nid"].append(nkey2nid["member_"+member2id[member]])
                 edge_data["tgt_nid"].append(nkey2nid["subcommittee_"+subcommittee])
 pd.DataFrame(edge_data).drop_duplicates().sort_values(by=['src_nid', 'tgt_nid']).to_csv(
@@ -197,10 +240,12 @@ edge_data = {"src_nid": [], "tgt_nid": []}
 for cm in [house_cm, senate_cm]:
     committees = list(cm.keys())
     for c in committees:
-        committee = find_matching_str(com_list, c)
+        committee = match_committee(c)
         subcommittees = list(set(cm[c].keys()) - {"members"})
         for sc in subcommittees:
-            subcommittee = find_matching_str(subcom_list, sc)
+            subcommittee = match_subcommittee(committee, sc)
+            if subcommittee is None:
+                continue
             edge_data["src_nid"].append(nkey2nid["subcommittee_"+subcommittee])
             edge_data["tgt_nid"].append(nkey2nid["committee_"+committee])
 pd.DataFrame(edge_data).drop_duplicates().sort_values(by=['src_nid', 'tgt_nid']).to_csv(
@@ -211,17 +256,17 @@ print("Committee -> [is based in ] -> Chamber")
 edge_data = {"src_nid": [], "tgt_nid": []}
 committees = list(house_cm.keys())
 for c in committees:
-    committee = find_matching_str(com_list, c)
+    committee = match_committee(c)
     edge_data["src_nid"].append(nkey2nid["committee_"+committee])
     edge_data["tgt_nid"].append(nkey2nid["chamber_house"])
 committees = list(senate_cm.keys())
 for c in committees:
-    committee = find_matching_str(com_list, c)
+    committee = match_committee(c)
     edge_data["src_nid"].append(nkey2nid["committee_"+committee])
     edge_data["tgt_nid"].append(nkey2nid["chamber_senate"])
 committees = list(joint_cm.keys())
 for c in committees:
-    committee = find_matching_str(com_list, c)
+    committee = match_committee(c)
     edge_data["src_nid"].append(nkey2nid["committee_"+committee])
     edge_data["tgt_nid"].append(nkey2nid["chamber_house"])
     edge_data["src_nid"].append(nkey2nid["committee_"+committee])
@@ -18,30 +18,32 @@ from glob import glob
 import os
 join = os.path.join
 
+DATA_PATH = os.environ.get("REPG_DATA_ROOT", "../../../data")
+
 ### LOAD IN DATA ###
-df_bills_house = pd.read_csv("../../../data/house_bills.csv", sep='\x01')
-df_bills_sen = pd.read_csv("../../../data/senate_bills.csv", sep='\x01')
+df_bills_house = pd.read_csv(join(DATA_PATH, "house_bills.csv"), sep='\x01')
+df_bills_sen = pd.read_csv(join(DATA_PATH, "senate_bills.csv"), sep='\x01')
 
-df_topics_house = pd.read_csv("../../../data/house_topics_subjects.tsv", sep = "\t")
-df_topics_sen = pd.read_csv("../../../data/senate_topics_subjects.tsv", sep = "\t")
+df_topics_house = pd.read_csv(join(DATA_PATH, "house_topics_subjects.tsv"), sep = "\t")
+df_topics_sen = pd.read_csv(join(DATA_PATH, "senate_topics_subjects.tsv"), sep = "\t")
 
-df_committee_house = pd.read_csv("../../../data/house_committees_v2.csv")
-df_committee_sen = pd.read_csv("../../../data/senate_committees_v2.csv")
-df_committee_joint = pd.read_csv("../../../data/joint_committees.csv")
+df_committee_house = pd.read_csv(join(DATA_PATH, "house_committees_v2.csv"))
+df_committee_sen = pd.read_csv(join(DATA_PATH, "senate_committees_v2.csv"))
+df_committee_joint = pd.read_csv(join(DATA_PATH, "joint_committees.csv"))
 
 df_lobbyist = pd.concat([
-    pd.read_csv(fname) for fname in glob("../../../data/contributions_*.csv")])  # don't use 2021
+    pd.read_csv(fname) for fname in glob(join(DATA_PATH, "contributions_*.csv"))])  # don't use 2021
 
-df_member_house = pd.read_csv("../../../data/house_116.csv")
-df_member_sen = pd.read_csv("../../../data/senate_116.csv")
+df_member_house = pd.read_csv(join(DATA_PATH, "house_116.csv"))
+df_member_sen = pd.read_csv(join(DATA_PATH, "senate_116.csv"))
 
-df_vote_house = pd.read_csv("../../../data/house_votes.csv", dtype=str)
+df_vote_house = pd.read_csv(join(DATA_PATH, "house_votes.csv"), dtype=str)
 df_vote_house['number'] = df_vote_house['number'].astype(int)
 df_vote_house['session'] = df_vote_house['session'].astype(int)
 df_vote_house = df_vote_house[df_vote_house["session"] != 2021]  # filter out 2021
 df_vote_house = df_vote_house.sort_values(by=["session", "number"])
 
-df_vote_sen = pd.read_csv("../../../data/senate_votes.csv", dtype=str)
+df_vote_sen = pd.read_csv(join(DATA_PATH, "senate_votes.csv"), dtype=str)
 df_vote_sen['number'] = df_vote_sen['number'].astype(int)
 df_vote_sen['session'] = df_vote_sen['session'].astype(int)
 df_vote_sen = df_vote_sen[df_vote_sen["session"] != 2021]  # filter out 2021
@@ -159,5 +161,5 @@ for i, item in enumerate(lobbyist_set):
 
 
 # Save the node data into csv file
-NODE_PATH = "../../../data/nodes.csv"
+NODE_PATH = join(DATA_PATH, "nodes.csv")
 pd.DataFrame(node_data).to_csv(NODE_PATH, index=False)
\ No newline at end of file
@@ -5,12 +5,14 @@ from tqdm import tqdm
 import os
 join = os.path.join
 
+DATA_PATH = os.environ.get("REPG_DATA_ROOT", "../../../data")
+
 lines_to_print_node, lines_to_print_edge = [], []
 
 #
 # NODES
 #
-NODE_PATH = "../../../data/nodes.csv"
+NODE_PATH = join(DATA_PATH, "nodes.csv")
 df_node = pd.read_csv(NODE_PATH)
 lines_to_print_node += [f"Number of nodes (total) = {len(df_node)}"]
 lines_to_print_node += [""]
@@ -26,7 +28,7 @@ for ntype in node_types:
 #
 # EDGES
 #
-EDGE_PATH = "../../../data/edges"
+EDGE_PATH = join(DATA_PATH, "edges")
 edge_files = glob(join(EDGE_PATH, "*.csv"))
 edge_files.sort()
 used_node_ids = set()
@@ -0,0 +1,491 @@
+"""
+Pipeline producing everything the app reads, from the raw data files.
+
+Every stage is one of the repo's scripts, declared with the files it reads
+and writes under the data root (STAGES). A stage depends on the stages
+writing its inputs, and stages whose inputs are ready run in parallel, each
+script in its own process with its own directory as working directory and
+the data root in the REPG_DATA_ROOT environment variable.
+
+A stage is skipped when the content of its inputs, its code and its
+arguments hash to the same key as on its last successful run, and its
+outputs are still what that run wrote. So after a change only the stages
+downstream of it run, and a stage whose rewritten outputs are identical to
+the previous ones stops the change there. The keys, and the hashes of the
+files by size and mtime (so unchanged files are not read again), are kept in
+<data root>/.pipeline_state.json, along with the time, CPU time and peak
+memory of each stage's last run. Each stage's output goes to
+<data root>/logs/pipeline/<stage>.log.
+
+A stage whose raw inputs are missing but whose outputs exist, e.g. a data
+snapshot shipped without the downloaded json files, keeps its outputs.
+
+Run from the repository root:
+    python src/pipeline.py                          # refresh everything that changed
+    python src/pipeline.py --list
+    python src/pipeline.py clusters q1 --dry-run    # what refreshing these stages would run
+    python src/pipeline.py --data-root /path/to/data --jobs 2 --force
+"""
+
+import argparse
+import concurrent.futures
+import glob
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import threading
+import time
+join = os.path.join
+
+SRC_PATH = os.path.dirname(os.path.abspath(__file__))
+DATA_PATH = os.environ.get("REPG_DATA_ROOT", "./data")
+STATE_FILE = ".pipeline_state.json"
+LOG_DIR = join("logs", "pipeline")
+JOBS = 4
+# Lines of a failed stage's log printed
+LOG_TAIL = 20
+# ru_maxrss is in bytes on macOS, in kilobytes elsewhere
+MAXRSS_PER_MB = 1 << 20 if sys.platform == "darwin" else 1 << 10
+# Runs a command and writes the CPU time and peak memory of it and its children
+# to a file. Scripts are started from this small process rather than from the
+# pipeline's own, since the peak memory of a process also counts the memory of
+# the process it was forked from.
+MEASURE = """
+import json, resource, subprocess, sys
+returncode = subprocess.call(sys.argv[2:])
+usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+with open(sys.argv[1], "w") as f:
+    json.dump([usage.ru_utime + usage.ru_stime, usage.ru_maxrss], f)
+sys.exit(returncode)
+"""
+
+CONSTRUCTION = "knowledge_graph/construction"
+ANALYSIS = "knowledge_graph/analysis"
+CLUSTERING = "community_detection/02 Clustering"
+CHAMBERS = ["house", "senate"]
+QUESTIONS = ["q1_party_distribution", "q3_most_important_lobbyists", "q4.1_most_important_committees",
+             "q9_most_influential_members"]
+
+
+def per_chamber(pattern):
+    return [pattern.format(chamber) for chamber in CHAMBERS]
+
+
+class Stage:
+    """
+    One step of the pipeline.
+
+    Parameters
+    ---
+    name - name of the stage on the command line
+    script - the script run, relative to src/; None for a stage run by func
+    inputs - files and directories read, relative to the data root; glob patterns
+        match every file they cover
+    outputs - files and directories written, relative to the data root
+    args - arguments of the script; "{data}" is replaced by the data root
+    code - other source files the script imports, relative to src/
+    func - function(data_path) run instead of a script
+    """
+
+    def __init__(self, name, script=None, inputs=(), outputs=(), args=(), code=(), func=None):
+        self.name = name
+        self.script = script
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.args = list(args)
+        self.code = ([script] if script else []) + list(code)
+        self.func = func
+
+    def __repr__(self):
+        return f"Stage({self.name!r})"
+
+
+def publish_results(data_path):
+    """
+    Copy the analysis results where the app reads them, replacing each file
+    at once so the app never reads one half written. Unchanged files are not
+    touched, so the app does not reload them.
+    """
+    os.makedirs(join(data_path, "results"), exist_ok=True)
+    for question in QUESTIONS:
+        src, dst = join(data_path, f"{question}.csv"), join(data_path, "results", f"{question}.csv")
+        if os.path.exists(dst) and file_digest(src) == file_digest(dst):
+            continue
+        shutil.copyfile(src, dst + ".tmp")
+        os.replace(dst + ".tmp", dst)
+
+
+MEMBER_FILES = ["house_116.csv", "senate_116.csv"]
+VOTE_FILES = per_chamber("{}_votes.csv")
+COMMITTEE_FILES = ["house_committees_v2.csv", "senate_committees_v2.csv", "joint_committees.csv"]
+QUESTION_INPUTS = ["graph.dgl", "nodes.csv", "cluster_assignments"]
+QUESTION_CODE = [ANALYSIS + "/get_subgraph.py", CLUSTERING + "/cluster_assignments.py"]
+
+STAGES = [
+    Stage("parse_bills", "data_retrieval/parse_bills_data.py",
+          inputs=per_chamber("{}_bills.json"), outputs=per_chamber("{}_bills.csv")),
+    Stage("normalize_committees", "data_retrieval/normalize_committees.py",
+          inputs=["house_committees.json", "senate_committees.json", "joint_committees.json"],
+          outputs=COMMITTEE_FILES),
+    Stage("nodes", CONSTRUCTION + "/derive_node_file.py",
+          inputs=per_chamber("{}_bills.csv") + per_chamber("{}_topics_subjects.tsv") + COMMITTEE_FILES
+          + ["contributions_*.csv"] + MEMBER_FILES + VOTE_FILES,
+          outputs=["nodes.csv"]),
+    Stage("edges", CONSTRUCTION + "/derive_edge_files.py",
+          inputs=per_chamber("{}_bills.csv") + per_chamber("{}_bills_topics_subjects.tsv") + COMMITTEE_FILES
+          + per_chamber("{}_committee_memberships.json") + ["joint_committee_memberships.json", "contributions_*.csv"]
+          + MEMBER_FILES + VOTE_FILES + ["nodes.csv"],
+          outputs=["edges"]),
+    Stage("graph", ANALYSIS + "/create_dgl_graph.py", inputs=["nodes.csv", "edges"], outputs=["graph.dgl"]),
+    Stage("clustering_data", "community_detection/01 Clustering data prep/clustering_data_prep.py",
+          inputs=per_chamber("{}_bills_topics_subjects.tsv") + per_chamber("{}_joint_subjects_topics.tsv")
+          + VOTE_FILES + ["senate_116.csv"],
+          outputs=per_chamber("{}_data_for_clustering.csv")),
+    Stage("clusters", CLUSTERING + "/vote_clustering.py",
+          inputs=per_chamber("{}_data_for_clustering.csv") + ["nodes.csv"],
+          outputs=["cluster_assignments"] + per_chamber("{}_cluster_k_selection.csv"),
+          code=[CLUSTERING + "/" + module for module in
+                ["fast_kmodes.py", "select_k.py", "consensus_clustering.py", "cluster_cache.py",
+                 "cluster_assignments.py"]]),
+    Stage("q1", ANALYSIS + "/q1_party_distribution.py", inputs=QUESTION_INPUTS,
+          outputs=["q1_party_distribution.csv"], code=QUESTION_CODE),
+    Stage("q3", ANALYSIS + "/q3_most_important_lobbyists.py", inputs=QUESTION_INPUTS,
+          outputs=["q3_most_important_lobbyists.csv"], code=QUESTION_CODE),
+    Stage("q4.1", ANALYSIS + "/q4.1_most_important_committees.py", inputs=QUESTION_INPUTS,
+          outputs=["q4.1_most_important_committees.csv"], code=QUESTION_CODE),
+    Stage("q9", ANALYSIS + "/q9_most_influential_members.py", inputs=QUESTION_INPUTS + MEMBER_FILES,
+          outputs=["q9_most_influential_members.csv"], code=QUESTION_CODE),
+    Stage("publish_results", func=publish_results, inputs=[f"{q}.csv" for q in QUESTIONS],
+          outputs=[f"results/{q}.csv" for q in QUESTIONS], code=["pipeline.py"]),
+    Stage("viz_clusters", "community_detection/viz_clusters.py",
+          inputs=["results/q1_party_distribution.csv"], outputs=["clusters/viz_clusters.csv"]),
+    Stage("topic_graphs", "visualization/topic_graphs.py",
+          inputs=["clusters/viz_clusters.csv"], outputs=["clusters/topic_graphs.json"],
+          args=["--clusters", "{data}/clusters/viz_clusters.csv", "--out", "{data}/clusters/topic_graphs.json"],
+          code=["visualization/result_store.py"]),
+    Stage("filtered_topics", "topic_modeling/topic_filtering.py",
+          inputs=["topics/subject_topic_full_edges.tsv"], outputs=["topics/filtered_sub_top.csv"]),
+]
+
+
+class MissingInput(Exception):
+    pass
+
+
+def file_digest(path):
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class Hashes:
+    """
+    Content hashes of files, cached by (size, mtime) so a file is only read
+    again once it changed.
+
+    Parameters
+    ---
+    cache - dict of path -> [size, mtime_ns, digest], e.g. from a previous run
+    """
+
+    def __init__(self, cache=None):
+        self.cache = cache if cache is not None else {}
+        self._lock = threading.Lock()
+
+    def file(self, path):
+        st = os.stat(path)
+        with self._lock:
+            cached = self.cache.get(path)
+        if cached is not None and cached[:2] == [st.st_size, st.st_mtime_ns]:
+            return cached[2]
+        digest = file_digest(path)
+        with self._lock:
+            self.cache[path] = [st.st_size, st.st_mtime_ns, digest]
+        return digest
+
+    def paths(self, root, patterns):
+        """
+        One digest of the names and contents of every file matched by patterns,
+        relative to root. Raises MissingInput for a pattern matching nothing.
+        """
+        h = hashlib.blake2b(digest_size=16)
+        for pattern in patterns:
+            for path in expand(root, pattern):
+                h.update(os.path.relpath(path, root).encode() + b"\0" + self.file(path).encode() + b"\n")
+        return h.hexdigest()
+
+
+def expand(root, pattern):
+    """The files matched by a file, directory or glob pattern under root, sorted"""
+    path = join(root, pattern)
+    if os.path.isdir(path):
+        files = [join(dirpath, f) for dirpath, _, fnames in os.walk(path) for f in fnames]
+    elif glob.has_magic(pattern):
+        files = glob.glob(path)
+    elif os.path.exists(path):
+        files = [path]
+    else:
+        files = []
+    if not files:
+        raise MissingInput(pattern)
+    return sorted(files)
+
+
+def dependencies(stages):
+    """
+    The stages each stage reads the outputs of.
+
+    Returns
+    ---
+    deps - dict of stage name -> set of stage names
+    """
+    producers = {}
+    for stage in stages:
+        for output in stage.outputs:
+            if output in producers:
+                raise ValueError(f"{output} is written by both {producers[output]} and {stage.name}")
+            producers[output] = stage.name
+    deps = {}
+    for stage in stages:
+        deps[stage.name] = {producer for inp in stage.inputs for output, producer in producers.items()
+                            if inp == output or inp.startswith(output + "/")} - {stage.name}
+    # Every stage must come after the stages it depends on, which also rules out cycles
+    seen = set()
+    for stage in stages:
+        if not deps[stage.name] <= seen:
+            raise ValueError(f"{stage.name} is declared before {sorted(deps[stage.name] - seen)}")
+        seen.add(stage.name)
+    return deps
+
+
+def upstream(names, deps):
+    """The named stages and every stage they depend on, directly or not"""
+    selected, todo = set(), list(names)
+    while todo:
+        name = todo.pop()
+        if name not in selected:
+            selected.add(name)
+            todo.extend(deps[name])
+    return selected
+
+
+class Pipeline:
+    """
+    Runs stages in dependency order, skipping the stages that are up to date.
+
+    Parameters
+    ---
+    data_path - the data root
+    stages - list of Stage, each after the stages it depends on
+    jobs - maximum number of stages run at once
+    """
+
+    def __init__(self, data_path=DATA_PATH, stages=STAGES, jobs=JOBS):
+        self.data_path = os.path.abspath(data_path)
+        self.stages = {stage.name: stage for stage in stages}
+        self.order = [stage.name for stage in stages]
+        self.deps = dependencies(stages)
+        self.jobs = jobs
+        self.state_path = join(self.data_path, STATE_FILE)
+        state = {}
+        if os.path.exists(self.state_path):
+            with open(self.state_path) as f:
+                state = json.load(f)
+        self.runs = state.get("stages", {})
+        self.hashes = Hashes(state.get("files", {}))
+        self._lock = threading.Lock()
+
+    def save_state(self):
+        with self._lock:
+            state = {"stages": dict(self.runs), "files": dict(self.hashes.cache)}
+        tmp_path = self.state_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(state, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.state_path)
+
+    def key(self, stage):
+        """Hash of everything a stage's outputs depend on. Raises MissingInput."""
+        h = hashlib.blake2b(digest_size=16)
+        h.update(self.hashes.paths(SRC_PATH, stage.code).encode())
+        h.update(json.dumps([stage.args, stage.func.__name__ if stage.func else None]).encode())
+        h.update(self.hashes.paths(self.data_path, stage.inputs).encode())
+        return h.hexdigest()
+
+    def outputs_digest(self, stage):
+        try:
+            return self.hashes.paths(self.data_path, stage.outputs)
+        except MissingInput:
+            return None
+
+    def up_to_date(self, stage, key):
+        run = self.runs.get(stage.name)
+        return run is not None and run["key"] == key and run["outputs"] == self.outputs_digest(stage)
+
+    def execute(self, stage):
+        """
+        Run a stage's script or function, with its output going to the stage's log.
+
+        Returns
+        ---
+        usage - dict of the CPU seconds and peak memory in MB of the script's process,
+            its children included; empty for a function, or outside of POSIX systems
+        """
+        log_path = join(self.data_path, LOG_DIR, f"{stage.name}.log")
+        os.makedirs(os.path.dirname(log_path), exist_ok=True)
+        if stage.func is not None:
+            stage.func(self.data_path)
+            return {}
+        script = join(SRC_PATH, stage.script)
+        args = [arg.replace("{data}", self.data_path) for arg in stage.args]
+        env = dict(os.environ, REPG_DATA_ROOT=self.data_path)
+        command = [sys.executable, os.path.basename(script)] + args
+        usage_path = join(self.data_path, LOG_DIR, f"{stage.name}.usage.json")
+        if os.path.exists(usage_path):
+            os.remove(usage_path)
+        if os.name == "posix":
+            command = [sys.executable, "-c", MEASURE, usage_path] + command
+        with open(log_path, "w") as log:
+            process = subprocess.run(command, cwd=os.path.dirname(script), env=env, stdout=log,
+                                     stderr=subprocess.STDOUT)
+        usage = {}
+        if os.path.exists(usage_path):
+            with open(usage_path) as f:
+                cpu_seconds, max_rss = json.load(f)
+            os.remove(usage_path)
+            usage = {"cpu_seconds": round(cpu_seconds, 3), "max_rss_mb": round(max_rss / MAXRSS_PER_MB, 1)}
+        if process.returncode != 0:
+            with open(log_path) as log:
+                tail = "".join(log.readlines()[-LOG_TAIL:])
+            raise RuntimeError(f"exited with {process.returncode}, see {log_path}\n{tail}")
+        return usage
+
+    def run_stage(self, stage, force=False):
+        """
+        Returns
+        ---
+        status - "ran", "skipped" or "kept" (inputs missing, existing outputs kept)
+        """
+        try:
+            key = self.key(stage)
+        except MissingInput as e:
+            if self.outputs_digest(stage) is not None:
+                print(f"[keep] {stage.name}: {e} is missing, keeping the existing outputs")
+                return "kept"
+            raise RuntimeError(f"input {e} is missing")
+        if not force and self.up_to_date(stage, key):
+            print(f"[skip] {stage.name}")
+            return "skipped"
+        print(f"[run]  {stage.name}")
+        start = time.perf_counter()
+        usage = self.execute(stage)
+        seconds = time.perf_counter() - start
+        outputs = self.outputs_digest(stage)
+        if outputs is None:
+            raise RuntimeError(f"did not write all of {stage.outputs}")
+        with self._lock:
+            self.runs[stage.name] = dict(usage, key=key, outputs=outputs, seconds=round(seconds, 3))
+        self.save_state()
+        print(f"[done] {stage.name} in {seconds:.1f}s")
+        return "ran"
+
+    def select(self, names=None):
+        """The named stages and their upstream stages, in order; all stages by default"""
+        unknown = set(names or []) - set(self.stages)
+        if unknown:
+            raise ValueError(f"Unknown stages {sorted(unknown)}, choose from {self.order}")
+        selected = upstream(names, self.deps) if names else set(self.order)
+        return [name for name in self.order if name in selected]
+
+    def run(self, names=None, force=False):
+        """
+        Run the named stages and the stages they depend on, at most self.jobs at once.
+        force reruns the named stages (all stages by default) even if they are up to date.
+
+        Returns
+        ---
+        status - dict of stage name -> "ran", "skipped", "kept", "failed" or "blocked"
+        """
+        todo = self.select(names)
+        forced = set(names or todo) if force else set()
+        status = {}
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.jobs) as pool:
+            running = {}
+            while todo or running:
+                for name in list(todo):
+                    deps = self.deps[name]
+                    if any(status.get(dep) in ("failed", "blocked") for dep in deps):
+                        status[name] = "blocked"
+                        todo.remove(name)
+                    elif all(dep in status for dep in deps):
+                        running[pool.submit(self.run_stage, self.stages[name], name in forced)] = name
+                        todo.remove(name)
+                if not running:
+                    continue
+                done, _ = concurrent.futures.wait(running, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        status[name] = future.result()
+                    except Exception as e:
+                        print(f"[fail] {name}: {e}")
+                        status[name] = "failed"
+        return status
+
+    def plan(self, names=None, force=False):
+        """
+        What run() would do, without running anything.
+
+        Returns
+        ---
+        plan - dict of stage name -> "run", "skip", "keep" or "missing input <pattern>"
+        """
+        todo = self.select(names)
+        forced = set(names or todo) if force else set()
+        plan = {}
+        for name in todo:
+            stage = self.stages[name]
+            if name in forced or any(plan[dep] == "run" for dep in self.deps[name]):
+                plan[name] = "run"
+                continue
+            try:
+                plan[name] = "skip" if self.up_to_date(stage, self.key(stage)) else "run"
+            except MissingInput as e:
+                plan[name] = "keep" if self.outputs_digest(stage) is not None else f"missing input {e}"
+        return plan
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Refresh the data read by the app, running only what changed")
+    parser.add_argument("stages", nargs="*", help="stages to refresh, with the stages they depend on (default: all)")
+    parser.add_argument("--data-root", default=DATA_PATH, help="data directory (default: $REPG_DATA_ROOT or ./data)")
+    parser.add_argument("--jobs", type=int, default=JOBS, help="maximum number of stages run at once")
+    parser.add_argument("--force", action="store_true", help="rerun the given stages even if they are up to date")
+    parser.add_argument("--dry-run", action="store_true", help="print what would run")
+    parser.add_argument("--list", action="store_true", help="print the stages with their inputs and outputs")
+    args = parser.parse_args()
+
+    pipeline = Pipeline(args.data_root, jobs=args.jobs)
+    if args.list:
+        for name in pipeline.order:
+            stage = pipeline.stages[name]
+            print(f"{name} ({stage.script or stage.func.__name__})")
+            print(f"    after:   {', '.join(sorted(pipeline.deps[name])) or '-'}")
+            print(f"    inputs:  {', '.join(stage.inputs)}")
+            print(f"    outputs: {', '.join(stage.outputs)}")
+    elif args.dry_run:
+        for name, action in pipeline.plan(args.stages, args.force).items():
+            print(f"{name}: {action}")
+    else:
+        start = time.perf_counter()
+        status = pipeline.run(args.stages, args.force)
+        counts = {s: sum(v == s for v in status.values()) for s in ["ran", "skipped", "kept", "failed", "blocked"]}
+        print(f"{', '.join(f'{n} {s}' for s, n in counts.items() if n)} in {time.perf_counter() - start:.1f}s")
+        blocked = [name for name, s in status.items() if s == "blocked"]
+        if blocked:
+            print(f"Not run because a stage they depend on failed: {', '.join(blocked)}")
+        sys.exit(1 if counts["failed"] or counts["blocked"] else 0)
@@ -0,0 +1,203 @@
+"""
+Per-stage benchmark of the pipeline on synthetic data.
+
+For every scale factor, synthetic_data.py writes the raw data into a fresh
+data root and every stage of pipeline.py is run on it, one stage at a time
+so the stages do not compete for the CPU, with an empty clustering cache.
+For each stage the wall time, CPU time and peak memory of its process (see
+Pipeline.execute) and the size of its inputs and outputs are recorded, and
+everything is written to a JSON file.
+
+With two scales or more, each stage's scaling exponent is the slope of
+log(time) against log(scale): about 1 for a stage linear in the data, 2 for
+a quadratic one. With --compare, the times and peak memory are compared to
+those of an earlier results file at the same scales, and the run fails if a
+stage got slower or bigger by more than --tolerance.
+
+Run from the repository root:
+    python src/pipeline_benchmark.py --scales 0.1 0.2 0.5
+    python src/pipeline_benchmark.py --scales 1 --vary votes --stages clustering_data clusters
+    python src/pipeline_benchmark.py --scales 0.1 0.2 0.5 --compare data/benchmarks/pipeline_20221201-120000.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+join = os.path.join
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from pipeline import Pipeline, MissingInput, expand
+from synthetic_data import generate
+
+BENCHMARKS_PATH = "./data/benchmarks"
+SCALES = [0.1, 0.2, 0.5]
+# Slower or bigger than the baseline by more than this fraction is a regression
+TOLERANCE = 0.2
+# Stages faster than this are not compared, their time is mostly noise
+MIN_SECONDS = 1.0
+
+
+def total_mb(root, patterns):
+    try:
+        return round(sum(os.path.getsize(path) for pattern in patterns for path in expand(root, pattern)) / 1e6, 3)
+    except MissingInput:
+        return None
+
+
+def benchmark_scale(data_path, scales, stages=None, seed=0):
+    """
+    Generate the synthetic data of one scale into data_path and run the stages on it.
+
+    Parameters
+    ---
+    data_path - an empty data root
+    scales - dict of the scale of the members, votes and contributions
+    stages - names of the stages run, with their upstream stages; all by default
+
+    Returns
+    ---
+    result - dict with the scales, the sizes of the data, the time taken to generate it
+        and, per stage, its status, time, CPU time, peak memory and data sizes
+    """
+    start = time.perf_counter()
+    sizes = generate(data_path, scales["members"], scales["votes"], scales["contributions"], seed)
+    generate_seconds = time.perf_counter() - start
+
+    # A cold cache, so the clustering is timed and not the cache
+    os.environ["REPG_CLUSTER_CACHE"] = join(data_path, "cache", "clusters")
+    pipeline = Pipeline(data_path, jobs=1)
+    status = pipeline.run(stages, force=True)
+    result = {"scales": scales, "sizes": sizes, "generate_seconds": round(generate_seconds, 3), "stages": {}}
+    for name, stage_status in status.items():
+        stage = pipeline.stages[name]
+        run = pipeline.runs.get(name, {}) if stage_status == "ran" else {}
+        result["stages"][name] = {
+            "status": stage_status,
+            "seconds": run.get("seconds"),
+            "cpu_seconds": run.get("cpu_seconds"),
+            "max_rss_mb": run.get("max_rss_mb"),
+            "input_mb": total_mb(data_path, stage.inputs),
+            "output_mb": total_mb(data_path, stage.outputs),
+        }
+    return result
+
+
+def scaling_exponents(runs, vary):
+    """
+    Slope of log(seconds) against log(scale) of every stage timed at two scales or more.
+
+    Returns
+    ---
+    exponents - dict of stage name -> exponent
+    """
+    points = {}
+    for run in runs:
+        for name, stage in run["stages"].items():
+            if stage["seconds"]:
+                points.setdefault(name, []).append((run["scales"][vary], stage["seconds"]))
+    return {name: round(float(np.polyfit(np.log([s for s, _ in p]), np.log([t for _, t in p]), 1)[0]), 2)
+            for name, p in points.items() if len({s for s, _ in p}) > 1}
+
+
+def compare(results, baseline, tolerance=TOLERANCE, min_seconds=MIN_SECONDS):
+    """
+    The stages slower, or with a higher peak memory, than in a baseline results
+    file by more than tolerance, at the scales both have run.
+
+    Returns
+    ---
+    regressions - list of (scales, stage, measure, baseline value, value)
+    """
+    baseline_runs = {json.dumps(run["scales"], sort_keys=True): run for run in baseline["runs"]}
+    regressions = []
+    for run in results["runs"]:
+        baseline_run = baseline_runs.get(json.dumps(run["scales"], sort_keys=True))
+        if baseline_run is None:
+            continue
+        for name, stage in run["stages"].items():
+            before = baseline_run["stages"].get(name, {})
+            for measure in ["seconds", "max_rss_mb"]:
+                old, new = before.get(measure), stage.get(measure)
+                if old is None or new is None or (measure == "seconds" and old < min_seconds):
+                    continue
+                if new > old * (1 + tolerance):
+                    regressions.append((run["scales"], name, measure, old, new))
+    return regressions
+
+
+def print_table(results):
+    names = list(dict.fromkeys(name for run in results["runs"] for name in run["stages"]))
+    print(f"\n{'stage':<22}" + "".join(f"{run['scales'][results['vary']]:>18g}" for run in results["runs"])
+          + f"{'exponent':>10}")
+    for name in names:
+        cells = []
+        for run in results["runs"]:
+            stage = run["stages"].get(name, {})
+            if stage.get("seconds") is None:
+                cells.append(stage.get("status", "-"))
+            else:
+                cells.append(f"{stage['seconds']:.1f}s {stage['max_rss_mb'] or 0:.0f}MB")
+        exponent = results["scaling_exponents"].get(name)
+        print(f"{name:<22}" + "".join(f"{cell:>18}" for cell in cells) + f"{'' if exponent is None else exponent:>10}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Time and memory-profile every pipeline stage on synthetic data")
+    parser.add_argument("--scales", type=float, nargs="+", default=SCALES, help="scale factors, 1 is about the 116th Congress")
+    parser.add_argument("--vary", choices=["all", "members", "votes", "contributions"], default="all",
+                        help="what the scale factors scale; the others stay at --fixed")
+    parser.add_argument("--fixed", type=float, default=1.0, help="scale of what --vary does not scale")
+    parser.add_argument("--stages", nargs="+", help="stages run, with their upstream stages (default: all)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--work-dir", help="where the data roots are written (default: a temporary directory)")
+    parser.add_argument("--keep", action="store_true", help="keep the data roots")
+    parser.add_argument("--out", help=f"results file (default: {BENCHMARKS_PATH}/pipeline_<time>.json)")
+    parser.add_argument("--compare", help="earlier results file to compare with")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+    args = parser.parse_args()
+
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix="repg-benchmark-")
+    results = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "vary": "members" if args.vary == "all" else args.vary,
+        "runs": [],
+    }
+    try:
+        for scale in args.scales:
+            scales = {dim: scale if args.vary in ("all", dim) else args.fixed
+                      for dim in ["members", "votes", "contributions"]}
+            data_path = join(work_dir, f"scale_{scale:g}")
+            print(f"\n=== scale {scale:g}: {scales}")
+            results["runs"].append(benchmark_scale(data_path, scales, args.stages, args.seed))
+            if not args.keep:
+                shutil.rmtree(data_path, ignore_errors=True)
+    finally:
+        if not args.keep and not args.work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+    results["scaling_exponents"] = scaling_exponents(results["runs"], results["vary"])
+
+    out_path = args.out or join(BENCHMARKS_PATH, f"pipeline_{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out_path)), exist_ok=True)
+    with open(out_path, "w") as f:
+        json.dump(results, f, indent=1)
+    print_table(results)
+    print(f"\nResults written to {out_path}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for scales, name, measure, old, new in regressions:
+            print(f"Regression at {scales}: {name} {measure} {old} -> {new} (+{(new / old - 1) * 100:.0f}%)")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions against {args.compare}")
@@ -0,0 +1,426 @@
+"""
+Synthetic raw data at a chosen scale, to see how the pipeline scales.
+
+Writes every raw input of the pipeline (see pipeline.py) into a data root,
+in the format of the real files: members (house_116.csv, senate_116.csv),
+roll call votes (house_votes.csv, senate_votes.csv), bills
+(<chamber>_bills.json) with their topics and subjects, committees and
+committee memberships, the LDA contributions (contributions_<year>.csv) and
+the subject/topic edges. At scale 1 the sizes are about those of the 116th
+Congress (BASE_SIZES); the members, the votes and the contributions can be
+scaled separately. Everything is drawn from a seed, so a scale always gives
+the same files.
+
+Members get a party and a left-right position, and vote Yea when a vote's
+cut point is to their side, so the vote clusters follow the parties like the
+real ones do. A few committee member names and all the contribution honoree
+names differ from the member file, so the fuzzy name matching of
+derive_edge_files.py has work to do.
+
+Run from the repository root:
+    python src/synthetic_data.py /tmp/repg-data --scale 2
+    python src/synthetic_data.py /tmp/repg-data --members 1 --votes 10 --contributions 5
+"""
+
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+join = os.path.join
+
+sys.path.append(join(os.path.dirname(os.path.abspath(__file__)), "data_retrieval"))
+from flatten_contributions import write_csv
+
+CONGRESS = 116
+SESSIONS = [2019, 2020]
+CHAMBERS = ["house", "senate"]
+# Sizes at scale 1
+BASE_SIZES = {
+    "house_members": 441, "senate_members": 100,
+    "house_votes": 950, "senate_votes": 720,
+    "house_bills": 9000, "senate_bills": 5000,
+    "contributions": 20000,  # contribution items per filing year
+    "registrants": 2000,
+}
+# Which scale factor scales each size
+SIZE_SCALES = {
+    "house_members": "members", "senate_members": "members",
+    "house_votes": "votes", "senate_votes": "votes",
+    "house_bills": "members", "senate_bills": "members",
+    "contributions": "contributions", "registrants": "contributions",
+}
+JOINT_RESOLUTIONS = 0.02  # fraction of the bills that are joint resolutions
+BILL_VOTES = 0.7  # fraction of the votes on a bill
+VOTE_BLOCK = 2000  # votes generated and written at a time
+N_COMMITTEES = {"house": 21, "senate": 16, "joint": 4}
+MAX_SUBCOMMITTEES = 7
+MISSPELLED_MEMBERS = 0.05  # fraction of committee member names with a middle initial
+
+# Parties of each chamber's members and their shares, as in the 116th Congress: independents
+# are "I" in the House member file and "ID" in the Senate one
+PARTIES = {"house": ["D", "R", "I"], "senate": ["D", "R", "ID"]}
+PARTY_SHARES = {"house": [0.53, 0.465, 0.005], "senate": [0.45, 0.53, 0.02]}
+PARTY_POSITIONS = {"D": -1.0, "R": 1.0, "I": -0.6, "ID": -0.8}
+STATES = ["AL", "AK", "AZ", "AR", "CA", "CO", "CT", "DE", "FL", "GA", "HI", "ID", "IL", "IN", "IA", "KS", "KY",
+          "LA", "ME", "MD", "MA", "MI", "MN", "MS", "MO", "MT", "NE", "NV", "NH", "NJ", "NM", "NY", "NC", "ND",
+          "OH", "OK", "OR", "PA", "RI", "SC", "SD", "TN", "TX", "UT", "VT", "VA", "WA", "WV", "WI", "WY"]
+FIRST_NAMES = ["Mary", "John", "Patricia", "Robert", "Jennifer", "Michael", "Linda", "William", "Elizabeth",
+               "David", "Barbara", "Richard", "Susan", "Joseph", "Jessica", "Thomas", "Sarah", "Charles",
+               "Karen", "Daniel", "Nancy", "Matthew", "Lisa", "Anthony", "Betty", "Mark", "Sandra", "Donald",
+               "Ashley", "Steven", "Kimberly", "Paul", "Donna", "Andrew", "Emily", "Joshua", "Michelle"]
+SYLLABLES = ["an", "ber", "cal", "do", "er", "fin", "gar", "har", "is", "jon", "kel", "lan", "mor", "nel",
+             "os", "per", "quin", "ros", "son", "ter", "ul", "van", "wil", "yat", "zel"]
+# Policy areas (topics) and legislative subjects; the topics kept by
+# topic_filtering.py come first, each with subjects of its own
+TOPIC_SUBJECTS = {
+    "Government operations and politics": [
+        "Government information and archives", "political campaign regulation", "Elections", "voting",
+        "State and local government operations", "benefits", "personnel management", "Government employee pay",
+        "public corruption"],
+    "Health": [
+        "Health programs administration and funding", "Health promotion and preventive care", "Prescription drugs",
+        "Health care costs and insurance", "Department of Health and Human Services"],
+    "Armed forces and national security": [
+        "Veterans medical care", "Asia", "Conflicts and wars", "Military operations and strategy"],
+    "Finance and financial sector": [
+        "Securities", "Financial services and investments", "Banking and financial institutions regulation",
+        "Business records", "Fraud offenses and financial crimes"],
+    "Economics and public finance": [
+        "Appropriations", "Indian social and development programs", "Government trust funds",
+        "Department of Housing and Urban Development", "Roads and highways", "District of Columbia"],
+    "Education": ["Elementary and secondary education", "Higher education", "Student aid and college costs"],
+    "Energy": ["Oil and gas", "Renewable energy sources", "Electric power generation and transmission"],
+    "Environmental protection": ["Air quality", "Water quality", "Climate change and greenhouse gases"],
+    "Immigration": ["Border security and unlawful immigration", "Refugees, asylum, displaced persons"],
+    "Taxation": ["Income tax credits", "Tax administration and collection, taxpayers"],
+    "Crime and law enforcement": ["Law enforcement officers", "Firearms and explosives"],
+    "Agriculture and food": ["Agricultural trade", "Food assistance and relief"],
+}
+SHARED_SUBJECTS = ["Congressional oversight", "Government studies and investigations",
+                   "Executive agency funding and structure", "Administrative law and regulatory procedures"]
+BILL_STATUSES = ["INTRODUCED", "REFERRED", "REPORTED", "PASS_OVER:HOUSE", "PASSED:BILL", "ENACTED:SIGNED"]
+HONOREE_FORMATS = ["{first} {last}", "Friends of {first} {last}", "{first} {last} for Congress",
+                   "Senator {first} {last}", "Rep. {first} {last}", "{last} for Senate"]
+COMPANY_WORDS = ["American", "National", "United", "Pacific", "Atlantic", "General", "Federal", "Global",
+                 "Capitol", "Liberty", "Summit", "Pioneer", "Frontier", "Heritage", "Keystone", "Union"]
+COMPANY_KINDS = ["Association", "Council", "Group", "Partners", "Coalition", "Institute", "Industries",
+                 "Alliance", "Strategies", "Holdings"]
+
+
+def scaled_sizes(members=1.0, votes=1.0, contributions=1.0):
+    """
+    BASE_SIZES multiplied by the scale factor of each size, at least 2 each and at least
+    one member per party of a chamber
+    """
+    scales = {"members": members, "votes": votes, "contributions": contributions}
+    sizes = {name: max(2, int(round(size * scales[SIZE_SCALES[name]]))) for name, size in BASE_SIZES.items()}
+    for chamber, parties in PARTIES.items():
+        sizes[f"{chamber}_members"] = max(len(parties), sizes[f"{chamber}_members"])
+    return sizes
+
+
+def unique_names(rng, n, make):
+    """n distinct names from make(rng), which should rarely repeat"""
+    names, seen = [], set()
+    while len(names) < n:
+        name = make(rng)
+        if name not in seen:
+            seen.add(name)
+            names.append(name)
+    return names
+
+
+def last_name(rng):
+    return "".join(rng.choice(SYLLABLES, size=rng.randint(2, 5))).capitalize()
+
+
+def make_members(rng, chamber, n, first_id):
+    """
+    Members of a chamber, with the columns of the ProPublica member lists.
+
+    Returns
+    ---
+    df_member - one row per member; senators also have a lis_id
+    positions - left-right position of each member
+    """
+    last_names = unique_names(rng, n, last_name)
+    parties = PARTIES[chamber]
+    party = rng.choice(parties, size=n, p=PARTY_SHARES[chamber])
+    # Every party has a member at any scale, so the party nodes and the q1 columns are those of the real data
+    for p in parties:
+        if p not in party:
+            counts = pd.Series(party).value_counts()
+            party[rng.choice(np.flatnonzero(party == counts.index[0]))] = p
+    df_member = pd.DataFrame({
+        "id": [f"{name[0]}{first_id + i:06d}" for i, name in enumerate(last_names)],
+        "title": "Representative" if chamber == "house" else "Senator",
+        "first_name": rng.choice(FIRST_NAMES, size=n),
+        "middle_name": [f"{chr(65 + i)}." if i < 26 else "" for i in rng.randint(0, 60, size=n)],
+        "last_name": last_names,
+        "suffix": "",
+        "gender": rng.choice(["F", "M"], size=n),
+        "party": party,
+        "state": rng.choice(STATES, size=n),
+        "in_office": True,
+    })
+    if chamber == "house":
+        df_member["district"] = rng.randint(1, 53, size=n)
+    else:
+        df_member.insert(1, "lis_id", [f"S{i + 1:03d}" for i in range(n)])
+    positions = np.array([PARTY_POSITIONS[p] for p in party]) + rng.normal(0, 0.4, size=n)
+    return df_member, positions
+
+
+def bill_prefixes(chamber):
+    return ("hr", "hjres", "H R", "H.J.Res.") if chamber == "house" else ("s", "sjres", "S.", "S.J.Res.")
+
+
+def make_bills(rng, chamber, n, df_member):
+    """
+    Bills of a chamber, sponsored by its members, with their topics and subjects.
+
+    Returns
+    ---
+    bills - list of bill dicts in the format of the bills json files
+    df_topics - one (bill_id, topic, subject) row per subject of every bill
+    df_joint_topics - the same for the joint resolutions, with the topic and
+        subject columns swapped like in the real files
+    """
+    bill_prefix, joint_prefix, _, _ = bill_prefixes(chamber)
+    topics = list(TOPIC_SUBJECTS)
+    n_joint = max(1, int(n * JOINT_RESOLUTIONS))
+    bill_ids = [f"{bill_prefix}{i}-{CONGRESS}" for i in range(1, n - n_joint + 1)] + \
+               [f"{joint_prefix}{i}-{CONGRESS}" for i in range(1, n_joint + 1)]
+    member_ids, names, states = df_member["id"].to_numpy(), \
+        (df_member["first_name"] + " " + df_member["last_name"]).to_numpy(), df_member["state"].to_numpy()
+    bills, topic_rows, joint_rows = [], [], []
+    for bill_id in bill_ids:
+        topic = topics[rng.randint(len(topics))]
+        own = TOPIC_SUBJECTS[topic]
+        subjects = list(rng.choice(own, size=min(len(own), rng.randint(1, 4)), replace=False))
+        if rng.random_sample() < 0.4:
+            subjects.append(SHARED_SUBJECTS[rng.randint(len(SHARED_SUBJECTS))])
+        sponsor = rng.randint(len(member_ids))
+        # Drawn with replacement then deduplicated, as drawing without replacement
+        # permutes all the members for every bill
+        cosponsors = [c for c in dict.fromkeys(rng.randint(len(member_ids), size=rng.poisson(3))) if c != sponsor]
+        title = f"To amend the law on {subjects[0].lower()}, and for other purposes"
+        status = BILL_STATUSES[min(int(rng.exponential(1.0)), len(BILL_STATUSES) - 1)]
+        bills.append({
+            "bill_id": bill_id,
+            "official_title": title,
+            "popular_title": None,
+            "short_title": f"{subjects[0]} Act of {SESSIONS[0]}" if rng.random_sample() < 0.5 else None,
+            "subjects_top_term": topic,
+            "summary": {"text": f"This bill addresses {subjects[0].lower()}"} if rng.random_sample() < 0.8 else None,
+            "subjects": [topic] + subjects,
+            "status": status,
+            "history": {"vetoed": False, "enacted": status.startswith("ENACTED")},
+            "sponsor": {"bioguide_id": member_ids[sponsor], "name": names[sponsor], "state": states[sponsor]},
+            "cosponsors": [{"bioguide_id": member_ids[c], "name": names[c], "state": states[c]} for c in cosponsors],
+            "committees": [],
+        })
+        rows = joint_rows if bill_id.startswith(joint_prefix) else topic_rows
+        rows += [(bill_id, topic, subject) for subject in subjects]
+    df_topics = pd.DataFrame(topic_rows, columns=["bill_id", "topic", "subject"])
+    df_joint_topics = pd.DataFrame(joint_rows, columns=["bill_id", "subject", "topic"])
+    return bills, df_topics, df_joint_topics
+
+
+def write_votes(rng, chamber, n, df_member, positions, bill_ids, path):
+    """
+    Roll call votes of a chamber into a csv with one vote_<member> column per
+    member (bioguide ids in the House, lis ids in the Senate), VOTE_BLOCK votes
+    at a time so memory use does not grow with the number of votes.
+    """
+    _, _, bill_keyword, joint_keyword = bill_prefixes(chamber)
+    voter_ids = df_member["id"] if chamber == "house" else df_member["lis_id"]
+    vote_cols = ["vote_" + v for v in voter_ids]
+    choices = np.array(["Nay", "Yea", "Not Voting", "Present"])
+    sessions = np.sort(rng.choice(SESSIONS, size=n))
+    header = True
+    for start in range(0, n, VOTE_BLOCK):
+        size = min(VOTE_BLOCK, n - start)
+        session = sessions[start:start + size]
+        number = np.arange(start, start + size) + 1
+        number = number - np.searchsorted(sessions, session)  # numbered from 1 in every session
+        questions = []
+        for _ in range(size):
+            if rng.random_sample() < BILL_VOTES:
+                bill = bill_ids[rng.randint(len(bill_ids))].split("-")[0]
+                keyword = joint_keyword if "jres" in bill else bill_keyword
+                questions.append(f"On Passage {keyword} {bill.lstrip('hjrs')} {rng.choice(FIRST_NAMES)} Act")
+            else:
+                questions.append("On Motion to Adjourn")
+        # Yea when the member is on the vote's side of its cut point
+        side = rng.choice([-1, 1], size=(size, 1))
+        cut = rng.normal(0, 0.8, size=(size, 1))
+        noise = rng.normal(0, 0.3, size=(size, len(positions)))
+        codes = (side * (positions[np.newaxis, :] - cut) + noise > 0).astype(np.int8)
+        n_yea = codes.sum(axis=1)
+        absent = rng.random_sample(codes.shape)
+        codes[absent < 0.03] = 2
+        codes[absent > 0.997] = 3
+        df = pd.DataFrame(choices[codes], columns=vote_cols)
+        df.insert(0, "vote_id", [f"{chamber[0]}{num}-{CONGRESS}.{s}" for num, s in zip(number, session)])
+        df.insert(1, "congress", CONGRESS)
+        df.insert(2, "session", session)
+        df.insert(3, "number", number)
+        df.insert(4, "question", questions)
+        df.insert(5, "result", np.where(n_yea > len(positions) / 2, "Passed", "Failed"))
+        df.to_csv(path, mode="w" if header else "a", header=header, index=False)
+        header = False
+
+
+def make_committees(rng, chamber, n):
+    """Committees of a chamber in the format of the ProPublica committee files"""
+    prefix = {"house": "HS", "senate": "SS", "joint": "JS"}[chamber]
+    topics = list(TOPIC_SUBJECTS) + SHARED_SUBJECTS
+    committees = []
+    for i in range(n):
+        committee_id = f"{prefix}{chr(65 + i // 26)}{chr(65 + i % 26)}"
+        topic = topics[i % len(topics)]
+        name = f"Committee on {topic}" if i < len(topics) else f"Committee on {topic} {i // len(topics) + 1}"
+        subjects = (TOPIC_SUBJECTS.get(topic, []) + SHARED_SUBJECTS)[:rng.randint(2, MAX_SUBCOMMITTEES + 1)]
+        committees.append({
+            "id": committee_id,
+            "name": f"Joint {name}" if chamber == "joint" else name,
+            "chamber": chamber.capitalize(),
+            "url": f"https://example.gov/committees/{committee_id.lower()}",
+            "api_uri": f"https://api.example.gov/congress/v1/{CONGRESS}/{chamber}/committees/{committee_id}.json",
+            "subcommittees": [] if chamber == "joint" else [{
+                "id": f"{committee_id}{j + 1:02d}",
+                "name": subject,
+                "api_uri": f"https://api.example.gov/congress/v1/{CONGRESS}/{chamber}/committees/{committee_id}"
+                           f"/subcommittees/{committee_id}{j + 1:02d}.json",
+            } for j, subject in enumerate(subjects)],
+        })
+    return committees
+
+
+def committee_memberships(rng, committees, df_member):
+    """
+    Members of every committee and subcommittee, as in the committee membership
+    files: {committee name: {"members": [[name, state], ...], subcommittee name: {"members": [...]}}}
+    """
+    names = []
+    for member in df_member.itertuples():
+        if member.middle_name and rng.random_sample() < MISSPELLED_MEMBERS:
+            names.append([f"{member.first_name} {member.middle_name} {member.last_name}", member.state])
+        else:
+            names.append([f"{member.first_name} {member.last_name}", member.state])
+    memberships = {}
+    for committee in committees:
+        size = min(len(names), rng.randint(20, 60))
+        members = rng.choice(len(names), size=size, replace=False)
+        memberships[committee["name"]] = {"members": [names[m] for m in members]}
+        for sub in committee["subcommittees"]:
+            sub_members = rng.choice(members, size=max(1, size // 3), replace=False)
+            memberships[committee["name"]][sub["name"]] = {"members": [names[m] for m in sub_members]}
+    return memberships
+
+
+def contributions(rng, year, n, registrants, df_member):
+    """n contribution records of a filing year, in the columns of contributions_<year>.csv"""
+    firsts, lasts = df_member["first_name"].to_numpy(), df_member["last_name"].to_numpy()
+    for _ in range(n):
+        m = rng.randint(len(firsts))
+        honoree = HONOREE_FORMATS[rng.randint(len(HONOREE_FORMATS))].format(first=firsts[m], last=lasts[m])
+        registrant = rng.randint(len(registrants))
+        lobbyist = rng.random_sample() < 0.5
+        yield {
+            "contribution_type": "feca",
+            "contribution_type_display": "FECA",
+            "contributor_name": registrants[registrant].upper(),
+            "payee_name": f"FRIENDS OF {lasts[m].upper()}",
+            "honoree_name": honoree,
+            "amount": f"{rng.randint(1, 50) * 100}.00",
+            "date": f"{year}-{rng.randint(1, 13):02d}-{rng.randint(1, 29):02d}",
+            "pac": str([f"{registrants[registrant]} PAC"]) if rng.random_sample() < 0.3 else "None",
+            "registrant_house_id": 30000 + registrant,
+            "senate_registrant_id": registrant + 1,
+            "registrant": registrants[registrant],
+            "lobbyist_id": rng.randint(1, 5000) if lobbyist else "",
+            "lobbyist_name": f"{rng.choice(FIRST_NAMES)} {last_name(rng)}" if lobbyist else "",
+        }
+
+
+def generate(data_path, members=1.0, votes=1.0, contributions_scale=1.0, seed=0):
+    """
+    Write every raw input of the pipeline into data_path.
+
+    Parameters
+    ---
+    data_path - the data root, created if needed
+    members - scale of the number of members and bills
+    votes - scale of the number of roll call votes
+    contributions_scale - scale of the number of contributions and registrants
+    seed - seed of everything drawn
+
+    Returns
+    ---
+    sizes - the number of each kind of record written
+    """
+    rng = np.random.RandomState(seed)
+    sizes = scaled_sizes(members, votes, contributions_scale)
+    os.makedirs(join(data_path, "topics"), exist_ok=True)
+
+    first_id = 1
+    df_members = {}
+    for chamber in CHAMBERS:
+        df_member, positions = make_members(rng, chamber, sizes[f"{chamber}_members"], first_id)
+        first_id += len(df_member)
+        df_members[chamber] = df_member
+        df_member.to_csv(join(data_path, f"{chamber}_{CONGRESS}.csv"), index=False)
+
+        bills, df_topics, df_joint_topics = make_bills(rng, chamber, sizes[f"{chamber}_bills"], df_member)
+        with open(join(data_path, f"{chamber}_bills.json"), "w") as f:
+            for bill in bills:
+                f.write(json.dumps(bill) + "\n")
+        df_topics.to_csv(join(data_path, f"{chamber}_bills_topics_subjects.tsv"), sep="\t", index=False)
+        df_joint_topics.to_csv(join(data_path, f"{chamber}_joint_subjects_topics.tsv"), sep="\t", index=False)
+        df_all = pd.concat([df_topics, df_joint_topics.rename(columns={"topic": "subject", "subject": "topic"})])
+        df_all[["topic", "subject"]].drop_duplicates().to_csv(
+            join(data_path, f"{chamber}_topics_subjects.tsv"), sep="\t", index=False)
+
+        write_votes(rng, chamber, sizes[f"{chamber}_votes"], df_member, positions, [b["bill_id"] for b in bills],
+                    join(data_path, f"{chamber}_votes.csv"))
+
+    df_all_members = pd.concat(df_members.values())
+    for chamber in CHAMBERS + ["joint"]:
+        committees = make_committees(rng, chamber, N_COMMITTEES[chamber])
+        with open(join(data_path, f"{chamber}_committees.json"), "w") as f:
+            json.dump({"status": "OK", "results": [{"congress": str(CONGRESS), "chamber": chamber.capitalize(),
+                                                    "num_results": len(committees), "committees": committees}]}, f)
+        df_member = df_all_members if chamber == "joint" else df_members[chamber]
+        with open(join(data_path, f"{chamber}_committee_memberships.json"), "w") as f:
+            json.dump(committee_memberships(rng, committees, df_member), f)
+
+    registrants = unique_names(rng, sizes["registrants"], lambda rng: " ".join(
+        [rng.choice(COMPANY_WORDS), last_name(rng), rng.choice(COMPANY_KINDS)]))
+    for year in SESSIONS:
+        with open(join(data_path, f"contributions_{year}.csv"), "w", newline="") as f:
+            write_csv(contributions(rng, year, sizes["contributions"], registrants, df_all_members), f)
+
+    edges = [(subject, topic) for topic, subjects in TOPIC_SUBJECTS.items() for subject in [topic] + subjects]
+    edges += [(subject, topic) for topic in TOPIC_SUBJECTS for subject in SHARED_SUBJECTS]
+    pd.DataFrame(edges, columns=["sub_name", "top_name"]).to_csv(
+        join(data_path, "topics", "subject_topic_full_edges.tsv"), sep="\t", index=False)
+    return sizes
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Write synthetic raw data for the pipeline")
+    parser.add_argument("data_root")
+    parser.add_argument("--scale", type=float, default=1.0, help="scale of everything, 1 is about the 116th Congress")
+    parser.add_argument("--members", type=float, help="scale of the members and bills (default: --scale)")
+    parser.add_argument("--votes", type=float, help="scale of the votes (default: --scale)")
+    parser.add_argument("--contributions", type=float, help="scale of the contributions (default: --scale)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    pick = lambda value: args.scale if value is None else value
+    sizes = generate(args.data_root, pick(args.members), pick(args.votes), pick(args.contributions), args.seed)
+    print(f"Wrote to {args.data_root}: " + ", ".join(f"{n} {name.replace('_', ' ')}" for name, n in sizes.items()))
@@ -0,0 +1,71 @@
+"""
+Script version of "topic_filtering.ipynb".
+
+Keeps, out of every (subject, topic) edge of topics/subject_topic_full_edges.tsv,
+the subjects picked for each of the topics shown in the app, and writes them
+to topics/filtered_sub_top.csv.
+
+Run from this directory:
+    python topic_filtering.py
+"""
+
+import os
+import pandas as pd
+join = os.path.join
+
+DATA_PATH = os.environ.get("REPG_DATA_ROOT", "../../data")
+TOPIC_EDGES_PATH = join(DATA_PATH, "topics", "subject_topic_full_edges.tsv")
+FILTERED_PATH = join(DATA_PATH, "topics", "filtered_sub_top.csv")
+
+# The subjects kept for each topic, in the order of the output
+KEEP_SUBJECTS = {
+    "Government operations and politics": [
+        "Government operations and politics", "Government information and archives",
+        "political campaign regulation", "Elections", "voting", "State and local government operations",
+        "benefits", "personnel management", "Government employee pay", "public corruption"],
+    "Health": [
+        "Health", "Health programs administration and funding", "Congressional oversight",
+        "Health promotion and preventive care", "Prescription drugs", "Health care costs and insurance",
+        "Department of Health and Human Services", "Administrative law and regulatory procedures",
+        "Government information and archives", "Government studies and investigations"],
+    "Armed forces and national security": [
+        "Armed forces and national security", "Congressional oversight",
+        "Veterans medical care", "Asia", "Conflicts and wars",
+        "Government studies and investigations", "Government information and archives",
+        "Military operations and strategy", "Executive agency funding and structure"],
+    "Finance and financial sector": [
+        "Finance and financial sector", "Government studies and investigations",
+        "Congressional oversight", "Government information and archives", "Securities",
+        "Administrative law and regulatory procedures", "Financial services and investments",
+        "Banking and financial institutions regulation", "Business records", "Fraud offenses and financial crimes"],
+    "Economics and public finance": [
+        "Economics and public finance", "Executive agency funding and structure", "Appropriations",
+        "Department of Health and Human Services", "Congressional oversight", "Indian social and development programs",
+        "Government trust funds", "Department of Housing and Urban Development", "Roads and highways",
+        "District of Columbia"],
+}
+
+
+def filter_subjects(all_topics, keep_subjects=KEEP_SUBJECTS):
+    """
+    Parameters
+    ---
+    all_topics - one row per (subject, topic) edge, with sub_name and top_name columns
+    keep_subjects - dict of topic name -> names of the subjects kept for it
+
+    Returns
+    ---
+    filtered_sub_top - the edges kept, each subject at most once per topic
+    """
+    keep_dfs = []
+    for topic, subjects in keep_subjects.items():
+        keep_df = all_topics[(all_topics["top_name"] == topic) & all_topics["sub_name"].isin(subjects)]
+        keep_dfs.append(keep_df.drop_duplicates(subset=["sub_name"]))
+    return pd.concat(keep_dfs).reset_index(drop=True)
+
+
+if __name__ == '__main__':
+    all_topics = pd.read_csv(TOPIC_EDGES_PATH, sep="\t")
+    filtered_sub_top = filter_subjects(all_topics)
+    filtered_sub_top.to_csv(FILTERED_PATH)
+    print(f"{len(filtered_sub_top)} subjects of {filtered_sub_top['top_name'].nunique()} topics written to {FILTERED_PATH}")
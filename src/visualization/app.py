@@ -1,34 +1,25 @@
 import dash
+import flask
 import dash_cytoscape as cyto
 import plotly.express as px
 import plotly.graph_objects as go
-from dash.dependencies import Output, Input, State
+from dash.dependencies import Output, Input, State, ClientsideFunction
 from dash.exceptions import PreventUpdate
 
 import pandas as pd
-
-# -- Timing Function -- #
-import time
-import functools
-
-
-def timefunc(func):
-    """Call a function and time its execution."""
-
-    @functools.wraps(func)
-    def time_closure(*args, **kwargs):
-        """
-        The function that will be called by timefunc.
-        
-        Time elapsed is given in seconds.
-        """
-        start = time.perf_counter()
-        result = func(*args, **kwargs)
-        time_elapsed = time.perf_counter() - start
-        print(f"Function: {func.__name__}, Time: {time_elapsed}")
-        return result
-
-    return time_closure
+import json
+import logging
+import os
+
+from result_store import ResultStore, DEFAULT_CHAMBER
+from figure_cache import FigureCache
+from topic_graphs import TOPIC_GRAPHS_PATH, topic_graph_elements
+from instrumentation import instrument_callbacks
+from http_caching import enable_http_caching
+from cluster_stats import load_cluster_stats
+from member_search import load_member_index
+from reclustering import ReclusteringJobs, K_RANGE, SESSIONS
+from warm_up import ViewLog, VIEWS_LOG, popular_views, all_views, start_warm_up
 
 # -- App --
 
@@ -94,56 +85,107 @@ def render_instructions():
 
 # --- Topic Graph Rendering ---
 
-SUBJECTS = ["Government operations and politics", "Finance and financial sector", "Economics and public finance", "Armed forces and national security", "Health"]
+CHAMBERS = ["house", "senate"]
+
+# All cluster and result tables, loaded once and reloaded when they change on disk
+store = ResultStore()
+# Statistics computed from the graph for any cluster, None without the graph files; reloaded
+# when the cluster assignments or the graph change on disk
+live_stats = load_cluster_stats()
+
+def cluster_result(table, chamber, topic, subtopic, cluster):
+    """
+    The row of a cluster in the result table ("parties", "lobbyists", "committees" or
+    "members"): computed from the graph when it is loaded, otherwise the precomputed one
+    of the q-scripts. None if neither has the cluster.
+    """
+    if live_stats is not None:
+        row = live_stats.cluster_row(table, chamber, topic, subtopic, cluster)
+        if row is not None:
+            return row
+    return store.cluster(table, chamber, topic, subtopic, cluster)
+
+# Serialized figures by (store version, statistics version, panel, chamber, topic, subtopic, cluster)
+figures = FigureCache(maxsize=2048)
+# Seconds spent building the topic graphs and figures of the most viewed subtopics and
+# clusters in a background thread at startup, 0 to build them on the first click only
+WARM_UP_SECONDS = 0
+# Record the subtopics and clusters users open in VIEWS_LOG, to warm those up first
+RECORD_VIEWS = False
+views_log = ViewLog(VIEWS_LOG) if RECORD_VIEWS else None
+
+def record_view(chamber, topic, subtopic, cluster=None):
+    """Log a view shown to a user; not the ones built for the layout or the warm-up"""
+    # Those are built outside of any request, callbacks always run in one
+    if views_log is not None and flask.has_request_context():
+        views_log.record(chamber, topic, subtopic, cluster)
+
+def cached_figure(panel, build, chamber, topic, subtopic, cluster=None):
+    """
+    The serialized figure of one panel, built with build(chamber, topic, subtopic, cluster)
+    the first time it is asked for. The key includes the versions of the result store and
+    of the live statistics, so the figures are rebuilt after either is reloaded. None if
+    there is nothing to show.
+    """
+    stats_version = live_stats.refresh() if live_stats is not None else None
+    key = (store.version, stats_version, panel, chamber, topic, subtopic, cluster)
+    return figures.get(key, lambda: build(chamber, topic, subtopic, cluster))
+
+SUBJECTS = store.topics()
+DEFAULT_TOPIC = "Government operations and politics" if "Government operations and politics" in SUBJECTS else SUBJECTS[0]
+
+def load_topic_graphs(path=TOPIC_GRAPHS_PATH):
+    """
+    The precomputed topic graphs of topic_graphs.py, as a dict of
+    (chamber, topic) -> (subtopics, elements). Empty if they were not built.
+    """
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        graphs = json.load(f)
+    return {(chamber, topic): (graph["subtopics"], graph["elements"])
+            for chamber, topic_graphs in graphs.items() for topic, graph in topic_graphs.items()}
+
+topic_graphs = load_topic_graphs()
 
 @app.callback(
     Output("topic_graph_data", "data"),
+    Input("current_chamber", "data"),
     Input("current_topic", "data")
 )
-def get_topic_graph_elements(current_topic = "Families"):
+def get_topic_graph_elements(current_chamber = DEFAULT_CHAMBER, current_topic = "Families"):
     """
     Get the elements for the subgraph that relate to the current topic in a format
     usable by Cytoscape.js
 
+    The subtopics are every subject of the topic that has clusters, so any clustered
+    subject can be selected from the graph.
+
     Inputs
     -----
+    current_chamber - "house" or "senate", the chamber whose clusters are shown
     current_topic - the topic we want a subgraph for, input as a string. Value is the
     current selected topic in the "topic_dropdown" element.
 
     Returns:
-    graph - a list of dictionaries containing data for a Dash Cytoscape graph
+    graph - a list of dictionaries containing data for a Dash Cytoscape graph, with
+    node positions for the preset layout
 
-    See examples of this format here:
-    https://dash.plotly.com/cytoscape
+    The graphs come from the precomputed topic_graphs.json. Graphs missing from it, or
+    whose subtopics changed since it was built, are laid out here once and kept.
     """
     if current_topic is None:
         raise PreventUpdate
-    edge_df = pd.read_csv("./data/topics/filtered_sub_top.csv")
-    topic_df = edge_df[edge_df["top_name"] == current_topic]
-    topic_nid = topic_df["top_nid"].iloc[0]
-    nodes = [{'data': {'id': str(topic_nid), 'label': current_topic}}]
-    edges = []
-    node_limit = 10
-    for i, row in enumerate(topic_df.itertuples()):
-        # This is limited to avoid the screen being overwhelmed
-        if i > node_limit:
-            break
-        # Creates nodes in the following format:
-        # {'data': {'id': 'one', 'label': 'Node 1'}}
-        node = {"data": {"id": str(row[2]), "label": row[4]}}
-        nodes.append(node)
-        # Creates edges in the following format:
-        # {'data': {'source': 'one', 'target': 'two'}}
-        edge = {'data': {'source': str(row[2]), 'target': str(row[3])}}
-        edges.append(edge)
-    graph = nodes + edges
-    return graph
+    subtopics = store.subtopics(current_chamber, current_topic)
+    key = (current_chamber, current_topic)
+    if key not in topic_graphs or topic_graphs[key][0] != subtopics:
+        topic_graphs[key] = (subtopics, topic_graph_elements(current_topic, subtopics))
+    return topic_graphs[key][1]
 
 @app.callback(
     Output("topics", "children"),
     Input("topic_graph_data", "data")
 )
-#@timefunc
 def render_topic_graph(graph_data) -> list:
     """
     Renders the subgraph containing topics from the knowledge graph
@@ -161,8 +203,9 @@ def render_topic_graph(graph_data) -> list:
     graph = cyto.Cytoscape(
         elements=graph_data,
         style={'width': '100%', 'height': '85%'},
+        # Positions are computed by topic_graphs.py, the browser does not lay out anything
         layout={
-            'name': 'cose'
+            'name': 'preset'
         },
         stylesheet=[
             {
@@ -182,90 +225,55 @@ def render_topic_graph(graph_data) -> list:
         graph]
     return topic_div
 
+# The store and hover callbacks below only copy or restyle data the browser already has,
+# so they run clientside (assets/clientside.js) instead of round-tripping to the server.
+
+app.clientside_callback(
+    ClientsideFunction(namespace="repg", function_name="store_value"),
+    Output("current_chamber", "data"),
+    Input("chamber_radio", "value")
+)
+
 @app.callback(
+    Output("topic_dropdown", "options"),
+    Input("current_chamber", "data"),
+    prevent_initial_call=True
+)
+def update_topic_options(chamber):
+    """Only offer the topics that have clusters in the selected chamber"""
+    if chamber is None:
+        raise PreventUpdate
+    return store.topics(chamber)
+
+app.clientside_callback(
+    ClientsideFunction(namespace="repg", function_name="store_value"),
     Output("current_topic", "data"),
     Input("topic_dropdown", "value")
 )
-def store_current_topic(value):
-    """
-    Store the currently selected topic from the topic list in the dcc.Store element
-    with the id indicated above for future use.
-    """
-    return value
 
-@app.callback(
+# The subtopic and cluster are chosen in the graph and pie, or by a member search
+app.clientside_callback(
+    ClientsideFunction(namespace="repg", function_name="store_triggered"),
     Output("current_subtopic", "data"),
-    Input("topic_graph", "tapNodeData")
+    Input("topic_graph", "tapNodeData"),
+    Input("member_subtopic", "data")
 )
-def store_current_subtopic(click):
-    """
-    Store the currently clicked topic node data in the dcc.Store element
-    with the id indicated above for future use.
-    """
-    return click
 
-@app.callback(
+app.clientside_callback(
+    ClientsideFunction(namespace="repg", function_name="store_triggered"),
     Output("current_cluster", "data"),
-    Input("cluster_pie", "clickData")
+    Input("cluster_pie", "clickData"),
+    Input("member_cluster", "data")
 )
-def store_current_cluster(click):
-    """
-    Store the currently clicked cluster data in the dcc.Store element
-    with the id indicated above for future use.
-    """
-    return click
 
-@app.callback(
+# Highlights and labels the hovered node of the topic graph, see
+# https://dash.plotly.com/cytoscape/events and https://dash.plotly.com/cytoscape/styling
+app.clientside_callback(
+    ClientsideFunction(namespace="repg", function_name="topic_graph_stylesheet"),
     Output("topic_graph", "stylesheet"),
     Input("topic_graph", "mouseoverNodeData"),
     prevent_initial_call=True
 )
-def generate_topic_graph_stylesheet(node) -> list:
-    """
-    Returns a dictionary containing stylesheet elements for the Dash Cytoscape topic graph.
-    The "node_hover_style" updates the style of the currently selected node, passed in by the
-    "topic_graph"s "mouseoverNodeData" element.
-
-    Parameters
-    ---
-    node - data from a hovered over node in the topic_graph, provided in the dictionary format:
-    {'data':{'id':0, 'label':'name'}}
-
-    See Plotly Cytoscape documentation on how to use callbacks:
-    https://dash.plotly.com/cytoscape/events
-
-    And on how to change a graph's style:
-    https://dash.plotly.com/cytoscape/styling
-
-    Finally, a helpful example:
-    https://github.com/plotly/dash-cytoscape/blob/master/usage-stylesheet.py
-    
-    Returns
-    ---
-    default_stylesheet - a list of stylesheet elements in dictionary format
-    """
-    default_stylesheet = [
-            {
-                'selector':'node',
-                'style':{
-                    'background-color' :'#DADADA',
-                    'line-color':'#DADADA',
-                    'color':'#000000'
-                }
-            }
-        ]
-    node_hover_style =  {
-        "selector": 'node[id = "{}"]'.format(node['id']),
-        "style": {
-            'background-color':'#7c7c7c',
-            'line-color':'#7c7c7c',
-            'label': 'data(label)',
-            'z-index': '999'
-        }
-    }
-    if node:
-        default_stylesheet.append(node_hover_style)
-    return default_stylesheet
 
 # --- Cluster Rendering ---
 def render_community_graph():
@@ -288,47 +296,61 @@ def render_community_graph():
 
 @app.callback(
     Output("communities", "children"),
+    Input("current_chamber", "data"),
     Input("current_topic", "data"),
     Input("current_subtopic", "data"),
     prevent_initial_call = True # Prevents us from getting an error message while the topic graph loads
 )
-#@timefunc
-def get_clusters(topic=SUBJECTS[0], subtopic={"label":"Government employee pay"}):
+def get_clusters(chamber=DEFAULT_CHAMBER, topic=DEFAULT_TOPIC, subtopic={"label":"Government employee pay"}):
     """
     Retrieves the cluster data from the backend for the selected topic, then formats it and returns a plotly Pie graph with the appropriate styling
     to represent the clusters.
 
     Parameters
     ---
+    chamber - The chamber selected with the chamber_radio buttons, "house" or "senate"
+
     subject - The current subject selected from the topic_dropdown as a string
         Ex. "Health"
 
     topic - The most recently clicked topic in the topic graph in a dictionary format representing that node's data
         Ex. {"id":0, "name":"Medicare"}
     """
-    if topic == None or subtopic == None:
+    if chamber == None or topic == None or subtopic == None:
         raise PreventUpdate
     subtopic = subtopic["label"]
+    record_view(chamber, topic, subtopic)
     cluster_elem = [dash.html.H2("Subtopic Clusters", className="graph_title"),
                     dash.html.P("These clusters are determined by politicians' voting patterns for the chosen sub-topic.", 
                     style={"font-size":"small", "padding-left":"2rem"}),
                     dash.html.B("You can click a cluster (section of the pie chart) for further exploration.",
                     style={"font-size":"small", "padding-left":"2rem"})]
-    # Retrieve and filter the data
-    cluster_df = pd.read_csv("./data/clusters/viz_clusters.csv")
-    top_df = cluster_df[cluster_df["topic"] == topic]
-    sub_df = top_df[top_df["subtopic"] == subtopic].iloc[0:3]
-    cluster_nums = [i for i in range(3)]
-    cluster_pie = go.Figure(data=go.Pie(labels=cluster_nums, values=sub_df["total_members"], text=cluster_nums, hovertemplate="Cluster %{text}" + "<br>Number of Members: %{value}</br>",
-                                    marker_colors=sub_df["color"]), layout=go.Layout(paper_bgcolor='#e3ebf0', margin=dict(
+    cluster_pie = cached_figure("clusters", build_cluster_pie, chamber, topic, subtopic)
+    pie_comp = dash.dcc.Graph(figure=cluster_pie, style={"height":"65%","width":"100%"}, id="cluster_pie")
+    cluster_elem.append(pie_comp)
+    return cluster_elem
+
+def build_cluster_pie(chamber, topic, subtopic, cluster=None):
+    """The pie chart of the clusters of a subtopic, sized by number of members"""
+    # The number of clusters is chosen per subtopic, so take every cluster listed for it
+    sub_df = store.clusters("clusters", chamber, topic, subtopic)
+    if sub_df is None:
+        sub_df = pd.DataFrame(columns=["cluster_id", "total_members", "color"])
+    cluster_nums = sub_df["cluster_id"].to_list()
+    hovertemplate = "Cluster %{text}" + "<br>Number of Members: %{value}</br>"
+    customdata = None
+    # Consensus clustering also reports how stable each cluster is across seeds
+    if "stability" in sub_df.columns and sub_df["stability"].notna().all():
+        hovertemplate += "<br>Stability: %{customdata:.0%}</br>"
+        customdata = sub_df["stability"]
+    cluster_pie = go.Figure(data=go.Pie(labels=cluster_nums, values=sub_df["total_members"], text=cluster_nums, hovertemplate=hovertemplate,
+                                    customdata=customdata, marker_colors=sub_df["color"]), layout=go.Layout(paper_bgcolor='#e3ebf0', margin=dict(
         l=10,
         r=15,
         b=10,
         t=10,
         pad=4)))
-    pie_comp = dash.dcc.Graph(figure=cluster_pie, style={"height":"65%","width":"100%"}, id="cluster_pie")
-    cluster_elem.append(pie_comp)
-    return cluster_elem
+    return cluster_pie
 
 #@app.callback(
 #    Output("footer", "children"),
@@ -336,7 +358,6 @@ def get_clusters(topic=SUBJECTS[0], subtopic={"label":"Government employee pay"}
 #    Input("current_subtopic", "data"),
 #    Input("cluster_pie", "clickData")
 #)
-#@timefunc
 def get_current_cluster(topic, subtopic, cluster):
     """
     Takes in raw data from Dash callbacks for the topic dropdown, topic/subtopic graph, 
@@ -354,26 +375,79 @@ def get_current_cluster(topic, subtopic, cluster):
 
 # --- Get and display cluster details ---
 
-@app.callback(
-    Output("details", "children"),
+def render_community_details():
+    """
+    Renders the containers of the details panel, filled with the details of the default
+    cluster. Each container is then updated by its own callback below, so Dash requests
+    them concurrently and each panel only recomputes when its inputs change.
+    """
+    topic, subtopic, cluster = get_current_cluster(None, None, None)
+
+    def initial(get_elements):
+        try:
+            return get_elements(topic, subtopic, cluster, DEFAULT_CHAMBER)
+        except PreventUpdate:
+            return []
+
+    cluster_stats = dash.html.Div([
+        dash.html.Div(initial(get_member_parties), id="member_parties"),
+        dash.html.Div(initial(get_common_lobbyists), id="common_lobbyists"),
+        dash.html.Div(initial(get_common_committees), id="common_committees")], id="cluster_stats")
+    children = [dash.html.Div(get_details_title(cluster), id="details_title"),
+                dash.html.Div(initial(get_cluster_people), id="people"), cluster_stats]
+    return children
+
+# Inputs of every details panel callback
+SELECTION_INPUTS = [
+    Input("current_chamber", "data"),
     Input("current_topic", "data"),
     Input("current_subtopic", "data"),
     Input("current_cluster", "data")
-)
-def render_community_details(topic, subtopic, cluster=None):
+]
+
+def selected_cluster(chamber, topic, subtopic, cluster):
     """
-    Renders community details (lobbyists, legislor relationships) for the currently selected community 
-    in the knowledge graph
+    The (topic, subtopic, cluster, chamber) arguments of the details panels for the
+    stored selection. Nothing can be shown until a subtopic and cluster are selected.
     """
     topic, subtopic, cluster = get_current_cluster(topic, subtopic, cluster)
-    cluster_stats = dash.html.Div(get_cluster_stats(topic, subtopic, cluster), id="cluster_stats")
-    children = [dash.html.Div([dash.html.H2(f"Cluster {cluster} Details", style={"padding-top":"0.3em"})], id="details_title"),
-                get_cluster_people(topic, subtopic, cluster), cluster_stats]
-                #dash.html.Div(id="cluster_stats")] TODO: Replace the above with this after impelementing the appropriate
-                # callback for get_cluster_stats()
-    return children
+    if subtopic == None or cluster == None:
+        raise PreventUpdate
+    chamber = DEFAULT_CHAMBER if chamber == None else chamber
+    return topic, subtopic, cluster, chamber
+
+@app.callback(
+    Output("details_title", "children"),
+    Input("current_cluster", "data"),
+    prevent_initial_call=True
+)
+def update_details_title(cluster):
+    if cluster == None:
+        raise PreventUpdate
+    return get_details_title(int(cluster["points"][0]["label"]))
+
+@app.callback(Output("people", "children"), SELECTION_INPUTS, prevent_initial_call=True)
+def update_cluster_people(chamber, topic, subtopic, cluster):
+    topic, subtopic, cluster, chamber = selected_cluster(chamber, topic, subtopic, cluster)
+    record_view(chamber, topic, subtopic, cluster)
+    return get_cluster_people(topic, subtopic, cluster, chamber)
+
+@app.callback(Output("member_parties", "children"), SELECTION_INPUTS, prevent_initial_call=True)
+def update_member_parties(chamber, topic, subtopic, cluster):
+    return get_member_parties(*selected_cluster(chamber, topic, subtopic, cluster))
+
+@app.callback(Output("common_lobbyists", "children"), SELECTION_INPUTS, prevent_initial_call=True)
+def update_common_lobbyists(chamber, topic, subtopic, cluster):
+    return get_common_lobbyists(*selected_cluster(chamber, topic, subtopic, cluster))
+
+@app.callback(Output("common_committees", "children"), SELECTION_INPUTS, prevent_initial_call=True)
+def update_common_committees(chamber, topic, subtopic, cluster):
+    return get_common_committees(*selected_cluster(chamber, topic, subtopic, cluster))
+
+def get_details_title(cluster):
+    return [dash.html.H2(f"Cluster {cluster} Details", style={"padding-top":"0.3em"})]
 
-def get_cluster_people(topic = "Government operations and politics", subtopic = "Government employee pay", cluster = 0):
+def get_cluster_people(topic = "Government operations and politics", subtopic = "Government employee pay", cluster = 0, chamber = DEFAULT_CHAMBER):
     """
     Retrieve the congress people from the knowledge graph connected to the currently selected cluster,
     then render the associated HTML elements based on the retrieved data.
@@ -385,43 +459,51 @@ def get_cluster_people(topic = "Government operations and politics", subtopic =
     if topic == None or cluster == None:
         return people_elements
 
-    people_df = pd.read_csv("./data/results/q9_most_influential_members.csv")
-   
-    top_df = people_df[people_df["topic"] == topic]
-    sub_df = top_df[top_df["subtopic"] == subtopic]
+    row = cluster_result("members", chamber, topic, subtopic, cluster)
+    # The selection can be left over from the other chamber
+    if row is None:
+        return people_elements
 
     li = []
 
     for i in range(1,6):
-        name = sub_df.iloc[cluster]["name_rank_" + str(i)]
-        count = sub_df.iloc[cluster]["count_rank_" + str(i)]
+        name = row["name_rank_" + str(i)]
+        count = row["count_rank_" + str(i)]
         li.append(dash.html.Li(name, className="congress_member"))
         li.append(dash.html.Li(f"{count} bills sponsored", className="bills_sponsored"))
 
     congress_list = dash.html.Ul(li, id="congress_list")
     people_elements.append(congress_list)
+    return people_elements
 
-    people = dash.html.Div(people_elements, id="people")
-    return people
-
-def get_member_parties(topic=None, subtopic=None, cluster=None):
+def get_member_parties(topic=None, subtopic=None, cluster=None, chamber=DEFAULT_CHAMBER):
     """
     Retrieve statistics about the parties of members in the currently selected cluster,
     then render the associated HTML elements based on the retrieved data.
-
-    TODO: Implement this function
     """
-    # Retrieve and filter our data
-    member_parties_df = pd.read_csv("./data/results/q1_party_distribution.csv")
     if subtopic == None or cluster == None:
         raise PreventUpdate
-    top_df = member_parties_df[member_parties_df["topic"] == topic]
-    sub_df = top_df[top_df["subtopic"] == subtopic]
+    party_pie = cached_figure("parties", build_party_pie, chamber, topic, subtopic, cluster)
+    if party_pie is None:
+        raise PreventUpdate
+    party_elements =[
+        dash.html.H4("Party composition:"),
+        dash.dcc.Graph(figure=party_pie, style={"height":"80%", "width":"80%", "padding-top":"1em"})
+    ]
+    return party_elements
 
-    # Organize it into a format we can visualize
-    num_dem = sub_df.iloc[cluster]["D"]
-    num_rep = sub_df.iloc[cluster]["R"]
-    num_other = sub_df.iloc[cluster]["I"] + sub_df.iloc[cluster]["ID"]
+def build_party_pie(chamber, topic, subtopic, cluster):
+    """The pie chart of the parties of a cluster's members"""
+    # Retrieve our data
+    row = cluster_result("parties", chamber, topic, subtopic, cluster)
+    if row is None:
+        return None
+
+    # Organize it into a format we can visualize; a party without members in the
+    # graph has no column
+    num_dem = row.get("D", 0)
+    num_rep = row.get("R", 0)
+    num_other = row.get("I", 0) + row.get("ID", 0)
     counts = [num_dem, num_rep, num_other]
     colors = ["#092573","#8F0303","#500973"]
     parties = ["Democratic","Republican","Independent"]
@@ -434,13 +516,9 @@ def get_member_parties(topic=None, subtopic=None, cluster=None):
         t=10,
         pad=4
     )))
-    party_elements =[
-        dash.html.H4("Party composition:"),
-        dash.dcc.Graph(figure=party_pie, style={"height":"80%", "width":"80%", "padding-top":"1em"})
-    ]
-    return party_elements
+    return party_pie
 
-def get_common_lobbyists(topic=None, subtopic=None, cluster=None):
+def get_common_lobbyists(topic=None, subtopic=None, cluster=None, chamber=DEFAULT_CHAMBER):
     """
     Retrieve statistics about the parties of members in the currently selected cluster,
     then render the associated HTML elements based on the retrieved data.
@@ -450,25 +528,29 @@ def get_common_lobbyists(topic=None, subtopic=None, cluster=None):
     topic_elements = [
         dash.html.H4("Common Lobbyists")
     ]
+    topic_bar = cached_figure("lobbyists", build_lobbyist_bar, chamber, topic, subtopic, cluster)
+    if topic_bar is None:
+        raise PreventUpdate
+    topic_comp = dash.dcc.Graph(figure=topic_bar)
+    topic_elements.append(topic_comp)
 
-    lobbyist_df = pd.read_csv("./data/results/q3_most_important_lobbyists.csv")
-    cluster_df = pd.read_csv("./data/clusters/viz_clusters.csv")
+    return topic_elements
 
-    # We have to retrieve and calculate the cluster size
-    ct_df = cluster_df[cluster_df["topic"] == topic]
-    clusters_df = ct_df[ct_df["subtopic"] == subtopic]
-    total_members = clusters_df[clusters_df["cluster_id"] == cluster]["total_members"]
-    total_members = total_members.iloc[0]
-    
-    top_df = lobbyist_df[lobbyist_df["topic"] == topic]
-    sub_df = top_df[top_df["subtopic"] == subtopic]
+def build_lobbyist_bar(chamber, topic, subtopic, cluster):
+    """The bar chart of the fraction of a cluster's members lobbied by its top lobbyists"""
+    # We have to retrieve the cluster size
+    cluster_row = store.cluster("clusters", chamber, topic, subtopic, cluster)
+    row = cluster_result("lobbyists", chamber, topic, subtopic, cluster)
+    if cluster_row is None or row is None:
+        return None
+    total_members = cluster_row["total_members"]
 
     count = []
     name = []
 
     for i in range(1,6):
-        count.append(sub_df.iloc[cluster]["count_rank_" + str(i)]/total_members)
-        name.append(sub_df.iloc[cluster]["name_rank_" + str(i)])
+        count.append(row["count_rank_" + str(i)]/total_members)
+        name.append(row["name_rank_" + str(i)])
 
     layout = go.Layout(
         xaxis=dict(
@@ -487,38 +569,39 @@ def get_common_lobbyists(topic=None, subtopic=None, cluster=None):
     )
     topic_bar= go.Figure(data=go.Bar(x=name, y=count, marker_color="#756bb1"), layout=layout)
     topic_bar.update_layout(autosize=False, width=300, height=300)
-    topic_comp = dash.dcc.Graph(figure=topic_bar)
-    topic_elements.append(topic_comp)
-
-    return topic_elements
+    return topic_bar
 
-def get_common_committees(topic=None, subtopic=None, cluster=None):
+def get_common_committees(topic=None, subtopic=None, cluster=None, chamber=DEFAULT_CHAMBER):
     """
     Retrieve statistics about the committees with members in the currently selected cluster,
     then render the associated HTML elements based on the retrieved data.
-
-    TODO: Implement this function
     """
     if subtopic == None or cluster == None:
         raise PreventUpdate
+    committee_bar = cached_figure("committees", build_committee_bar, chamber, topic, subtopic, cluster)
+    if committee_bar is None:
+        raise PreventUpdate
+    committee_elements = [
+        dash.html.H4("Common Committees"),
+        dash.dcc.Graph(figure=committee_bar, style={"height":"100%", "width":"50%"})
+    ]
+    return committee_elements
 
-    committees_df = pd.read_csv("./data/results/q4.1_most_important_committees.csv")
-    cluster_df = pd.read_csv("./data/clusters/viz_clusters.csv")
-
-    # We have to retrieve and calculate the cluster size
-    ct_df = cluster_df[cluster_df["topic"] == topic]
-    clusters_df = ct_df[ct_df["subtopic"] == subtopic]
-    total_members = clusters_df[clusters_df["cluster_id"] == cluster]["total_members"]
-    total_members = total_members.iloc[0]
+def build_committee_bar(chamber, topic, subtopic, cluster):
+    """The bar chart of the fraction of a cluster's members in its top committees"""
+    # We have to retrieve the cluster size
+    cluster_row = store.cluster("clusters", chamber, topic, subtopic, cluster)
+    row = cluster_result("committees", chamber, topic, subtopic, cluster)
+    if cluster_row is None or row is None:
+        return None
+    total_members = cluster_row["total_members"]
 
-    top_df = committees_df[committees_df["topic"] == topic]
-    sub_df = top_df[top_df["subtopic"] == subtopic]
     committee = []
     count = []
 
     for i in range(1,4):
-        count.append(sub_df.iloc[cluster]["count_rank_" + str(i)]/total_members)
-        committee.append(sub_df.iloc[cluster]["name_rank_" + str(i)])
+        count.append(row["count_rank_" + str(i)]/total_members)
+        committee.append(row["name_rank_" + str(i)])
     
     # We have to check for a string type - if it is NaN then it will be a float
     # so we can use empty string as a name
@@ -541,31 +624,34 @@ def get_common_committees(topic=None, subtopic=None, cluster=None):
     )
     committee_bar= go.Figure(data=go.Bar(x=names, y=count, marker_color="#756bb1"), layout=layout)
     committee_bar.update_layout(autosize=False, width=300, height=350)
-    committee_elements = [
-        dash.html.H4("Common Committees"),
-        dash.dcc.Graph(figure=committee_bar, style={"height":"100%", "width":"50%"})
-    ]
-    return committee_elements
+    return committee_bar
 
-@timefunc
-def get_cluster_stats(topic=None, subtopic=None, cluster=None):
-    """
-    Retrieves the HTML elements containing data on a clusters' members, the common legislation topics in the cluster
-    and the most common subcomittees in the cluster
+DETAIL_FIGURES = {"parties": build_party_pie, "lobbyists": build_lobbyist_bar, "committees": build_committee_bar}
 
-    Parameters
-    ---
-    cluster - to be implemented
+def warm_up_view(chamber, topic, subtopic, cluster=None):
+    """
+    Build and cache the topic graph, cluster pie and detail figures of a view: one
+    cluster, or every cluster of the subtopic if cluster is None
+    """
+    get_topic_graph_elements(chamber, topic)
+    cached_figure("clusters", build_cluster_pie, chamber, topic, subtopic)
+    if cluster is None:
+        df_clusters = store.clusters("clusters", chamber, topic, subtopic)
+        clusters = [] if df_clusters is None else df_clusters["cluster_id"]
+    else:
+        clusters = [cluster]
+    for cluster in clusters:
+        for panel, build in DETAIL_FIGURES.items():
+            cached_figure(panel, build, chamber, topic, subtopic, int(cluster))
 
-    Returns
-    ---
-    div_list - a list of 3 dash.html.Div elements containing the data listed above, updated dynamically
-    based on user input.
+def start_warm_up_figures(budget=WARM_UP_SECONDS):
     """
-    member_parties = dash.html.Div(get_member_parties(topic, subtopic, cluster), id="member_parties")
-    common_lobbyists = dash.html.Div(get_common_lobbyists(topic, subtopic, cluster), id="common_lobbyists")
-    common_committees = dash.html.Div(get_common_committees(topic, subtopic, cluster), id="common_committees")
-    return [member_parties, common_lobbyists, common_committees]
+    Warm up the most viewed subtopics and clusters first, then every other subtopic, for budget seconds.
+    Call it in the process that serves the requests: a process forked while the thread holds
+    the figure cache's lock would wait for it forever.
+    """
+    views = popular_views(VIEWS_LOG) + all_views(store, CHAMBERS)
+    return start_warm_up(views, warm_up_view, budget)
 
 @app.callback(
     Output("current_topic_text", "children"),
@@ -590,6 +676,205 @@ def update_subtopic_text(subtopic=None):
     topic_text = dash.html.P(subtopic, className="header_element", style={"font-size":"small"})
     return topic_text
 
+# --- Member Search ---
+
+# Prefix and trigram index of the members, None without the member files
+members = load_member_index(clusters=live_stats.clusters if live_stats is not None else None,
+                            version=live_stats.version if live_stats is not None else None)
+
+def lookup_member_clusters(member, chamber, topic):
+    """The clusters of a member in every subtopic of a topic, after the member's cluster index caught up with a reload"""
+    if live_stats is not None:
+        version = live_stats.refresh()
+        members.update_clusters(live_stats.clusters, version)
+    else:
+        members.update_clusters()
+    return members.member_clusters(member, chamber, topic)
+
+def member_option(member, query):
+    # The dropdown also filters the options in the browser, by their search text; adding
+    # the query to it keeps the misspelled (trigram) matches
+    return {"label": f"{member['name']} ({member['state']}, {member['chamber'].capitalize()})",
+            "value": member["id"], "search": f"{member['name']} {member['state']} {member['id']} {query}"}
+
+@app.callback(
+    Output("member_dropdown", "options"),
+    Input("member_dropdown", "search_value"),
+    State("member_dropdown", "value"),
+    State("member_dropdown", "options")
+)
+def search_members(query, selected, options):
+    """
+    Autocomplete of the member search box
+
+    Parameters
+    ---
+    query - the text typed in the search box
+    selected - bioguide id of the selected member, kept in the options so it stays displayed
+    options - the current options
+
+    Returns
+    ---
+    options - list of dicts with the label and value (bioguide id) of the matching members
+    """
+    if members is None or not query:
+        raise PreventUpdate
+    new_options = []
+    for member in members.search(query):
+        # Members of both chambers are listed once
+        if member["id"] not in [o["value"] for o in new_options]:
+            new_options.append(member_option(member, query))
+    if selected is not None and selected not in [o["value"] for o in new_options]:
+        new_options += [o for o in options or [] if o["value"] == selected]
+    return new_options
+
+@app.callback(
+    Output("member_subtopic", "data"),
+    Output("member_cluster", "data"),
+    Output("member_clusters", "children"),
+    Input("member_dropdown", "value"),
+    Input("current_topic", "data"),
+    State("current_chamber", "data"),
+    State("current_subtopic", "data"),
+    prevent_initial_call=True
+)
+def jump_to_member(member, topic, chamber, subtopic):
+    """
+    Lists the clusters of the searched member in every subtopic of the current
+    topic and, when a member is chosen, selects their cluster in the current
+    subtopic, or in the first subtopic of the topic they were clustered in.
+
+    Parameters
+    ---
+    member - bioguide id of the member chosen in the search box
+    topic - the current topic
+    chamber - the current chamber
+    subtopic - the current subtopic, in the format {'id': 'subtopic_name', 'label': 'name'}
+
+    Returns
+    ---
+    member_subtopic - the subtopic to select, in the format of the topic graph's tapNodeData
+    member_cluster - the cluster to select, in the format of the cluster pie's clickData
+    member_clusters - list of the member's subtopics and clusters
+    """
+    if members is None or member is None or topic is None:
+        return dash.no_update, dash.no_update, []
+    clusters = lookup_member_clusters(member, chamber, topic)
+    subtopics = [s for s in store.subtopics(chamber, topic) if (chamber, topic, s) in clusters]
+    items = [dash.html.Li(f"{s}: cluster {clusters[(chamber, topic, s)]}") for s in subtopics]
+    member_clusters = [dash.html.B("Clusters of the member:"), dash.html.Ul(items)] if items \
+        else [dash.html.P("The member is not clustered in this topic.")]
+    # Only jump when the member was chosen, not when the topic changes
+    if dash.callback_context.triggered_id != "member_dropdown" or not subtopics:
+        return dash.no_update, dash.no_update, member_clusters
+    current = subtopic["label"] if subtopic is not None else None
+    target = current if current in subtopics else subtopics[0]
+    return ({"id": "subtopic_" + target, "label": target},
+            {"points": [{"label": clusters[(chamber, topic, target)]}]},
+            member_clusters)
+
+# --- Re-clustering ---
+
+# Jobs clustering a subtopic again with another number of clusters or sessions
+jobs = ReclusteringJobs()
+
+def render_reclustering():
+    """The controls of a re-clustering job and the elements its progress and result are shown in"""
+    return [dash.html.H2("Re-cluster the subtopic", className="graph_title"),
+            dash.html.Div([
+                dash.html.B("Clusters:", style={"font-size":"small"}),
+                dash.dcc.Dropdown(list(K_RANGE), 3, id="recluster_k", clearable=False),
+                dash.html.B("Sessions:", style={"font-size":"small"}),
+                dash.dcc.Dropdown(SESSIONS, SESSIONS, id="recluster_sessions", multi=True),
+                dash.html.Button("Re-cluster", id="recluster_button", n_clicks=0)
+                ], className="dd-container", style={"padding-left":"2rem"}),
+            dash.dcc.Store(id="recluster_job", data=None),
+            dash.dcc.Interval(id="recluster_interval", interval=1000, disabled=True),
+            dash.html.Div([], id="recluster_status", style={"padding-left":"2rem"}),
+            dash.html.Div([], id="recluster_result")]
+
+@app.callback(
+    Output("recluster_job", "data"),
+    Input("recluster_button", "n_clicks"),
+    State("current_chamber", "data"),
+    State("current_topic", "data"),
+    State("current_subtopic", "data"),
+    State("recluster_k", "value"),
+    State("recluster_sessions", "value"),
+    prevent_initial_call=True
+)
+def submit_reclustering(n_clicks, chamber, topic, subtopic, k, sessions):
+    """
+    Submits a job clustering the current subtopic into k clusters on the votes of the chosen sessions
+
+    Returns
+    ---
+    job - dict with the job's key, None if too many jobs are pending, and the subtopic
+    """
+    if topic is None or subtopic is None or k is None:
+        raise PreventUpdate
+    subtopic = subtopic["label"]
+    # All sessions is the same job as no session filter
+    sessions = None if not sessions or set(sessions) == set(SESSIONS) else sessions
+    try:
+        key = jobs.submit(chamber, topic, subtopic, k, sessions)
+    except OSError:
+        # No vote data for the chamber
+        raise PreventUpdate
+    return {"key": key, "chamber": chamber, "topic": topic, "subtopic": subtopic, "k": k}
+
+@app.callback(
+    Output("recluster_status", "children"),
+    Output("recluster_result", "children"),
+    Output("recluster_interval", "disabled"),
+    Input("recluster_job", "data"),
+    Input("recluster_interval", "n_intervals"),
+    prevent_initial_call=True
+)
+def poll_reclustering(job, n_intervals):
+    """
+    Reports the progress of the submitted job, polled every second until it is finished
+
+    Returns
+    ---
+    status - the job's progress bar and message
+    result - the pie chart of the new clusters once the job is done
+    disabled - whether the polling stops
+    """
+    if job is None:
+        raise PreventUpdate
+    if job["key"] is None:
+        return [dash.html.P("Too many re-clustering jobs are running, try again in a moment.")], [], True
+    status = jobs.status(job["key"])
+    title = f"{job['subtopic']}, {job['k']} clusters: {status['message']}"
+    if status["state"] == "error":
+        return [dash.html.P(title)], [], True
+    if status["state"] != "done":
+        return [dash.html.P(title), dash.html.Progress(value=str(status["progress"]), max="1")], dash.no_update, False
+    figure = cached_figure("reclustering", build_recluster_pie, job["chamber"], job["topic"], job["subtopic"], job["key"])
+    return [dash.html.P(title)], [dash.dcc.Graph(figure=figure, style={"height":"65%","width":"100%"})], True
+
+def build_recluster_pie(chamber, topic, subtopic, key):
+    """The pie chart of the clusters of a re-clustering job, with the party split of each when the graph is loaded"""
+    clusters = jobs.result(key)
+    if clusters is None:
+        return None
+    cluster_nums = list(clusters)
+    sizes = [len(clusters[c]) for c in cluster_nums]
+    hovertemplate = "Cluster %{text}" + "<br>Number of Members: %{value}</br>"
+    customdata = None
+    if live_stats is not None:
+        parties = [live_stats.summary(clusters[c])["parties"] for c in cluster_nums]
+        customdata = [", ".join(f"{p}: {n}" for p, n in party.items() if n > 0) for party in parties]
+        hovertemplate += "<br>%{customdata}</br>"
+    return go.Figure(data=go.Pie(labels=cluster_nums, values=sizes, text=cluster_nums, hovertemplate=hovertemplate,
+                                 customdata=customdata), layout=go.Layout(paper_bgcolor='#e3ebf0', margin=dict(
+        l=10,
+        r=15,
+        b=10,
+        t=10,
+        pad=4)))
+
 # Render the page structure
 
 def render_parent_container():
@@ -608,7 +893,7 @@ def render_parent_container():
     """
     topic_graph = dash.html.Div(id="topics", className="container")
     communities = render_community_graph()
-    details = dash.html.Div([], id="details", className="container")
+    details = dash.html.Div(render_community_details(), id="details", className="container")
     return topic_graph, communities, details
 
 def render_layout():
@@ -629,6 +914,9 @@ def render_layout():
         dash.dcc.Store(id="current_subtopic", data=None),
         dash.dcc.Store(id="current_cluster", data=None),
         dash.dcc.Store(id="current_topic", data=None),
+        dash.dcc.Store(id="current_chamber", data=DEFAULT_CHAMBER),
+        dash.dcc.Store(id="member_subtopic", data=None),
+        dash.dcc.Store(id="member_cluster", data=None),
         # Banner for top of the page
         dash.html.Div([
             dash.html.Div([
@@ -638,7 +926,14 @@ def render_layout():
                 dash.html.P("Select a topic to explore!", className="header_element")
                 ], style={"width":"100%"}),
             dash.html.Div([
-                dash.dcc.Dropdown(SUBJECTS, SUBJECTS[0], id="topic_dropdown")
+                dash.dcc.RadioItems([{"label": c.capitalize(), "value": c} for c in CHAMBERS], DEFAULT_CHAMBER,
+                                    id="chamber_radio", inline=True)
+                ], className="header_element", style={"width":"100%"}),
+            dash.html.Div([
+                dash.dcc.Dropdown(SUBJECTS, DEFAULT_TOPIC, id="topic_dropdown")
+                ],className="dd-container", style={"width":"150%", "padding-left":"1rem"}),
+            dash.html.Div([
+                dash.dcc.Dropdown([], None, id="member_dropdown", placeholder="Search a member")
                 ],className="dd-container", style={"width":"150%", "padding-left":"1rem"}),
             dash.html.B("Current topic:", className="header_element", style={"padding-left":"1rem"}),
             dash.html.Div([], id="current_topic_text", style={"width":"100%"}),
@@ -648,12 +943,32 @@ def render_layout():
             id="banner"),
         # Main container that holds each of the main application views
         dash.html.Div(render_parent_container(), id="parent_container"),
-        dash.html.Div(id="footer"),
+        dash.html.Div([dash.html.Div([], id="member_clusters"),
+                       dash.html.Div(render_reclustering(), id="reclustering")], id="footer"),
         render_instructions()
     ], 
     id="main-container")
 
 app.layout = render_layout()
 
+# Latency, payload size and cache metrics of every callback, served at /metrics
+LOG_CALLBACKS = False  # also log a JSON line per callback request
+if LOG_CALLBACKS:
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+metrics = instrument_callbacks(app, log_requests=LOG_CALLBACKS)
+metrics.register_cache("figures", lambda: (figures.hits, figures.misses))
+if live_stats is not None:
+    metrics.register_cache("cluster_stats", lambda: live_stats.cache_info()[:2])
+
+# Gzip compression, and content-hash ETags and 304 responses for the layout and static
+# files; the ETags expire when the result tables or the live statistics are reloaded
+http_cache = enable_http_caching(server, version=lambda: (store.version,
+                                                          live_stats.refresh() if live_stats is not None else None))
+metrics.register_cache("http_etags", lambda: (http_cache.etags.hits, http_cache.etags.misses))
+metrics.register_cache("http_compressed", lambda: (http_cache.compressed.hits, http_cache.compressed.misses))
+
 if __name__ == '__main__':
+    # Under gunicorn, every worker starts its own warm-up from the hook in gunicorn.conf.py
+    if WARM_UP_SECONDS > 0:
+        start_warm_up_figures()
     app.run_server(debug=False)
@@ -0,0 +1,53 @@
+// Clientside callbacks of app.py, for interactions that only copy or restyle
+// data already in the browser and so do not need a round trip to the server.
+// Dash serves every file in assets/ with the app.
+
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    repg: {
+        // Store a value (chamber, topic, tapped subtopic node or clicked cluster)
+        // in a dcc.Store element for use by the server callbacks.
+        store_value: function(value) {
+            return value;
+        },
+
+        // Store the value of whichever input triggered the callback, for stores
+        // set from several places (e.g. the subtopic tapped in the topic graph
+        // or the one of a searched member).
+        store_triggered: function() {
+            const triggered = dash_clientside.callback_context.triggered;
+            if (!triggered.length) {
+                return dash_clientside.no_update;
+            }
+            return triggered[0].value;
+        },
+
+        // Stylesheet of the topic graph, highlighting and labelling the node
+        // under the mouse. node is the topic_graph's mouseoverNodeData, in the
+        // format {'id': 0, 'label': 'name'}.
+        topic_graph_stylesheet: function(node) {
+            const stylesheet = [
+                {
+                    'selector': 'node',
+                    'style': {
+                        'background-color': '#DADADA',
+                        'line-color': '#DADADA',
+                        'color': '#000000'
+                    }
+                }
+            ];
+            if (node) {
+                const id = String(node.id).replace(/\\/g, '\\\\').replace(/"/g, '\\"');
+                stylesheet.push({
+                    'selector': 'node[id = "' + id + '"]',
+                    'style': {
+                        'background-color': '#7c7c7c',
+                        'line-color': '#7c7c7c',
+                        'label': 'data(label)',
+                        'z-index': '999'
+                    }
+                });
+            }
+            return stylesheet;
+        }
+    }
+});
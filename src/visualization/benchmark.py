@@ -0,0 +1,205 @@
+"""
+Load test of the app's callbacks.
+
+Simulates n users, each in its own thread, clicking through the app like a
+browser does: choose a topic, then a subtopic in the topic graph, then a few
+clusters of the pie. Every click posts the callbacks it triggers to
+/_dash-update-component, following chained callbacks (a callback's output
+that is another callback's input) and mimicking the clientside store
+callbacks. Requests go through Flask's test client, or to a running server
+with --url.
+
+Reports p50 / p95 / p99 latency and requests per second per callback.
+Run from the repository root:
+    python src/visualization/benchmark.py --users 8 --sessions 20
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from result_store import RESULT_FILES, read_result_csv
+
+# Number of chained callback rounds followed after a click
+MAX_CHAIN = 5
+
+
+class _LocalClient:
+    """Posts to the app in this process through Flask's test client"""
+
+    def __init__(self, server):
+        self.client = server.test_client()
+
+    def get_json(self, path):
+        return self.client.get(path).get_json()
+
+    def post_json(self, path, body):
+        r = self.client.post(path, json=body)
+        return r.status_code, r.data
+
+
+class _HttpClient:
+    """Posts to a running server"""
+
+    def __init__(self, url):
+        self.url = url.rstrip("/")
+
+    def get_json(self, path):
+        with urllib.request.urlopen(self.url + path) as r:
+            return json.loads(r.read())
+
+    def post_json(self, path, body):
+        request = urllib.request.Request(self.url + path, data=json.dumps(body).encode(),
+                                         headers={"Content-Type": "application/json"})
+        try:
+            with urllib.request.urlopen(request) as r:
+                return r.status, r.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.read()
+
+
+def _prop(dependency):
+    return f"{dependency['id']}.{dependency['property']}"
+
+
+def _outputs(output):
+    """The id.prop outputs of a callback from its output string, which is ..a.b...c.d.. for several"""
+    if output.startswith(".."):
+        return output.strip(".").split("...")
+    return [output]
+
+
+class Session:
+    """The app's state in one simulated browser, and the callbacks a change triggers"""
+
+    def __init__(self, client, dependencies, record):
+        self.client = client
+        self.dependencies = dependencies
+        self.record = record
+        self.state = {}
+
+    def _post(self, dependency):
+        output = dependency["output"]
+        outputs = [{"id": o.split(".")[0], "property": o.split(".")[1]} for o in _outputs(output)]
+        body = {
+            "output": output,
+            "outputs": outputs if len(outputs) > 1 else outputs[0],
+            "inputs": [dict(i, value=self.state.get(_prop(i))) for i in dependency["inputs"]],
+            "state": [dict(s, value=self.state.get(_prop(s))) for s in dependency["state"]],
+            "changedPropIds": [_prop(i) for i in dependency["inputs"]],
+        }
+        start = time.perf_counter()
+        status, data = self.client.post_json("/_dash-update-component", body)
+        self.record(output, time.perf_counter() - start, status)
+        if status != 200:
+            return {}
+        return {f"{i}.{p}": v for i, props in json.loads(data)["response"].items() for p, v in props.items()}
+
+    def set(self, **changes):
+        """Apply a user action (id_prop=value) and run every callback it triggers"""
+        changed = {k.replace("__", "."): v for k, v in changes.items()}
+        for _ in range(MAX_CHAIN):
+            if not changed:
+                break
+            self.state.update(changed)
+            triggered = [d for d in self.dependencies if any(_prop(i) in changed for i in d["inputs"])]
+            previous, changed = changed, {}
+            for dependency in triggered:
+                clientside = dependency.get("clientside_function")
+                if clientside is None:
+                    changed.update(self._post(dependency))
+                elif clientside["function_name"] == "store_value":
+                    changed[dependency["output"]] = self.state.get(_prop(dependency["inputs"][0]))
+                elif clientside["function_name"] == "store_triggered":
+                    trigger = next(_prop(i) for i in dependency["inputs"] if _prop(i) in previous)
+                    changed[dependency["output"]] = previous[trigger]
+
+
+def run_user(client, dependencies, catalog, n_sessions, n_clusters_clicked, seed, record):
+    rng = np.random.RandomState(seed)
+    for _ in range(n_sessions):
+        session = Session(client, dependencies, record)
+        chamber = catalog["chamber"].iloc[rng.randint(len(catalog))]
+        df_chamber = catalog[catalog["chamber"] == chamber]
+        topic = df_chamber["topic"].iloc[rng.randint(len(df_chamber))]
+        df_topic = df_chamber[df_chamber["topic"] == topic]
+        subtopic = df_topic["subtopic"].iloc[rng.randint(len(df_topic))]
+        clusters = df_topic[df_topic["subtopic"] == subtopic]["cluster_id"].to_list()
+
+        session.set(chamber_radio__value=chamber)
+        session.set(topic_dropdown__value=topic)
+        session.set(topic_graph__tapNodeData={"id": "subtopic_" + subtopic, "label": subtopic})
+        for _ in range(n_clusters_clicked):
+            cluster = int(clusters[rng.randint(len(clusters))])
+            session.set(cluster_pie__clickData={"points": [{"label": cluster}]})
+
+
+def report(latencies, errors, wall_time):
+    rows = []
+    for callback in sorted(latencies):
+        seconds = np.array(latencies[callback]) * 1000
+        rows.append({"callback": callback, "requests": len(seconds), "errors": errors[callback],
+                     "p50_ms": float(np.percentile(seconds, 50)), "p95_ms": float(np.percentile(seconds, 95)),
+                     "p99_ms": float(np.percentile(seconds, 99)), "rps": len(seconds) / wall_time})
+    all_seconds = np.concatenate([latencies[c] for c in latencies]) * 1000
+    total = {"callback": "all", "requests": len(all_seconds), "errors": sum(errors.values()),
+             "p50_ms": float(np.percentile(all_seconds, 50)), "p95_ms": float(np.percentile(all_seconds, 95)),
+             "p99_ms": float(np.percentile(all_seconds, 99)), "rps": len(all_seconds) / wall_time}
+    return rows + [total]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument("--users", type=int, default=8, help="number of concurrent simulated users")
+    parser.add_argument("--sessions", type=int, default=10, help="topic -> subtopic -> clusters sessions per user")
+    parser.add_argument("--clusters", type=int, default=3, help="clusters clicked per session")
+    parser.add_argument("--url", default=None, help="benchmark a running server instead of the app in this process")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default=None, help="also write the results to this json file")
+    args = parser.parse_args()
+
+    if args.url is None:
+        from app import server
+        make_client = lambda: _LocalClient(server)
+    else:
+        make_client = lambda: _HttpClient(args.url)
+    dependencies = make_client().get_json("/_dash-dependencies")
+    catalog = read_result_csv(RESULT_FILES["clusters"])
+
+    lock = threading.Lock()
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+
+    def record(callback, seconds, status):
+        with lock:
+            latencies[callback].append(seconds)
+            errors[callback] += status >= 400
+
+    threads = [threading.Thread(target=run_user, args=(make_client(), dependencies, catalog, args.sessions,
+                                                       args.clusters, args.seed + i, record))
+               for i in range(args.users)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall_time = time.perf_counter() - start
+
+    rows = report(latencies, errors, wall_time)
+    print(f"{args.users} users, {args.sessions} sessions each, {wall_time:.1f}s")
+    print(f"{'callback':<40}{'requests':>10}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'rps':>10}")
+    for row in rows:
+        print(f"{row['callback']:<40}{row['requests']:>10}{row['errors']:>8}{row['p50_ms']:>10.2f}"
+              f"{row['p95_ms']:>10.2f}{row['p99_ms']:>10.2f}{row['rps']:>10.1f}")
+    if args.out is not None:
+        with open(args.out, "w") as f:
+            json.dump({"users": args.users, "sessions": args.sessions, "wall_time": wall_time, "callbacks": rows}, f, indent=2)
@@ -0,0 +1,248 @@
+"""
+Cluster statistics computed on demand from the knowledge graph.
+
+The member -> party, member <- lobbyist, member -> committee and
+member -> bill edge files are loaded once into CSR-like arrays
+(indptr / indices per member), so the statistics of any set of members
+are a few vectorized numpy operations instead of a precomputed row of
+the q-scripts' output. The results of the last member sets asked for
+are kept in a bounded LRU cache. The files are reloaded when they change on
+disk, e.g. after the pipeline published new cluster assignments.
+
+cluster_row() returns a row in the same format as the q1 / q3 / q4.1 / q9
+result files, so the app can use the two interchangeably.
+"""
+
+import functools
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+join = os.path.join
+
+sys.path.append(join(os.path.dirname(os.path.abspath(__file__)), "../community_detection/02 Clustering"))
+from cluster_assignments import load_cluster_assignments, load_index, store_mtimes
+
+DATA_PATH = os.environ.get("REPG_DATA_ROOT", "./data")
+EDGE_PATH = join(DATA_PATH, "edges")
+ASSIGNMENTS_PATH = join(DATA_PATH, "cluster_assignments")
+
+# Edge file and which of its columns is the member, per relation
+RELATIONS = {
+    "parties": ("member_memberof_party.csv", "src_nid"),
+    "lobbyists": ("lobbyist_paidto_member.csv", "tgt_nid"),
+    "committees": ("member_memberof_committee.csv", "src_nid"),
+    "members": ("member_sponsorof_bill.csv", "src_nid"),
+}
+# Number of ranked names in each result file
+TOP_N = {"lobbyists": 5, "committees": 3, "members": 5}
+
+
+class _Adjacency:
+    """member -> target edges of one relation in CSR form over the member index"""
+
+    def __init__(self, df_edge, member_col, member_index, target_nids):
+        other_col = "tgt_nid" if member_col == "src_nid" else "src_nid"
+        target_index = pd.Series(np.arange(len(target_nids)), index=target_nids)
+        df_edge = df_edge[df_edge[member_col].isin(member_index.index) & df_edge[other_col].isin(target_index.index)]
+        rows = member_index[df_edge[member_col]].to_numpy()
+        order = np.argsort(rows, kind="stable")
+        self.indices = target_index[df_edge[other_col]].to_numpy()[order]
+        self.indptr = np.zeros(len(member_index) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=len(member_index)), out=self.indptr[1:])
+        # Member row of every edge, so a member set selects its edges with one mask lookup
+        self.edge_rows = rows[order]
+        self.n_targets = len(target_nids)
+
+    def target_counts(self, member_mask):
+        """Number of members in the mask connected to each target"""
+        return np.bincount(self.indices[member_mask[self.edge_rows]], minlength=self.n_targets)
+
+    def degrees(self, member_rows):
+        return self.indptr[member_rows + 1] - self.indptr[member_rows]
+
+
+def _top(counts, names, n):
+    """The n (name, count) pairs with the largest non-zero counts, largest first"""
+    top = np.argsort(-counts, kind="stable")[:n]
+    return [(names[i], int(counts[i])) for i in top if counts[i] > 0]
+
+
+class ClusterStats:
+    """
+    Parameters
+    ---
+    data_path - directory with nodes.csv, house_116.csv and senate_116.csv
+    edge_path - directory with the edge files of RELATIONS
+    assignments_path - cluster assignment store, see cluster_assignments.py
+    cache_size - number of member sets whose statistics are kept
+    check_interval - minimum number of seconds between two checks of the files' mtimes
+
+    Like the result store (see result_store.py), the files are checked for
+    changes at most every check_interval seconds. When the cluster assignments
+    were rewritten the clusters are loaded again, when a graph file was the
+    whole graph is.
+    """
+
+    def __init__(self, data_path=DATA_PATH, edge_path=EDGE_PATH, assignments_path=ASSIGNMENTS_PATH, cache_size=1024,
+                 check_interval=2.0):
+        self.data_path = data_path
+        self.edge_path = edge_path
+        self.assignments_path = assignments_path
+        self.cache_size = cache_size
+        self.check_interval = check_interval
+        self.graph_files = [join(data_path, fname) for fname in ["nodes.csv", "house_116.csv", "senate_116.csv"]] \
+            + [join(edge_path, fname) for fname, _ in RELATIONS.values()]
+        self._lock = threading.Lock()
+        self._last_check = time.monotonic()
+        # Incremented on every reload of the clusters or the graph, so caches of derived values can key on it
+        self.version = 0
+        self._mtimes = self._stat()
+        self._load_graph()
+        self._load_clusters()
+
+    def _stat(self):
+        return {"graph": [os.stat(path).st_mtime_ns for path in self.graph_files],
+                "assignments": store_mtimes(self.assignments_path)}
+
+    def _load_graph(self):
+        df_node = pd.read_csv(join(self.data_path, "nodes.csv"))
+        df_member = df_node[df_node["ntype"] == "member"]
+        member_index = pd.Series(np.arange(len(df_member)), index=df_member["nid"].to_numpy())
+
+        # Targets of each relation, by node id
+        targets = {"parties": df_node[df_node["ntype"] == "party"],
+                   "lobbyists": df_node[df_node["ntype"] == "lobbyist"],
+                   "committees": df_node[df_node["ntype"] == "committee"]}
+        names = {relation: df["nname"].to_numpy() for relation, df in targets.items()}
+        adjacency = {}
+        for relation, (fname, member_col) in RELATIONS.items():
+            df_edge = pd.read_csv(join(self.edge_path, fname))
+            if relation == "members":
+                # Sponsored bills are only counted per member, the bills themselves are not needed
+                target_nids = np.unique(df_edge["tgt_nid"])
+            else:
+                target_nids = targets[relation]["nid"].to_numpy()
+            adjacency[relation] = _Adjacency(df_edge, member_col, member_index, target_nids)
+
+        # Full names of the members, by bioguide id, as in q9
+        df_names = pd.concat([pd.read_csv(join(self.data_path, "house_116.csv")),
+                              pd.read_csv(join(self.data_path, "senate_116.csv"))]).drop_duplicates(subset="id")
+        middle = df_names["middle_name"].fillna("")
+        full_names = dict(zip(df_names["id"], (df_names["first_name"] + " " + middle + " " + df_names["last_name"])
+                              .str.replace("  ", " ")))
+        names["members"] = np.array([full_names.get(bioguide, "") for bioguide in df_member["nname"]], dtype=object)
+
+        # Swap in the new graph at once, with an empty cache since the statistics changed; summaries
+        # being computed keep the graph they started with
+        self.member_index, self.names, self.adjacency = member_index, names, adjacency
+        self._summary = functools.lru_cache(maxsize=self.cache_size)(
+            functools.partial(self._compute_summary, member_index, names, adjacency))
+
+    def _load_clusters(self):
+        """Members of every cluster"""
+        df_index = load_index(self.assignments_path)
+        df_cluster = load_cluster_assignments(self.assignments_path)
+        df_cluster = df_cluster.merge(df_index[["chamber", "topic_id", "subject_id", "topic", "subject"]],
+                                      on=["chamber", "topic_id", "subject_id"])
+        self.clusters = {(chamber, topic, subtopic, int(cluster_id)): np.sort(df["member_nid"].to_numpy())
+                         for (chamber, topic, subtopic, cluster_id), df
+                         in df_cluster.groupby(["chamber", "topic", "subject", "cluster_id"])}
+        self.version += 1
+
+    def refresh(self):
+        """
+        Reload the clusters, or the whole graph, if a file changed since the last check.
+
+        Returns
+        ---
+        version - the version of the statistics after the check
+        """
+        now = time.monotonic()
+        if now - self._last_check >= self.check_interval and self._lock.acquire(blocking=False):
+            try:
+                self._last_check = now
+                mtimes = self._stat()
+                if mtimes["graph"] != self._mtimes["graph"]:
+                    self._load_graph()
+                    self._load_clusters()
+                elif mtimes["assignments"] != self._mtimes["assignments"]:
+                    self._load_clusters()
+                self._mtimes = mtimes
+            except (OSError, ValueError, pd.errors.ParserError, KeyError) as e:
+                # A file mid-rewrite, keep serving the previous version
+                print(f"Cluster statistics not reloaded: {e}")
+            finally:
+                self._lock.release()
+        return self.version
+
+    def cluster_members(self, chamber, topic, subtopic, cluster_id):
+        """Node ids of a cluster's members, None if there is no such cluster"""
+        self.refresh()
+        return self.clusters.get((chamber, topic, subtopic, cluster_id))
+
+    def summary(self, member_nids):
+        """
+        Statistics of any set of members.
+
+        Returns
+        ---
+        summary - dict with
+            "n_members" - number of members in the graph
+            "parties" - dict of party -> number of members
+            "lobbyists", "committees" - (name, number of members) of the top ones
+            "members" - (name, number of sponsored bills) of the top sponsors
+        """
+        self.refresh()
+        return self._summary(tuple(sorted(int(nid) for nid in member_nids)))
+
+    def cache_info(self):
+        return self._summary.cache_info()
+
+    @staticmethod
+    def _compute_summary(member_index, names, adjacency, member_nids):
+        rows = member_index.reindex(member_nids).dropna().to_numpy(dtype=np.int64)
+        mask = np.zeros(len(member_index), dtype=bool)
+        mask[rows] = True
+        parties = adjacency["parties"].target_counts(mask)
+        summary = {"n_members": len(rows),
+                   "parties": {name: int(count) for name, count in zip(names["parties"], parties)}}
+        for relation in ["lobbyists", "committees"]:
+            counts = adjacency[relation].target_counts(mask)
+            summary[relation] = _top(counts, names[relation], TOP_N[relation])
+        sponsored = adjacency["members"].degrees(rows)
+        summary["members"] = _top(sponsored, names["members"][rows], TOP_N["members"])
+        return summary
+
+    def cluster_row(self, table, chamber, topic, subtopic, cluster_id):
+        """
+        The statistics of a cluster as a row of the result file of table ("parties",
+        "lobbyists", "committees" or "members"), None if there is no such cluster.
+        """
+        member_nids = self.cluster_members(chamber, topic, subtopic, cluster_id)
+        if member_nids is None:
+            return None
+        summary = self.summary(member_nids)
+        row = {"chamber": chamber, "topic": topic, "subtopic": subtopic, "cluster_id": cluster_id,
+               "cluster_count": len(member_nids)}
+        if table == "parties":
+            row.update(summary["parties"])
+            return row
+        ranked = summary[table]
+        for i in range(TOP_N[table]):
+            name, count = ranked[i] if i < len(ranked) else ("", 0)
+            row["name_rank_" + str(i + 1)] = name
+            row["count_rank_" + str(i + 1)] = count
+        return row
+
+
+def load_cluster_stats(**kwargs):
+    """ClusterStats over the graph files, or None if they are not available"""
+    try:
+        return ClusterStats(**kwargs)
+    except (OSError, ValueError) as e:
+        print(f"Live cluster statistics not available, using the precomputed results: {e}")
+        return None
@@ -0,0 +1,60 @@
+"""
+Bounded LRU cache of serialized plotly figures.
+
+The app only ever draws a small, finite set of figures (one per panel and
+cluster), so each one is built once, converted to a plain JSON dict and
+reused for every later click on the same cluster. Passing the dict to
+dcc.Graph skips both building the go.Figure and plotly's validation.
+"""
+
+import json
+import threading
+from collections import OrderedDict
+
+
+class FigureCache:
+    """
+    Parameters
+    ---
+    maxsize - maximum number of figures kept; the least recently used one is evicted first
+    """
+
+    def __init__(self, maxsize=512):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._figures = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, build):
+        """
+        The serialized figure for key, calling build() to create the go.Figure
+        on a miss. Returns None, and caches nothing, if build() returns None.
+        """
+        with self._lock:
+            if key in self._figures:
+                self._figures.move_to_end(key)
+                self.hits += 1
+                return self._figures[key]
+            self.misses += 1
+        figure = build()
+        if figure is None:
+            return None
+        # Round trip through plotly's encoder to get plain lists and numbers
+        figure = json.loads(figure.to_json())
+        with self._lock:
+            self._figures[key] = figure
+            self._figures.move_to_end(key)
+            while len(self._figures) > self.maxsize:
+                self._figures.popitem(last=False)
+        return figure
+
+    def __contains__(self, key):
+        return key in self._figures
+
+    def __len__(self):
+        return len(self._figures)
+
+    def clear(self):
+        with self._lock:
+            self._figures.clear()
@@ -0,0 +1,14 @@
+"""
+gunicorn settings of the app, see wsgi.py.
+
+The warm-up thread of app.py is started in every worker once it has loaded
+the app, never in the master: with --preload the master imports the app
+before forking, and a worker forked while the thread held a lock of the
+figure cache would block on it forever.
+"""
+
+
+def post_worker_init(worker):
+    from app import WARM_UP_SECONDS, start_warm_up_figures
+    if WARM_UP_SECONDS > 0:
+        start_warm_up_figures()
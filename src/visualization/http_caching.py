@@ -0,0 +1,166 @@
+"""
+HTTP caching and compression of the app's responses.
+
+enable_http_caching(server) adds request hooks to the Flask server that
+- gzip compressible responses (JSON callback outputs, scripts, styles, html)
+  for clients that accept it, keeping the compressed bodies of the last
+  responses so a repeated response is not compressed again,
+- give the GET responses of the layout, the callback dependencies, the
+  component suites and static assets an ETag that is a hash of their
+  content, and
+- answer their conditional requests (If-None-Match) with 304 Not Modified.
+  The ETag of every such request (path and query) is kept in a server-side
+  cache, so a repeated request is answered before its view runs at all.
+
+Callback outputs get no ETag and never a 304: dash posts callbacks to
+/_dash-update-component without If-None-Match, so they are only compressed.
+The cached ETags are keyed by a data version as well and expire when the
+result tables are reloaded.
+"""
+
+import gzip
+import hashlib
+import threading
+from collections import OrderedDict
+
+import flask
+
+# GET responses whose ETag is kept, by path prefix
+CACHEABLE_PATHS = ("/_dash-layout", "/_dash-dependencies", "/_dash-component-suites/", "/assets/")
+COMPRESSIBLE_TYPES = ("application/json", "application/javascript", "text/")
+# Smaller responses are not worth compressing
+MIN_COMPRESS_SIZE = 500
+
+
+class _LRU:
+    """Thread-safe bounded dict, the least recently used entry is evicted first"""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._items:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return self._items[key]
+
+    def put(self, key, value):
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def __len__(self):
+        return len(self._items)
+
+
+def _digest(data):
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+class HttpCache:
+    """
+    Parameters
+    ---
+    version - function returning the current data version; ETags computed for an
+        older version are not used
+    maxsize - number of request ETags and of compressed bodies kept
+    compress_level - gzip compression level, 1 (fastest) to 9 (smallest)
+    """
+
+    def __init__(self, version=lambda: 0, maxsize=4096, compress_level=6):
+        self.version = version
+        self.compress_level = compress_level
+        self.etags = _LRU(maxsize)
+        self.compressed = _LRU(maxsize)
+        self.not_modified = 0
+
+    def _request_key(self):
+        request = flask.request
+        if request.method != "GET" or not request.path.startswith(CACHEABLE_PATHS):
+            return None
+        return (self.version(), request.full_path)
+
+    def before_request(self):
+        """Answer a conditional request whose response is known not to have changed"""
+        request = flask.request
+        if not request.if_none_match:
+            return None
+        key = self._request_key()
+        if key is None:
+            return None
+        etag = self.etags.get(key)
+        if etag is not None and request.if_none_match.contains_weak(etag):
+            self.not_modified += 1
+            return self._not_modified(etag)
+        return None
+
+    @staticmethod
+    def _not_modified(etag):
+        response = flask.Response(status=304)
+        response.set_etag(etag, weak=True)
+        response.vary.add("Accept-Encoding")
+        return response
+
+    def after_request(self, response):
+        """Tag, conditionally answer and compress a response"""
+        if response.status_code != 200 or "Content-Encoding" in response.headers:
+            return response
+        key = self._request_key()
+        compress = (response.mimetype.startswith(COMPRESSIBLE_TYPES)
+                    and "gzip" in flask.request.accept_encodings)
+        if key is None and not compress:
+            return response
+        # Static files are streamed from disk, read them to hash and compress them
+        response.direct_passthrough = False
+        data = response.get_data()
+
+        etag = None
+        if key is not None:
+            etag = _digest(data)
+            self.etags.put(key, etag)
+            # The hash covers the uncompressed content, so the tag is weak: it stands
+            # for the gzipped and the plain representation alike
+            response.set_etag(etag, weak=True)
+            response.vary.add("Accept-Encoding")
+            if flask.request.if_none_match.contains_weak(etag):
+                self.not_modified += 1
+                return self._not_modified(etag)
+
+        if compress and len(data) >= MIN_COMPRESS_SIZE:
+            content_hash = etag if etag is not None else _digest(data)
+            body = self.compressed.get(content_hash)
+            if body is None:
+                body = gzip.compress(data, compresslevel=self.compress_level)
+                self.compressed.put(content_hash, body)
+            response.set_data(body)
+            response.headers["Content-Encoding"] = "gzip"
+            response.vary.add("Accept-Encoding")
+        return response
+
+
+def enable_http_caching(server, **kwargs):
+    """
+    Add ETags, 304 responses and gzip compression to a Flask server.
+
+    Parameters
+    ---
+    server - the Flask server, app.server of the dash.Dash app
+    kwargs - passed to HttpCache
+
+    Returns
+    ---
+    cache - the HttpCache, e.g. to report its hit rates
+    """
+    cache = HttpCache(**kwargs)
+    server.before_request(cache.before_request)
+    server.after_request(cache.after_request)
+    return cache
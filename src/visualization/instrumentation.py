@@ -0,0 +1,157 @@
+"""
+Per-callback instrumentation of the Dash app.
+
+instrument_callbacks(app) wraps every server-side callback in app.callback_map
+and records, per callback (named by its output):
+- a latency histogram
+- the size of the JSON response sent to the browser
+- how many calls returned, raised PreventUpdate or failed
+It also adds a /metrics endpoint to the Flask server that reports these, and
+the hit rates of registered caches, in the Prometheus text format.
+Optionally, a JSON line is logged for every callback request.
+
+Metrics are kept per process; with several workers, each worker reports its own.
+"""
+
+import json
+import logging
+import threading
+import time
+from collections import defaultdict
+
+import flask
+from dash.exceptions import PreventUpdate
+
+LATENCY_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0]
+SIZE_BUCKETS = [1e3, 1e4, 1e5, 1e6, 1e7]
+
+logger = logging.getLogger("repg.callbacks")
+
+
+class _Histogram:
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        i = 0
+        while i < len(self.buckets) and value > self.buckets[i]:
+            i += 1
+        self.counts[i] += 1
+        self.sum += value
+        self.count += 1
+
+    def lines(self, name, labels):
+        cumulative = 0
+        for bound, count in zip(self.buckets + ["+Inf"], self.counts):
+            cumulative += count
+            yield f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}'
+        yield f"{name}_sum{{{labels}}} {self.sum}"
+        yield f"{name}_count{{{labels}}} {self.count}"
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class CallbackMetrics:
+    """Thread-safe latency, payload size and outcome counts of every callback"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._latency = defaultdict(lambda: _Histogram(LATENCY_BUCKETS))
+        self._size = defaultdict(lambda: _Histogram(SIZE_BUCKETS))
+        self._outcomes = defaultdict(int)
+        self._caches = {}
+
+    def observe(self, callback, seconds, n_bytes, outcome):
+        with self._lock:
+            self._latency[callback].observe(seconds)
+            if n_bytes is not None:
+                self._size[callback].observe(n_bytes)
+            self._outcomes[(callback, outcome)] += 1
+
+    def register_cache(self, name, stats):
+        """stats - function returning the (hits, misses) of the cache so far"""
+        self._caches[name] = stats
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            lines.append("# HELP repg_callback_latency_seconds Time spent in a Dash callback")
+            lines.append("# TYPE repg_callback_latency_seconds histogram")
+            for callback, histogram in sorted(self._latency.items()):
+                lines.extend(histogram.lines("repg_callback_latency_seconds", f'callback="{_label(callback)}"'))
+            lines.append("# HELP repg_callback_response_bytes Size of a Dash callback's JSON response")
+            lines.append("# TYPE repg_callback_response_bytes histogram")
+            for callback, histogram in sorted(self._size.items()):
+                lines.extend(histogram.lines("repg_callback_response_bytes", f'callback="{_label(callback)}"'))
+            lines.append("# HELP repg_callback_calls_total Dash callback calls by outcome")
+            lines.append("# TYPE repg_callback_calls_total counter")
+            for (callback, outcome), count in sorted(self._outcomes.items()):
+                lines.append(f'repg_callback_calls_total{{callback="{_label(callback)}",outcome="{outcome}"}} {count}')
+        lines.append("# HELP repg_cache_requests_total Cache lookups by result")
+        lines.append("# TYPE repg_cache_requests_total counter")
+        lines.append("# HELP repg_cache_hit_ratio Fraction of cache lookups that were hits")
+        lines.append("# TYPE repg_cache_hit_ratio gauge")
+        for name, stats in sorted(self._caches.items()):
+            hits, misses = stats()
+            lines.append(f'repg_cache_requests_total{{cache="{_label(name)}",result="hit"}} {hits}')
+            lines.append(f'repg_cache_requests_total{{cache="{_label(name)}",result="miss"}} {misses}')
+            lines.append(f'repg_cache_hit_ratio{{cache="{_label(name)}"}} {hits / max(hits + misses, 1)}')
+        return "\n".join(lines) + "\n"
+
+
+def _timed(callback, func, metrics, log_requests):
+    def timed_callback(*args, **kwargs):
+        start = time.perf_counter()
+        outcome, n_bytes = "ok", None
+        try:
+            response = func(*args, **kwargs)
+            n_bytes = len(response.encode() if isinstance(response, str) else response)
+            return response
+        except PreventUpdate:
+            outcome = "prevented"
+            raise
+        except Exception:
+            outcome = "error"
+            raise
+        finally:
+            seconds = time.perf_counter() - start
+            metrics.observe(callback, seconds, n_bytes, outcome)
+            if log_requests:
+                logger.info(json.dumps({"callback": callback, "seconds": round(seconds, 6),
+                                        "bytes": n_bytes, "outcome": outcome}))
+    return timed_callback
+
+
+def instrument_callbacks(app, metrics=None, log_requests=False, path="/metrics"):
+    """
+    Wrap every callback registered on app so far and serve the metrics at path.
+    Call it after all callbacks are defined.
+
+    Parameters
+    ---
+    app - the dash.Dash app
+    metrics - CallbackMetrics to record into, a new one if None
+    log_requests - log a JSON line per callback request to the "repg.callbacks" logger
+
+    Returns
+    ---
+    metrics - the CallbackMetrics, e.g. to register caches on
+    """
+    metrics = CallbackMetrics() if metrics is None else metrics
+    for callback, spec in app.callback_map.items():
+        # Clientside callbacks have no server function
+        if "callback" in spec:
+            spec["callback"] = _timed(callback, spec["callback"], metrics, log_requests)
+
+    @app.server.route(path)
+    def serve_metrics():
+        return flask.Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+    return metrics
@@ -0,0 +1,178 @@
+"""
+Search over the members of congress.
+
+Names, states and bioguide ids from house_116.csv / senate_116.csv are
+indexed in
+- a prefix trie over every word (first, middle and last name, state,
+  bioguide id), for autocomplete as the user types, and
+- a trigram index over the full names, to still find a member when the
+  query is misspelled.
+A member -> clusters index, built from the cluster assignment store, gives
+the cluster of a member in every subtopic; it is rebuilt when the clusters
+are reloaded (see MemberIndex.update_clusters).
+"""
+
+import os
+import sys
+from collections import defaultdict
+
+import pandas as pd
+join = os.path.join
+
+sys.path.append(join(os.path.dirname(os.path.abspath(__file__)), "../community_detection/02 Clustering"))
+from cluster_assignments import load_cluster_assignments, load_index, store_mtimes
+
+DATA_PATH = os.environ.get("REPG_DATA_ROOT", "./data")
+ASSIGNMENTS_PATH = join(DATA_PATH, "cluster_assignments")
+# Minimum fraction of a query's trigrams a name must share to be a fuzzy match
+MIN_TRIGRAM_SCORE = 0.3
+
+
+def _trigrams(text):
+    text = f"  {text.lower()} "
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class _Trie:
+    """Prefix trie from words to the set of members having a word with that prefix"""
+
+    def __init__(self):
+        self.root = {}
+
+    def add(self, word, member):
+        node = self.root
+        for char in word:
+            node = node.setdefault(char, {})
+            node.setdefault("members", set()).add(member)
+
+    def members(self, prefix):
+        node = self.root
+        for char in prefix:
+            if char not in node:
+                return set()
+            node = node[char]
+        return node.get("members", set())
+
+
+class MemberIndex:
+    """
+    Parameters
+    ---
+    data_path - directory with house_116.csv, senate_116.csv and nodes.csv
+    clusters - dict of (chamber, topic, subtopic, cluster_id) -> member node ids (see
+        cluster_stats.ClusterStats.clusters); loaded from assignments_path if None
+    assignments_path - cluster assignment store
+    version - version of clusters, see update_clusters
+    """
+
+    def __init__(self, data_path=DATA_PATH, clusters=None, assignments_path=ASSIGNMENTS_PATH, version=None):
+        dfs = []
+        for chamber in ["house", "senate"]:
+            df = pd.read_csv(join(data_path, f"{chamber}_116.csv"))
+            df["chamber"] = chamber
+            dfs.append(df)
+        # Members who served in both chambers are listed under both
+        df_member = pd.concat(dfs, ignore_index=True)
+        middle = df_member["middle_name"].fillna("")
+        df_member["name"] = (df_member["first_name"] + " " + middle + " " + df_member["last_name"]).str.replace("  ", " ")
+        self.members = df_member[["id", "name", "state", "chamber"]].to_dict("records")
+
+        self.trie = _Trie()
+        self.trigrams = defaultdict(set)
+        for i, member in enumerate(self.members):
+            words = member["name"].lower().split() + [member["state"].lower(), member["id"].lower()]
+            for word in words:
+                self.trie.add(word, i)
+            for trigram in _trigrams(member["name"]):
+                self.trigrams[trigram].add(i)
+
+        self.data_path = data_path
+        self.assignments_path = assignments_path
+        self.clusters = {}
+        # Version of the clusters the index was built from, see update_clusters
+        self.clusters_version = None
+        self.update_clusters(clusters, version)
+
+    def update_clusters(self, clusters=None, version=None):
+        """
+        Rebuild the member -> clusters index if the clusters changed.
+
+        Parameters
+        ---
+        clusters - dict of (chamber, topic, subtopic, cluster_id) -> member node ids; if None,
+            loaded from the assignment store when its files changed
+        version - version of clusters (see cluster_stats.ClusterStats.refresh), the index is
+            only rebuilt when it differs from the last one
+        """
+        try:
+            if clusters is None:
+                version = store_mtimes(self.assignments_path)
+                if version == self.clusters_version:
+                    return
+                clusters = self._load_clusters(self.assignments_path)
+            elif version is not None and version == self.clusters_version:
+                return
+            # The node ids may have changed with the clusters
+            df_node = pd.read_csv(join(self.data_path, "nodes.csv"))
+            df_node = df_node[df_node["ntype"] == "member"]
+            bioguide = dict(zip(df_node["nid"], df_node["nname"]))
+            index = defaultdict(dict)
+            for (chamber, topic, subtopic, cluster_id), member_nids in clusters.items():
+                for nid in member_nids:
+                    index[bioguide[nid]][(chamber, topic, subtopic)] = cluster_id
+        except (OSError, ValueError, KeyError) as e:
+            if self.clusters_version is None:
+                raise
+            # A file mid-rewrite, keep the previous index
+            print(f"Member clusters not reloaded: {e}")
+            return
+        # Swap in the new index at once
+        self.clusters, self.clusters_version = index, version
+
+    @staticmethod
+    def _load_clusters(assignments_path):
+        df_index = load_index(assignments_path)
+        df_cluster = load_cluster_assignments(assignments_path).merge(
+            df_index[["chamber", "topic_id", "subject_id", "topic", "subject"]], on=["chamber", "topic_id", "subject_id"])
+        return {(chamber, topic, subtopic, int(cluster_id)): df["member_nid"].to_numpy()
+                for (chamber, topic, subtopic, cluster_id), df
+                in df_cluster.groupby(["chamber", "topic", "subject", "cluster_id"])}
+
+    def search(self, query, limit=10):
+        """
+        Members matching query, best first: members with a word starting with every
+        word of the query, then members whose name shares enough trigrams with it.
+
+        Returns
+        ---
+        members - list of dicts with the id (bioguide), name, state and chamber
+        """
+        words = query.lower().split()
+        if not words:
+            return []
+        matches = set.intersection(*(self.trie.members(word) for word in words))
+        results = sorted(matches, key=lambda i: self.members[i]["name"])[:limit]
+        if len(results) < limit:
+            query_trigrams = _trigrams(query)
+            scores = defaultdict(int)
+            for trigram in query_trigrams:
+                for i in self.trigrams.get(trigram, ()):
+                    scores[i] += 1
+            fuzzy = [i for i, score in sorted(scores.items(), key=lambda x: (-x[1], x[0]))
+                     if i not in matches and score / len(query_trigrams) >= MIN_TRIGRAM_SCORE]
+            results += fuzzy[:limit - len(results)]
+        return [self.members[i] for i in results]
+
+    def member_clusters(self, bioguide_id, chamber=None, topic=None):
+        """dict of (chamber, topic, subtopic) -> cluster_id of a member, optionally of one chamber / topic"""
+        return {key: cluster_id for key, cluster_id in self.clusters.get(bioguide_id, {}).items()
+                if (chamber is None or key[0] == chamber) and (topic is None or key[1] == topic)}
+
+
+def load_member_index(**kwargs):
+    """MemberIndex over the member files, or None if they are not available"""
+    try:
+        return MemberIndex(**kwargs)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Member search not available: {e}")
+        return None
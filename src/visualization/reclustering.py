@@ -0,0 +1,188 @@
+"""
+Re-clustering jobs submitted from the app.
+
+A job clusters the votes of one (chamber, topic, subject) again with FastKModes,
+as vote_clustering.py does, but with the number of clusters and the sessions
+chosen by the user. Jobs run in a bounded process pool next to the app. Each
+job reports its progress in a small json file and writes its result with
+cluster_cache, both named after a hash of the job's parameters and of the
+version of the vote data. So
+- any process of the app can report the progress of any job, and
+- a job that was already run, by any user, is served from disk at once
+  instead of being computed again.
+"""
+
+import functools
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+join = os.path.join
+
+sys.path.append(join(os.path.dirname(os.path.abspath(__file__)), "../community_detection/02 Clustering"))
+import cluster_cache
+from fast_kmodes import FastKModes, encode
+
+DATA_PATH = os.environ.get("REPG_DATA_ROOT", "./data")
+RESULTS_DIR = join(DATA_PATH, "reclustering")
+K_RANGE = range(2, 11)
+# Sessions of the 116th Congress in the vote data
+SESSIONS = [2019, 2020]
+# Seeded restarts of k-modes, the lowest cost run is kept
+N_INIT = 10
+# Jobs running at once, and waiting or running at once
+MAX_WORKERS = 2
+MAX_PENDING = 8
+# A job whose progress was not updated for this long is assumed to be lost
+JOB_TIMEOUT = 600
+VOTE_CODES = {"Yea": 1, "Nay": -1, "Present": 0, "Not Voting": 0}
+
+
+def _progress_path(results_dir, key):
+    return join(results_dir, key + ".json")
+
+
+def _write_progress(results_dir, key, state, progress=0.0, message=""):
+    os.makedirs(results_dir, exist_ok=True)
+    path = _progress_path(results_dir, key)
+    with open(path + ".tmp", "w") as f:
+        json.dump({"state": state, "progress": progress, "message": message}, f)
+    os.replace(path + ".tmp", path)
+
+
+@functools.lru_cache(maxsize=2)
+def _load_votes(path, mtime):
+    """The votes of a chamber, parsed once per worker process and version of the file"""
+    df = pd.read_csv(path, usecols=lambda c: c in ["vote_id", "topic", "subject", "session"] or c.startswith("vote_"))
+    return df.dropna(subset=["topic", "subject"])
+
+
+def _votes_path(data_path, chamber):
+    return join(data_path, f"{chamber}_data_for_clustering.csv")
+
+
+def run_job(key, params, data_path=DATA_PATH, results_dir=RESULTS_DIR):
+    """
+    Cluster the votes of one subject, in a worker process.
+
+    Parameters
+    ---
+    key - the job's key, see ReclusteringJobs.key
+    params - dict with the chamber, topic, subject, k and the sessions to keep (None for all)
+    """
+    try:
+        _write_progress(results_dir, key, "running", 0.0, "Loading votes")
+        path = _votes_path(data_path, params["chamber"])
+        df = _load_votes(path, os.stat(path).st_mtime_ns)
+        df = df[(df["topic"].str.strip() == params["topic"]) & (df["subject"].str.strip() == params["subject"])]
+        if params["sessions"] and "session" in df.columns:
+            df = df[df["session"].astype(int).isin(params["sessions"])]
+        # Sort by vote, as vote_clustering.py does, so the result only depends on the votes
+        df = df.drop_duplicates(subset="vote_id").sort_values("vote_id")
+        voters = [c for c in df.columns if c.startswith("vote_") and c != "vote_id"]
+        if len(df) == 0:
+            raise ValueError("No votes on this subject in the chosen sessions")
+        if params["k"] > len(voters):
+            raise ValueError(f"Cannot make {params['k']} clusters of {len(voters)} members")
+        matrix = df[voters].replace(VOTE_CODES).fillna(2).to_numpy().T.astype(np.int8)
+
+        df_node = pd.read_csv(join(data_path, "nodes.csv"))
+        df_node = df_node[df_node["ntype"] == "member"]
+        member_nids = dict(zip(df_node["nname"], df_node["nid"]))
+        voter_nids = np.array([member_nids.get(v.split("_")[-1], -1) for v in voters])
+
+        # The seeded restarts of FastKModes, one at a time to report progress
+        categories, codes, planes = encode(matrix)
+        seeds = np.random.RandomState(0).randint(np.iinfo(np.int32).max, size=N_INIT)
+        best = None
+        for i, seed in enumerate(seeds):
+            _write_progress(results_dir, key, "running", (i + 1) / (N_INIT + 1), f"Clustering, run {i + 1} of {N_INIT}")
+            kmodes = FastKModes(n_clusters=params["k"], n_init=1, init="Huang", random_state=int(seed))
+            kmodes.fit_encoded(categories, codes, planes)
+            if best is None or kmodes.cost_ < best.cost_:
+                best = kmodes
+        known = voter_nids >= 0  # members missing from the graph are dropped
+        cluster_cache.save(results_dir, key, member_nids=voter_nids[known], labels=best.labels_[known],
+                           cost=best.cost_, n_votes=len(df))
+        _write_progress(results_dir, key, "done", 1.0, f"Clustered {known.sum()} members on {len(df)} votes")
+    except Exception as e:
+        _write_progress(results_dir, key, "error", 0.0, str(e))
+        raise
+
+
+class ReclusteringJobs:
+    """
+    Parameters
+    ---
+    data_path - directory with the <chamber>_data_for_clustering.csv files and nodes.csv
+    results_dir - where the jobs write their progress and results
+    max_workers - number of jobs running at once
+    max_pending - number of jobs running or waiting at once, further jobs are refused
+    """
+
+    def __init__(self, data_path=DATA_PATH, results_dir=RESULTS_DIR, max_workers=MAX_WORKERS, max_pending=MAX_PENDING):
+        self.data_path = data_path
+        self.results_dir = results_dir
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._lock = threading.Lock()
+        self._futures = {}
+        # Created on the first job, so that a server forking its workers after
+        # importing the app does not share one pool between them
+        self._pool = None
+
+    def key(self, chamber, topic, subject, k, sessions=None):
+        """The hash of a job's parameters and of the version of the votes it clusters"""
+        params = {"chamber": chamber, "topic": topic, "subject": subject, "k": int(k),
+                  "sessions": sorted(int(s) for s in sessions) if sessions else None, "n_init": N_INIT}
+        version = os.stat(_votes_path(self.data_path, chamber)).st_mtime_ns
+        digest = hashlib.sha1(json.dumps([params, version], sort_keys=True).encode()).hexdigest()
+        return digest, params
+
+    def submit(self, chamber, topic, subject, k, sessions=None):
+        """
+        Start a job unless its result is known or it is already running.
+
+        Returns
+        ---
+        key - the key to follow the job with status() and result(), None if too many jobs are pending
+        """
+        key, params = self.key(chamber, topic, subject, k, sessions)
+        with self._lock:
+            state = self.status(key)["state"]
+            if state in ["done", "running", "queued"]:
+                return key
+            self._futures = {running: f for running, f in self._futures.items() if not f.done()}
+            if len(self._futures) >= self.max_pending:
+                return None
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.max_workers)
+            _write_progress(self.results_dir, key, "queued", 0.0, "Waiting for a worker")
+            self._futures[key] = self._pool.submit(run_job, key, params, self.data_path, self.results_dir)
+        return key
+
+    def status(self, key):
+        """dict with the state ("queued", "running", "done", "error" or "unknown"), progress (0 to 1) and a message"""
+        path = _progress_path(self.results_dir, key)
+        try:
+            with open(path) as f:
+                status = json.load(f)
+        except (OSError, ValueError):
+            return {"state": "unknown", "progress": 0.0, "message": ""}
+        if status["state"] in ["queued", "running"] and key not in self._futures \
+                and time.time() - os.stat(path).st_mtime > JOB_TIMEOUT:
+            return {"state": "error", "progress": 0.0, "message": "The job was lost"}
+        return status
+
+    def result(self, key):
+        """dict of cluster_id -> node ids of the members in the cluster, None if the job is not done"""
+        cached = cluster_cache.load(self.results_dir, key)
+        if cached is None:
+            return None
+        return {int(c): np.sort(cached["member_nids"][cached["labels"] == c]) for c in np.unique(cached["labels"])}
@@ -0,0 +1,209 @@
+"""
+In-memory store of the result tables shown by the app.
+
+Every result csv is converted once into one .npy file per column, and the
+columns are opened with np.load(mmap_mode='r'). The pages of those files
+live in the OS page cache, so all the worker processes of a pre-forked
+server (see wsgi.py) share a single copy of the data instead of each
+holding its own pandas frames. Each process only keeps a small dict
+index of (chamber, topic, subtopic, cluster_id) -> row, so lookups are
+dict lookups instead of parsing and filtering csv files on every click.
+
+The csv files are checked for changes at most every check_interval
+seconds. When one was rewritten on disk, its columns are exported again
+into a new directory named after the csv's mtime, so processes still
+reading the old columns are not affected. Whichever process gets there
+first exports; the others open its output.
+
+Run from the repository root to export the tables ahead of starting the app:
+    python src/visualization/result_store.py
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+join = os.path.join
+
+DEFAULT_CHAMBER = "house"
+KEY = ["chamber", "topic", "subtopic"]
+
+# The data root the pipeline publishes into, see pipeline.py
+DATA_PATH = os.environ.get("REPG_DATA_ROOT", "./data")
+RESULT_FILES = {
+    "clusters": join(DATA_PATH, "clusters", "viz_clusters.csv"),
+    "parties": join(DATA_PATH, "results", "q1_party_distribution.csv"),
+    "lobbyists": join(DATA_PATH, "results", "q3_most_important_lobbyists.csv"),
+    "committees": join(DATA_PATH, "results", "q4.1_most_important_committees.csv"),
+    "members": join(DATA_PATH, "results", "q9_most_influential_members.csv"),
+}
+TABLES_DIR = join(DATA_PATH, "results", "tables")
+COLUMNS_FILE = "columns.json"
+
+
+def read_result_csv(path):
+    """
+    Read a clusters or results csv. Files written before the Senate was
+    clustered have no chamber column, all of their rows are House clusters.
+    """
+    df = pd.read_csv(path)
+    df = df.drop(columns=[c for c in df.columns if c.startswith("Unnamed:")])
+    if "chamber" not in df.columns:
+        df.insert(0, "chamber", DEFAULT_CHAMBER)
+    return df
+
+
+def export_table(csv_path, table_dir):
+    """
+    Write a result csv as one .npy file per column into table_dir, rows
+    sorted by (chamber, topic, subtopic, cluster_id). Text columns are stored
+    as fixed width unicode, with missing values as empty strings, since
+    object arrays cannot be memory-mapped.
+    """
+    df = read_result_csv(csv_path).sort_values(KEY + ["cluster_id"])
+    parent = os.path.dirname(os.path.abspath(table_dir))
+    os.makedirs(parent, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(dir=parent)
+    for i, col in enumerate(df.columns):
+        if df[col].dtype == object:
+            values = df[col].fillna("").astype(str).to_numpy(dtype=str)
+        else:
+            values = df[col].to_numpy()
+        np.save(join(tmp_dir, f"{i}.npy"), values)
+    with open(join(tmp_dir, COLUMNS_FILE), "w") as f:
+        json.dump(list(df.columns), f)
+    try:
+        os.rename(tmp_dir, table_dir)
+    except OSError:
+        # Another process exported the same version first
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def open_table(table_dir):
+    """The columns of an exported table as a dict of name -> read-only memory-mapped array"""
+    with open(join(table_dir, COLUMNS_FILE)) as f:
+        columns = json.load(f)
+    return {col: np.load(join(table_dir, f"{i}.npy"), mmap_mode="r") for i, col in enumerate(columns)}
+
+
+class _Table:
+    """Memory-mapped columns of one result table with the row index of each cluster"""
+
+    def __init__(self, columns):
+        self.columns = columns
+        keys = zip(columns["chamber"].tolist(), columns["topic"].tolist(),
+                   columns["subtopic"].tolist(), columns["cluster_id"].tolist())
+        self.rows = {}
+        self.groups = {}
+        # Rows are sorted by key, so every subtopic is one contiguous slice
+        for i, (chamber, topic, subtopic, cluster_id) in enumerate(keys):
+            self.rows[(chamber, topic, subtopic, int(cluster_id))] = i
+            start, _ = self.groups.get((chamber, topic, subtopic), (i, i))
+            self.groups[(chamber, topic, subtopic)] = (start, i + 1)
+
+    def row(self, i):
+        return {col: values[i].item() for col, values in self.columns.items()}
+
+    def frame(self, start, stop):
+        return pd.DataFrame({col: np.asarray(values[start:stop]) for col, values in self.columns.items()})
+
+
+class ResultStore:
+    """
+    Parameters
+    ---
+    paths - dict of table name -> csv path, see RESULT_FILES
+    tables_dir - directory of the exported, memory-mapped tables
+    check_interval - minimum number of seconds between two checks of the files' mtimes
+    """
+
+    def __init__(self, paths=RESULT_FILES, tables_dir=TABLES_DIR, check_interval=2.0):
+        self.paths = dict(paths)
+        self.tables_dir = tables_dir
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._last_check = 0.0
+        self._mtimes = None
+        self._tables = None
+        # Incremented on every (re)load, so caches of derived values can key on it
+        self.version = 0
+        self._load()
+
+    def _stat(self):
+        return {name: os.stat(path).st_mtime_ns for name, path in self.paths.items()}
+
+    def _table_dir(self, name, mtime):
+        return join(self.tables_dir, f"{name}-{mtime}")
+
+    def export(self):
+        """Export the current version of every table that was not exported yet"""
+        for name, mtime in self._stat().items():
+            table_dir = self._table_dir(name, mtime)
+            if not os.path.exists(table_dir):
+                export_table(self.paths[name], table_dir)
+                self._remove_old_versions(name, table_dir)
+
+    def _remove_old_versions(self, name, current_dir):
+        # Memory maps of removed files stay valid in processes that still use them
+        for fname in os.listdir(self.tables_dir):
+            path = join(self.tables_dir, fname)
+            if fname.rsplit("-", 1)[0] == name and path != current_dir and os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+
+    def _load(self):
+        mtimes = self._stat()
+        self.export()
+        tables = {name: _Table(open_table(self._table_dir(name, mtime))) for name, mtime in mtimes.items()}
+        topics = {}
+        for chamber, topic, subtopic in tables["clusters"].groups:
+            topics.setdefault(chamber, {}).setdefault(topic, []).append(subtopic)
+        # Swap in the new tables at once, readers never see a half-built store
+        self._tables, self._topics, self._mtimes = tables, topics, mtimes
+        self.version += 1
+
+    def _tables_now(self):
+        """The current tables, reloaded first if a file changed since the last check."""
+        now = time.monotonic()
+        if now - self._last_check >= self.check_interval and self._lock.acquire(blocking=False):
+            try:
+                self._last_check = now
+                if self._stat() != self._mtimes:
+                    self._load()
+            except (OSError, ValueError, pd.errors.ParserError, KeyError) as e:
+                # A file mid-rewrite, keep serving the previous version
+                print(f"Result store not reloaded: {e}")
+            finally:
+                self._lock.release()
+        return self._tables
+
+    def topics(self, chamber=DEFAULT_CHAMBER):
+        """Every topic that has at least one clustered subject in the chamber"""
+        self._tables_now()
+        return sorted(self._topics.get(chamber, {}))
+
+    def subtopics(self, chamber, topic):
+        """The clustered subtopics of a topic"""
+        self._tables_now()
+        return list(self._topics.get(chamber, {}).get(topic, []))
+
+    def clusters(self, table, chamber, topic, subtopic):
+        """All clusters of a subtopic as a dataframe ordered by cluster_id, None if there are none"""
+        table = self._tables_now()[table]
+        bounds = table.groups.get((chamber, topic, subtopic))
+        return None if bounds is None else table.frame(*bounds)
+
+    def cluster(self, table, chamber, topic, subtopic, cluster_id):
+        """The row of one cluster as a dict, None if the table does not have it"""
+        table = self._tables_now()[table]
+        i = table.rows.get((chamber, topic, subtopic, cluster_id))
+        return None if i is None else table.row(i)
+
+
+if __name__ == '__main__':
+    store = ResultStore()
+    print(f"Exported {len(store.paths)} result tables to {store.tables_dir}")
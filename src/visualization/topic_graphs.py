@@ -0,0 +1,108 @@
+"""
+Cytoscape elements of the topic graphs, with fixed node positions.
+
+Each topic graph is the topic node with one edge to each of its clustered
+subtopics. Node positions come from a deterministic spring layout computed
+here instead of by every browser's force-directed 'cose' layout, so the app
+can draw the graph with the 'preset' layout.
+
+Run from the repository root to precompute the graphs of every chamber and
+topic into TOPIC_GRAPHS_PATH:
+    python src/visualization/topic_graphs.py
+"""
+
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from result_store import DATA_PATH, RESULT_FILES, read_result_csv
+
+TOPIC_GRAPHS_PATH = os.path.join(DATA_PATH, "clusters", "topic_graphs.json")
+# Size of the box the positions are scaled to, in pixels
+LAYOUT_SIZE = 400
+
+
+def spring_layout(n_nodes, edges, iterations=100, seed=0):
+    """
+    Fruchterman-Reingold force-directed layout.
+
+    Parameters
+    ---
+    n_nodes - number of nodes
+    edges - list of (source, target) node index pairs
+    iterations - number of simulation steps
+    seed - seed of the random initial positions, so the layout is reproducible
+
+    Returns
+    ---
+    pos - (n_nodes, 2) array of positions in [0, 1]
+    """
+    pos = np.random.RandomState(seed).rand(n_nodes, 2)
+    if n_nodes < 2:
+        return np.full((n_nodes, 2), 0.5)
+    adjacency = np.zeros((n_nodes, n_nodes))
+    for i, j in edges:
+        adjacency[i, j] = adjacency[j, i] = 1
+    k = np.sqrt(1.0 / n_nodes)  # optimal distance between nodes
+    temperature = 0.1
+    cooling = temperature / (iterations + 1)
+    for _ in range(iterations):
+        delta = pos[:, None, :] - pos[None, :, :]
+        distance = np.maximum(np.linalg.norm(delta, axis=2), 0.01)
+        # Every pair repels, connected pairs attract
+        force = k * k / distance ** 2 - adjacency * distance / k
+        displacement = (delta * force[:, :, None]).sum(axis=1)
+        length = np.maximum(np.linalg.norm(displacement, axis=1), 0.01)
+        pos += displacement * (np.minimum(length, temperature) / length)[:, None]
+        temperature -= cooling
+    pos -= pos.min(axis=0)
+    return pos / max(pos.max(), 1e-9)
+
+
+def topic_graph_elements(topic, subtopics):
+    """
+    The Cytoscape elements of a topic graph, with a preset position on each node.
+
+    See examples of this format here:
+    https://dash.plotly.com/cytoscape
+    """
+    topic_id = "topic_" + topic
+    pos = spring_layout(len(subtopics) + 1, [(0, i + 1) for i in range(len(subtopics))]) * LAYOUT_SIZE
+    nodes = [{"data": {"id": topic_id, "label": topic},
+              "position": {"x": round(float(pos[0, 0]), 1), "y": round(float(pos[0, 1]), 1)}}]
+    edges = []
+    for (x, y), subtopic in zip(pos[1:], subtopics):
+        subtopic_id = "subtopic_" + subtopic
+        nodes.append({"data": {"id": subtopic_id, "label": subtopic},
+                      "position": {"x": round(float(x), 1), "y": round(float(y), 1)}})
+        edges.append({"data": {"source": subtopic_id, "target": topic_id}})
+    return nodes + edges
+
+
+def build_topic_graphs(df_clusters):
+    """
+    Returns
+    ---
+    graphs - dict of chamber -> topic -> {"subtopics": [...], "elements": [...]}
+    """
+    graphs = {}
+    for (chamber, topic), df_topic in df_clusters.groupby(["chamber", "topic"]):
+        subtopics = sorted(df_topic["subtopic"].unique())
+        graphs.setdefault(chamber, {})[topic] = {
+            "subtopics": subtopics, "elements": topic_graph_elements(topic, subtopics)}
+    return graphs
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Precompute the topic graphs of every chamber and topic")
+    parser.add_argument("--clusters", default=RESULT_FILES["clusters"], help="viz_clusters.csv to read")
+    parser.add_argument("--out", default=TOPIC_GRAPHS_PATH)
+    args = parser.parse_args()
+    graphs = build_topic_graphs(read_result_csv(args.clusters))
+    with open(args.out, "w") as f:
+        json.dump(graphs, f)
+    print(f"Wrote {sum(len(g) for g in graphs.values())} topic graphs to {args.out}")
@@ -0,0 +1,111 @@
+"""
+Warm-up of the app's caches at startup.
+
+The first user to open a (topic, subtopic, cluster) pays for building its
+topic graph and figures; on deployments whose instances restart often that
+first hit is common. A warm-up thread builds them ahead of the users, within
+a time budget, starting with the views that were opened most often.
+
+Which views are opened is recorded in a JSON lines access log (ViewLog), one
+line per subtopic or cluster shown. Views never opened follow, in the order
+of all_views(), while there is time left.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import Counter
+
+VIEWS_LOG = os.path.join(os.environ.get("REPG_DATA_ROOT", "./data"), "logs", "views.jsonl")
+
+
+class ViewLog:
+    """
+    Appends the views shown by the app to a JSON lines file. Every line is written
+    with a single append, so several processes can share the file.
+
+    Parameters
+    ---
+    path - the log file, created with its directory if needed
+    """
+
+    def __init__(self, path=VIEWS_LOG):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    def record(self, chamber, topic, subtopic, cluster=None):
+        line = json.dumps({"chamber": chamber, "topic": topic, "subtopic": subtopic, "cluster": cluster}) + "\n"
+        with open(self.path, "a") as f:
+            f.write(line)
+
+
+def popular_views(path=VIEWS_LOG):
+    """
+    The views of an access log, most often opened first.
+
+    Returns
+    ---
+    views - list of (chamber, topic, subtopic, cluster) tuples, cluster None for a
+        subtopic's pie. Empty if there is no log yet.
+    """
+    counts = Counter()
+    try:
+        with open(path) as f:
+            for line in f:
+                try:
+                    view = json.loads(line)
+                    counts[(view["chamber"], view["topic"], view["subtopic"], view["cluster"])] += 1
+                except (ValueError, KeyError):
+                    # A line cut short by a crash
+                    continue
+    except OSError:
+        return []
+    return [view for view, _ in counts.most_common()]
+
+
+def all_views(store, chambers):
+    """Every subtopic of the result store, as (chamber, topic, subtopic, None) views"""
+    return [(chamber, topic, subtopic, None)
+            for chamber in chambers for topic in store.topics(chamber) for subtopic in store.subtopics(chamber, topic)]
+
+
+def warm_up(views, warm_view, budget):
+    """
+    Call warm_view(*view) for the views in order until all are done or the time budget is spent.
+
+    Parameters
+    ---
+    views - iterable of (chamber, topic, subtopic, cluster) tuples; repeated views are skipped
+    warm_view - function building and caching everything shown for a view
+    budget - maximum number of seconds spent
+
+    Returns
+    ---
+    n_views - number of views warmed up
+    seconds - time spent
+    """
+    start = time.perf_counter()
+    done = set()
+    for view in views:
+        if time.perf_counter() - start >= budget:
+            break
+        if view in done:
+            continue
+        try:
+            warm_view(*view)
+        except Exception as e:
+            # e.g. a logged view that is no longer in the results
+            print(f"Could not warm up {view}: {e}")
+        done.add(view)
+    return len(done), time.perf_counter() - start
+
+
+def start_warm_up(views, warm_view, budget):
+    """Run warm_up in a daemon thread, so the app serves requests meanwhile. Returns the thread."""
+    def run():
+        n_views, seconds = warm_up(views, warm_view, budget)
+        print(f"Warmed up {n_views} views in {seconds:.1f}s")
+    thread = threading.Thread(target=run, name="warm-up", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,22 @@
+"""
+WSGI entry point of the app for production servers.
+
+Run from the repository root, for example with 4 pre-forked gunicorn workers:
+    python src/visualization/result_store.py
+    gunicorn --config src/visualization/gunicorn.conf.py --preload --workers 4 --bind 0.0.0.0:8050 \
+        --pythonpath src/visualization wsgi:server
+
+With --preload the app is imported once in the master process before the
+workers are forked, so the workers share its memory-mapped result tables
+(see result_store.py) and indexes copy-on-write. Every worker only adds
+its own read-only caches (figures, topic graphs), so any worker can answer
+any request and throughput scales with the number of workers.
+
+With WARM_UP_SECONDS set in app.py, every worker warms up its own caches
+in a thread started by the post_worker_init hook of gunicorn.conf.py, after
+the fork. Importing the app starts no thread, so the master never forks
+while a warm-up holds the figure cache's lock. Other WSGI servers can call
+app.start_warm_up_figures() in each serving process the same way.
+"""
+
+from app import app, server
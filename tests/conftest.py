@@ -0,0 +1,8 @@
+import os
+import sys
+
+# The scripts import their neighbours by module name, as when run from their directory
+SRC = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+sys.path.insert(0, os.path.join(SRC, "data_retrieval"))
+sys.path.insert(0, os.path.join(SRC, "visualization"))
+sys.path.insert(0, os.path.join(SRC, "community_detection", "02 Clustering"))
@@ -0,0 +1,167 @@
+"""
+Tests of the app's callbacks, posted through the Flask test client to an app
+serving a small data root written here.
+
+Run from the repository root:
+    python -m pytest tests
+"""
+
+import gzip
+import importlib
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+TOPIC = "Health"
+SUBTOPICS = ["Prescription drugs", "Health care costs and insurance"]
+PARTIES = ["D", "R", "D", "R"]
+MEMBERS = pd.DataFrame({"id": ["A000001", "B000002", "C000003", "D000004"],
+                        "first_name": ["Mary", "John", "Linda", "Paul"], "middle_name": [None] * 4,
+                        "last_name": ["Anders", "Berman", "Carlson", "Dorsey"], "state": ["CA", "TX", "NY", "OH"],
+                        "party": PARTIES})
+# Cluster of every member in each subtopic
+CLUSTERS = {SUBTOPICS[0]: [0, 1, 0, 1], SUBTOPICS[1]: [1, 1, 0, 0]}
+
+
+def write_data_root(path):
+    """Member files, nodes, cluster assignments and the result tables of CLUSTERS"""
+    from cluster_assignments import write_cluster_assignments
+
+    MEMBERS.to_csv(path / "house_116.csv", index=False)
+    MEMBERS.iloc[:0].to_csv(path / "senate_116.csv", index=False)
+    names = list(MEMBERS["id"]) + [TOPIC] + SUBTOPICS
+    ntypes = ["member"] * len(MEMBERS) + ["topic"] * (1 + len(SUBTOPICS))
+    pd.DataFrame({"nid": range(len(names)), "ntype": ntypes, "nname": names,
+                  "ntype_name": [f"{t}_{n}" for t, n in zip(ntypes, names)]}).to_csv(path / "nodes.csv", index=False)
+    topic_nids = {name: nid for nid, name in enumerate(names) if nid >= len(MEMBERS)}
+    write_cluster_assignments(path / "cluster_assignments", "house", pd.DataFrame({
+        "member_nid": np.tile(np.arange(len(MEMBERS)), len(SUBTOPICS)),
+        "topic_id": topic_nids[TOPIC],
+        "subject_id": np.repeat([topic_nids[s] for s in SUBTOPICS], len(MEMBERS)),
+        "k": 2,
+        "cluster_id": np.concatenate([CLUSTERS[s] for s in SUBTOPICS]),
+        "stability": np.nan}), {nid: name for name, nid in topic_nids.items()})
+
+    rows = []
+    for subtopic, clusters in CLUSTERS.items():
+        for cluster_id in sorted(set(clusters)):
+            parties = [p for p, c in zip(PARTIES, clusters) if c == cluster_id]
+            rows.append({"chamber": "house", "topic": TOPIC, "subtopic": subtopic, "cluster_id": cluster_id,
+                         "D": parties.count("D"), "R": parties.count("R")})
+    df_parties = pd.DataFrame(rows)
+    df_ranks = df_parties[["chamber", "topic", "subtopic", "cluster_id"]].assign(
+        cluster_count=df_parties["D"] + df_parties["R"],
+        **{f"name_rank_{i}": "" for i in range(1, 6)}, **{f"count_rank_{i}": 0 for i in range(1, 6)})
+    (path / "results").mkdir()
+    (path / "clusters").mkdir()
+    df_parties.to_csv(path / "results" / "q1_party_distribution.csv", index=False)
+    for q in ["q3_most_important_lobbyists", "q4.1_most_important_committees", "q9_most_influential_members"]:
+        df_ranks.to_csv(path / "results" / f"{q}.csv", index=False)
+    df_parties.assign(total_members=df_parties["D"] + df_parties["R"], color="#500973").to_csv(
+        path / "clusters" / "viz_clusters.csv", index=False)
+
+
+@pytest.fixture(scope="module")
+def app_module(tmp_path_factory):
+    """The app module, imported with REPG_DATA_ROOT pointing to a data root of its own"""
+    path = tmp_path_factory.mktemp("data")
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setenv("REPG_DATA_ROOT", str(path))
+        # The modules read the data root when they are imported
+        for name in ["app", "result_store", "topic_graphs", "cluster_stats", "member_search", "reclustering",
+                     "warm_up"]:
+            sys.modules.pop(name, None)
+        monkeypatch.syspath_prepend(os.path.join(os.path.dirname(__file__), "..", "src", "community_detection",
+                                                 "02 Clustering"))
+        write_data_root(path)
+        yield importlib.import_module("app")
+
+
+def post_callback(app_module, output, inputs, state=(), changed=None, headers=None):
+    """
+    Post a callback request like the Dash renderer does.
+
+    Parameters
+    ---
+    output - a substring of the callback's output key, e.g. "member_clusters.children"
+    inputs, state - lists of (id, property, value)
+    changed - "id.property" of the input that triggered the callback, the first input by default
+    headers - extra request headers
+    """
+    key = next(k for k in app_module.app.callback_map if output in k)
+    callback = app_module.app.callback_map[key]
+    body = {
+        "output": key,
+        "outputs": [{"id": o.split(".")[0], "property": o.split(".")[1]}
+                    for o in key.strip(".").split("...")] if key.startswith("..") else
+                   {"id": key.split(".")[0], "property": key.split(".")[1]},
+        "inputs": [{"id": i, "property": p, "value": v} for i, p, v in inputs],
+        "state": [{"id": i, "property": p, "value": v} for i, p, v in state],
+        "changedPropIds": [changed or f"{inputs[0][0]}.{inputs[0][1]}"],
+    }
+    assert len(body["inputs"]) == len(callback["inputs"])
+    client = app_module.server.test_client()
+    return client.post("/_dash-update-component", data=json.dumps(body), content_type="application/json",
+                       headers=headers)
+
+
+def test_jump_to_member(app_module):
+    response = post_callback(app_module, "member_clusters.children",
+                             [("member_dropdown", "value", "B000002"), ("current_topic", "data", TOPIC)],
+                             [("current_chamber", "data", "house"), ("current_subtopic", "data", None)])
+    assert response.status_code == 200
+    outputs = response.get_json()["response"]
+    subtopic = outputs["member_subtopic"]["data"]["label"]
+    assert subtopic in SUBTOPICS
+    assert outputs["member_cluster"]["data"] == {"points": [{"label": CLUSTERS[subtopic][1]}]}
+    assert "member_clusters" in outputs
+
+
+def test_member_clusters_on_topic_change(app_module):
+    response = post_callback(app_module, "member_clusters.children",
+                             [("member_dropdown", "value", "C000003"), ("current_topic", "data", TOPIC)],
+                             [("current_chamber", "data", "house"), ("current_subtopic", "data", None)],
+                             changed="current_topic.data")
+    assert response.status_code == 200
+    outputs = response.get_json()["response"]
+    # Only the list of clusters is updated when the topic changes
+    assert list(outputs) == ["member_clusters"]
+
+
+def test_http_caching(app_module):
+    client = app_module.server.test_client()
+    layout = client.get("/_dash-layout")
+    assert layout.status_code == 200 and layout.headers["ETag"]
+    repeated = client.get("/_dash-layout", headers={"If-None-Match": layout.headers["ETag"]})
+    assert repeated.status_code == 304
+
+    # Callbacks are compressed, but get no ETag: dash never sends If-None-Match for them
+    response = post_callback(app_module, "member_clusters.children",
+                             [("member_dropdown", "value", "B000002"), ("current_topic", "data", TOPIC)],
+                             [("current_chamber", "data", "house"), ("current_subtopic", "data", None)],
+                             headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert "ETag" not in response.headers
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "member_clusters" in json.loads(gzip.decompress(response.data))["response"]
+
+
+def test_record_view(app_module, tmp_path, monkeypatch):
+    from warm_up import ViewLog
+
+    path = tmp_path / "views.jsonl"
+    monkeypatch.setattr(app_module, "views_log", ViewLog(str(path)))
+    # As when the layout is built
+    app_module.get_clusters("house", TOPIC, {"label": SUBTOPICS[0]})
+    assert not path.exists()
+
+    response = post_callback(app_module, "communities.children",
+                             [("current_chamber", "data", "house"), ("current_topic", "data", TOPIC),
+                              ("current_subtopic", "data", {"label": SUBTOPICS[1]})])
+    assert response.status_code == 200
+    assert [json.loads(line) for line in path.read_text().splitlines()] == [
+        {"chamber": "house", "topic": TOPIC, "subtopic": SUBTOPICS[1], "cluster": None}]
@@ -0,0 +1,58 @@
+"""
+Tests of fast_kmodes.py against kmodes.KModes, which it replaces: with the same
+parameters, both must give the same clusters on the same votes.
+
+Run from the repository root:
+    python -m pytest tests
+"""
+
+import numpy as np
+import pytest
+
+from fast_kmodes import FastKModes
+
+kmodes = pytest.importorskip("kmodes.kmodes")
+
+
+def vote_matrix(seed, n_members=100, n_votes=30, n_blocs=3, loyalty=0.75):
+    """Votes (-1 no, 0 absent, 1 yes, 2 present) of members voting with their bloc most of the time"""
+    rng = np.random.RandomState(seed)
+    bloc_votes = rng.choice([-1, 0, 1], (n_blocs, n_votes))
+    blocs = rng.randint(0, n_blocs, n_members)
+    own_votes = rng.choice([-1, 0, 1, 2], (n_members, n_votes))
+    return np.where(rng.rand(n_members, n_votes) < loyalty, bloc_votes[blocs], own_votes)
+
+
+def assert_same_fit(X, **params):
+    expected = kmodes.KModes(**params).fit(X)
+    fitted = FastKModes(**params).fit(X)
+    assert fitted.cost_ == expected.cost_
+    np.testing.assert_array_equal(fitted.labels_, expected.labels_)
+    np.testing.assert_array_equal(fitted.cluster_centroids_, expected.cluster_centroids_)
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("n_clusters", [2, 3, 5])
+def test_matches_kmodes_huang(seed, n_clusters):
+    assert_same_fit(vote_matrix(seed), n_clusters=n_clusters, init="Huang", random_state=0, n_init=10)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_matches_kmodes_random(seed):
+    # Random initial centroids often collide, which empties clusters along the way
+    assert_same_fit(vote_matrix(seed, loyalty=0.4), n_clusters=6, init="random", random_state=seed, n_init=3)
+
+
+def test_fewer_distinct_members_than_clusters():
+    X = vote_matrix(0, n_blocs=2, loyalty=1.0)
+    fitted = FastKModes(n_clusters=3, init="Huang", random_state=0).fit(X)
+    expected = kmodes.KModes(n_clusters=3, init="Huang", random_state=0).fit(X)
+    # kmodes leaves labels_ unset in this case, its predict gives the clusters
+    np.testing.assert_array_equal(fitted.labels_, expected.predict(X))
+    np.testing.assert_array_equal(fitted.cluster_centroids_, expected.cluster_centroids_)
+    assert fitted.cost_ == 0
+
+
+def test_unknown_init():
+    with pytest.raises(ValueError, match="Unknown init method 'kmeans'"):
+        FastKModes(n_clusters=2, init="kmeans").fit(vote_matrix(0))
@@ -0,0 +1,150 @@
+"""
+Tests of lda_contributions.py against the fake API of fake_lda_server.py,
+served in-process on an ephemeral port.
+
+Run from the repository root:
+    python -m pytest tests
+"""
+
+import asyncio
+import csv
+import json
+import os
+from collections import Counter
+from contextlib import asynccontextmanager
+
+import pytest
+from aiohttp.test_utils import TestServer
+
+import lda_contributions
+from fake_lda_server import fake_report, make_app
+from flatten_contributions import CONTRIBUTION_COLUMNS, flatten_contributions
+
+YEAR = 2019
+PAGE_SIZE = 10
+N_REPORTS = 95  # 10 pages, the last one short
+N_PAGES = 10
+
+
+@pytest.fixture(autouse=True)
+def fast_backoff(monkeypatch):
+    monkeypatch.setattr(lda_contributions, "BACKOFF_BASE", 0.01)
+
+
+@asynccontextmanager
+async def serve(**kwargs):
+    app = make_app(kwargs.pop("n_reports", N_REPORTS), kwargs.pop("failure_rate", 0.0), **kwargs)
+    server = TestServer(app)
+    await server.start_server()
+    try:
+        yield app, str(server.make_url("/api/v1/contributions/"))
+    finally:
+        await server.close()
+
+
+async def download(url, out_dir, concurrency=4):
+    """Every page of YEAR into out_dir, without rate limiting to speak of"""
+    async with lda_contributions.aiohttp.ClientSession() as session:
+        limiter = lda_contributions.RateLimiter(rate=10000, period=1.0)
+        return await lda_contributions.fetch_year(session, limiter, url, YEAR, str(out_dir), concurrency,
+                                                  page_size=PAGE_SIZE)
+
+
+def expected_rows():
+    reports = [fake_report(YEAR, i) for i in range(N_REPORTS)]
+    return Counter(tuple(str(record[c]) if record[c] is not None else "" for c in CONTRIBUTION_COLUMNS)
+                   for record in flatten_contributions(reports))
+
+
+def csv_rows(out_dir):
+    with open(os.path.join(out_dir, f"contributions_{YEAR}.csv"), newline="") as f:
+        reader = csv.reader(f)
+        assert next(reader) == CONTRIBUTION_COLUMNS
+        return Counter(tuple(row) for row in reader)
+
+
+def test_concurrent_pages_fetched_once(tmp_path):
+    async def run():
+        async with serve(delay=0.02) as (app, url):
+            n_rows = await download(url, tmp_path)
+        return app, n_rows
+
+    app, n_rows = asyncio.run(run())
+    assert app["in_flight"]["max"] > 1
+    assert app["served"] == Counter({(YEAR, page): 1 for page in range(1, N_PAGES + 1)})
+    rows = csv_rows(tmp_path)
+    assert rows == expected_rows()
+    assert n_rows == sum(rows.values())
+
+
+def test_throttled_and_failed_pages_retried(tmp_path):
+    failures = {(YEAR, 2): [429, 500], (YEAR, 5): [500, 500, 429]}
+
+    async def run():
+        async with serve(failures=failures, retry_after=1) as (app, url):
+            await download(url, tmp_path)
+        return app
+
+    app = asyncio.run(run())
+    assert app["attempts"][YEAR, 2] == 3
+    assert app["attempts"][YEAR, 5] == 4
+    assert all(app["served"][YEAR, page] == 1 for page in range(1, N_PAGES + 1))
+    for page, statuses in failures.items():
+        log = [(status, at) for year, p, status, at in app["log"] if (year, p) == page]
+        assert [status for status, _ in log] == statuses + [200]
+        for (status, at), (_, next_at) in zip(log, log[1:]):
+            # The Retry-After of a 429 is waited for, a 500 is backed off from
+            assert next_at - at >= (0.95 if status == 429 else 0.004)
+    assert csv_rows(tmp_path) == expected_rows()
+
+
+def test_random_failures_deterministic(tmp_path):
+    async def run(out_dir, concurrency):
+        out_dir.mkdir()
+        async with serve(failure_rate=0.3, seed=1, retry_after=0) as (app, url):
+            await download(url, out_dir, concurrency)
+        return app
+
+    first = asyncio.run(run(tmp_path / "a", 1))
+    second = asyncio.run(run(tmp_path / "b", 4))
+    assert any(status != 200 for _, _, status, _ in first["log"])
+    assert first["attempts"] == second["attempts"]
+    assert csv_rows(tmp_path / "a") == csv_rows(tmp_path / "b") == expected_rows()
+
+
+def test_interrupted_run_resumes(tmp_path):
+    checkpoint_path = tmp_path / f"contributions_{YEAR}.checkpoint.json"
+    csv_path = tmp_path / f"contributions_{YEAR}.csv"
+    stop_after = 3
+
+    def pages_done():
+        if not checkpoint_path.exists():
+            return set()
+        with open(checkpoint_path) as f:
+            return set(json.load(f)["pages"])
+
+    async def interrupted():
+        async with serve(delay=0.05) as (app, url):
+            task = asyncio.create_task(download(url, tmp_path, concurrency=2))
+            while len(pages_done()) < stop_after:
+                await asyncio.sleep(0.005)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+
+    async def resumed():
+        async with serve() as (app, url):
+            await download(url, tmp_path)
+        return app
+
+    asyncio.run(interrupted())
+    done = pages_done()
+    assert stop_after <= len(done) < N_PAGES
+    # A page cut short after the last checkpoint
+    with open(csv_path, "a") as f:
+        f.write("feca,FECA,CONTRIBUTOR 1,FRIENDS OF")
+
+    app = asyncio.run(resumed())
+    assert set(page for _, page in app["served"]) == set(range(1, N_PAGES + 1)) - done
+    assert all(n == 1 for n in app["served"].values())
+    assert csv_rows(tmp_path) == expected_rows()
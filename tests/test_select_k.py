@@ -0,0 +1,22 @@
+"""
+Tests of the k sweep of select_k.py.
+
+Run from the repository root:
+    python -m pytest tests
+"""
+
+import numpy as np
+import pytest
+
+from select_k import sweep_k
+
+
+@pytest.mark.parametrize("k_values", [range(2, 9), range(2, 9, 2), [2, 5, 6]])
+def test_sweep_k(k_values):
+    rng = np.random.RandomState(0)
+    bloc_votes = rng.choice([-1, 1], (4, 30))
+    X = np.where(rng.rand(60, 30) < 0.8, bloc_votes[rng.randint(0, 4, 60)], rng.choice([-1, 0, 1], (60, 30)))
+    best, scores = sweep_k(X, k_values)
+    assert scores["k"] == sorted(k_values)
+    assert best.n_clusters in scores["k"]
+    assert best.cluster_centroids_.shape == (best.n_clusters, X.shape[1])